@@ -0,0 +1,3 @@
+"""
+Pytest configuration: this directory is put on sys.path, so tests import the ``models`` package as the figure scripts do.
+"""
@@ -0,0 +1,30 @@
+"""
+This module contains infrastructure shared by the noise models and codes of all packages.
+"""
+
+# import classes in dependency order
+from ._sparsesampling import sample_faults  # noqa: F401
+from ._sparsesampling import sparse_to_bsf  # noqa: F401
+from ._paulichannel import TWO_QUBIT_PAULIS  # noqa: F401
+from ._paulichannel import AliasTable  # noqa: F401
+from ._paulichannel import TwoQubitPauliChannel  # noqa: F401
+from ._paulilayout import css_layout  # noqa: F401
+from ._paulilayout import layout_operators  # noqa: F401
+from ._paulilayout import mmhh_layout  # noqa: F401
+from ._artifactcache import ARTIFACT_DIR  # noqa: F401
+from ._artifactcache import ARTIFACT_VERSION  # noqa: F401
+from ._artifactcache import ArtifactCache  # noqa: F401
+from ._artifactcache import artifact_cache  # noqa: F401
+from ._artifactcache import code_fingerprint  # noqa: F401
+from ._artifactcache import code_operators  # noqa: F401
+from ._codesupports import CodeSupports  # noqa: F401
+from ._codesupports import code_supports  # noqa: F401
+from ._codesupports import pack_shots  # noqa: F401
+from ._codesupports import unpack_shots  # noqa: F401
+from ._noisepipeline import FaultTable  # noqa: F401
+from ._noisepipeline import NoiseLayer  # noqa: F401
+from ._noisepipeline import SingleQubitPauliLayer  # noqa: F401
+from ._noisepipeline import DepolarizingLayer  # noqa: F401
+from ._noisepipeline import BondPauliLayer  # noqa: F401
+from ._noisepipeline import MeasurementFlipLayer  # noqa: F401
+from ._noisepipeline import NoisePipeline  # noqa: F401
@@ -0,0 +1,198 @@
+import functools
+import hashlib
+import os
+import tempfile
+import zipfile
+import zlib
+
+import numpy as np
+
+from models.common._paulilayout import layout_operators
+
+#: Directory of cached code artifacts, shared by processes and reruns. The on-disk cache is opt-in: it is disabled
+#: unless the environment variable CODE_ARTIFACT_DIR names a directory, e.g. a directory of the working copy.
+ARTIFACT_DIR = os.environ.get('CODE_ARTIFACT_DIR', '')
+
+#: Version of the layout of code artifacts, included in fingerprints so artifacts of other versions are never read.
+ARTIFACT_VERSION = 1
+
+
+@functools.lru_cache(maxsize=2 ** 8)
+def code_fingerprint(code):
+    """
+    Return the (cached) stable fingerprint of the given code.
+
+    Notes:
+
+    * The fingerprint is a digest of the module and name of the type of the code and of its repr, so it covers the
+      size and every parameter included in the repr, e.g. mean, std and seeds of :class:`LocalCode`, and the layout
+      of the code through its type. The digest is salted with :data:`ARTIFACT_VERSION`, and with the
+      ``artifact_version`` attribute of the code, if any, e.g. the version of the error landscape of
+      :class:`LocalCode`, so artifacts derived from older landscapes are never read.
+    * Unlike ``hash(code)``, the fingerprint is the same across runs and processes.
+    * Fingerprints are cached per code, e.g. for the recovery caches of decoders, which look them up on every decode.
+      So codes that compare equal must have equal reprs, as do the codes of qecsim and of this package.
+
+    :param code: Stabilizer code.
+    :type code: StabilizerCode
+    :return: Fingerprint as hexadecimal string.
+    :rtype: str
+    """
+    key = 'v{}:{}.{}:{!r}'.format(ARTIFACT_VERSION, type(code).__module__, type(code).__qualname__, code)
+    version = getattr(code, 'artifact_version', None)
+    if version is not None:
+        key += ':v{!r}'.format(version)
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+class ArtifactCache:
+    """
+    On-disk cache of per-code artifacts, e.g. stabilizers, logicals and lookup tables.
+
+    Notes:
+
+    * Artifacts are dicts of numpy arrays, stored as compressed ``.npz`` files under the directory, in a subdirectory
+      per code fingerprint, see :func:`code_fingerprint`.
+    * Files are written to a private file and renamed, so concurrent processes never read a partial artifact.
+    * If the directory is empty or not writable, artifacts are built on every request and not stored. Artifacts
+      that cannot be read, e.g. truncated or corrupt files, are treated as not cached, so they are rebuilt and
+      replaced.
+
+    Use :func:`artifact_cache` to get the cache of :data:`ARTIFACT_DIR`.
+    """
+
+    def __init__(self, directory):
+        """
+        Initialise new artifact cache.
+
+        :param directory: Directory of cached artifacts, or empty to disable the cache.
+        :type directory: str
+        """
+        self._directory = directory
+
+    @property
+    def directory(self):
+        """
+        Directory of cached artifacts.
+
+        :rtype: str
+        """
+        return self._directory
+
+    def path(self, code, name):
+        """
+        Return the path of the artifact of the given code.
+
+        :param code: Stabilizer code.
+        :type code: StabilizerCode
+        :param name: Name of artifact.
+        :type name: str
+        :return: Path of artifact, or None if the cache is disabled.
+        :rtype: str
+        """
+        if not self._directory:
+            return None
+        return os.path.join(self._directory, code_fingerprint(code), '{}.npz'.format(name))
+
+    def load(self, code, name):
+        """
+        Return the cached artifact of the given code.
+
+        :param code: Stabilizer code.
+        :type code: StabilizerCode
+        :param name: Name of artifact.
+        :type name: str
+        :return: Arrays of artifact, or None if not cached or not readable.
+        :rtype: dict of str to numpy.array
+        """
+        path = self.path(code, name)
+        if path is None or not os.path.exists(path):
+            return None
+        try:
+            with np.load(path) as data:
+                return dict(data)
+        except (OSError, EOFError, ValueError, zipfile.BadZipFile, zlib.error):
+            return None  # unreadable artifact, so rebuild
+
+    def save(self, code, name, arrays):
+        """
+        Store the artifact of the given code, unless the cache is disabled or not writable.
+
+        :param code: Stabilizer code.
+        :type code: StabilizerCode
+        :param name: Name of artifact.
+        :type name: str
+        :param arrays: Arrays of artifact.
+        :type arrays: dict of str to numpy.array
+        """
+        path = self.path(code, name)
+        if path is None:
+            return
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp = tempfile.mkstemp(suffix='.npz', dir=os.path.dirname(path))
+            with os.fdopen(fd, 'wb') as f:
+                np.savez_compressed(f, **arrays)
+            os.replace(tmp, path)
+        except OSError:
+            pass  # cache not available
+
+    def get(self, code, name, build):
+        """
+        Return the cached artifact of the given code, building and storing it if not cached.
+
+        :param code: Stabilizer code.
+        :type code: StabilizerCode
+        :param name: Name of artifact.
+        :type name: str
+        :param build: Function returning the arrays of the artifact.
+        :type build: callable
+        :return: Arrays of artifact.
+        :rtype: dict of str to numpy.array
+        """
+        arrays = self.load(code, name)
+        if arrays is None:
+            arrays = build()
+            self.save(code, name, arrays)
+        return arrays
+
+    def __repr__(self):
+        return '{}({!r})'.format(type(self).__name__, self._directory)
+
+
+def code_operators(code):
+    """
+    Return the stabilizers and logicals of the given code, from the artifact cache if cached.
+
+    Notes:
+
+    * Codes with a ``pauli_layout`` method are built in one vectorized pass, see :func:`layout_operators`. Other codes
+      are built one plaquette at a time using ``code.new_pauli()``, as by :class:`qecsim.models.planar.PlanarCode`.
+    * Codes can return operators from their ``stabilizers``, ``logical_xs`` and ``logical_zs`` properties.
+
+    :param code: Planar code.
+    :type code: PlanarCode
+    :return: Stabilizers, logical Xs and logical Zs in bsf format, keyed by 'stabilizers', 'logical_xs' and
+        'logical_zs'.
+    :rtype: dict of str to numpy.array (2d)
+    """
+    def build():
+        if hasattr(code, 'pauli_layout'):
+            return layout_operators(code, *code.pauli_layout())
+        return {'stabilizers': np.array([code.new_pauli().plaquette(i).to_bsf() for i in code._plaquette_indices]),
+                'logical_xs': np.array([code.new_pauli().logical_x().to_bsf()]),
+                'logical_zs': np.array([code.new_pauli().logical_z().to_bsf()])}
+    return artifact_cache().get(code, 'operators', build)
+
+
+@functools.lru_cache(maxsize=2 ** 8)
+def artifact_cache(directory=None):
+    """
+    Return the (cached) artifact cache of the given directory.
+
+    :param directory: Directory of cached artifacts. (default=None resolves to :data:`ARTIFACT_DIR`)
+    :type directory: str
+    :return: Artifact cache.
+    :rtype: ArtifactCache
+    """
+    return ArtifactCache(ARTIFACT_DIR if directory is None else directory)
@@ -0,0 +1,335 @@
+import functools
+
+import numpy as np
+
+from models.common._artifactcache import artifact_cache
+
+
+def pack_shots(bsfs):
+    """
+    Pack a batch of binary vectors along the shots axis into 64-bit words.
+
+    :param bsfs: Binary vectors, one per row.
+    :type bsfs: numpy.array (2d) with shape (shots, length)
+    :return: Packed binary vectors, bit i of word w of column j holds element j of shot 64 * w + i.
+    :rtype: numpy.array (2d) of uint64 with shape (length, ceil(shots / 64))
+    """
+    shots, length = bsfs.shape
+    n_words = -(-shots // 64)
+    packed = np.zeros((length, 8 * n_words), dtype=np.uint8)
+    packed[:, :-(-shots // 8)] = np.packbits(np.asarray(bsfs, dtype=np.uint8).T, axis=1, bitorder='little')
+    return packed.view(np.uint64)
+
+
+def unpack_shots(packed, shots):
+    """
+    Unpack a batch of binary vectors packed by :func:`pack_shots`.
+
+    :param packed: Packed binary vectors.
+    :type packed: numpy.array (2d) of uint64 with shape (length, ceil(shots / 64))
+    :param shots: Number of shots.
+    :type shots: int
+    :return: Binary vectors, one per row.
+    :rtype: numpy.array (2d) of uint8 with shape (shots, length)
+    """
+    return np.unpackbits(packed.view(np.uint8), axis=1, count=shots, bitorder='little').T
+
+
+class CodeSupports:
+    """
+    Compact representation of a stabilizer code for evaluating syndromes and logical commutations of many errors.
+
+    Notes:
+
+    * The supports of stabilizers and logicals are stored in CSR format, i.e. the bsf columns of row j are
+      ``indices[indptr[j]:indptr[j + 1]]``. Memory is O(n) rather than the O(n^2) of the dense bsf matrices.
+    * Supports are read once per code from ``code.stabilizers`` and ``code.logicals``, so rows are in the order of
+      the public operators of any code. With the artifact cache enabled, the supports of a cached code are loaded
+      without forming the dense matrices, see :func:`code_supports`.
+    * The binary symplectic product of an error E with a row S is the parity of E on the support of S with X and Z
+      halves swapped, so the supports are stored pre-swapped and each product is an XOR over gathered columns.
+    * Batches of errors can optionally be bit-packed along the shots axis into 64-bit words, see :func:`pack_shots`,
+      so that each XOR processes 64 shots at once.
+
+    Use :func:`code_supports` to get a cached instance for a given code.
+    """
+
+    def __init__(self, code):
+        """
+        Initialise new code supports.
+
+        :param code: Planar or rotated planar code.
+        :type code: StabilizerCode
+        """
+        self._n_qubits = code.n_k_d[0]
+        stabilizer_supports = [np.flatnonzero(stabilizer) for stabilizer in code.stabilizers]
+        logical_supports = [np.flatnonzero(logical) for logical in code.logicals]
+        self._stabilizers = self._to_csr(stabilizer_supports)
+        self._logicals = self._to_csr(logical_supports)
+        # transposed supports, i.e. rows of each (swapped) bsf column, built on first use by sparse methods
+        self._stabilizers_t = None
+        self._logicals_t = None
+
+    def to_arrays(self):
+        """
+        Return the supports as arrays, e.g. to store as an artifact, see :meth:`from_arrays`.
+
+        :return: Number of qubits and CSR supports of stabilizers and logicals.
+        :rtype: dict of str to numpy.array
+        """
+        return {'n_qubits': np.array(self._n_qubits),
+                'stabilizers_indptr': self._stabilizers[0], 'stabilizers_indices': self._stabilizers[1],
+                'logicals_indptr': self._logicals[0], 'logicals_indices': self._logicals[1]}
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        """
+        Return code supports from arrays returned by :meth:`to_arrays`, without building the code.
+
+        :param arrays: Number of qubits and CSR supports of stabilizers and logicals.
+        :type arrays: dict of str to numpy.array
+        :return: Code supports.
+        :rtype: CodeSupports
+        """
+        supports = object.__new__(cls)
+        supports._n_qubits = int(arrays['n_qubits'])
+        supports._stabilizers = arrays['stabilizers_indptr'], arrays['stabilizers_indices']
+        supports._logicals = arrays['logicals_indptr'], arrays['logicals_indices']
+        supports._stabilizers_t = None
+        supports._logicals_t = None
+        return supports
+
+    def _to_csr(self, supports):
+        """Return (indptr, indices) of given supports, with X and Z halves swapped for the symplectic product."""
+        indptr = np.cumsum([0] + [len(support) for support in supports])
+        indices = np.concatenate(supports) if supports else np.zeros(0, dtype=int)
+        indices = (indices + self._n_qubits) % (2 * self._n_qubits)
+        return indptr, indices
+
+    @property
+    def n_qubits(self):
+        """
+        Number of physical qubits.
+
+        :rtype: int
+        """
+        return self._n_qubits
+
+    @property
+    def n_stabilizers(self):
+        """
+        Number of stabilizers, i.e. length of syndromes.
+
+        :rtype: int
+        """
+        return len(self._stabilizers[0]) - 1
+
+    @property
+    def n_logicals(self):
+        """
+        Number of logicals.
+
+        :rtype: int
+        """
+        return len(self._logicals[0]) - 1
+
+    def stabilizer_supports(self):
+        """
+        Return the bsf columns of each stabilizer.
+
+        :return: Supports of stabilizers, in the order of ``code.stabilizers``.
+        :rtype: list of numpy.array (1d)
+        """
+        return self._supports(*self._stabilizers)
+
+    def logical_supports(self):
+        """
+        Return the bsf columns of each logical.
+
+        :return: Supports of logicals, in the order of ``code.logicals``.
+        :rtype: list of numpy.array (1d)
+        """
+        return self._supports(*self._logicals)
+
+    def _supports(self, indptr, indices):
+        indices = (indices + self._n_qubits) % (2 * self._n_qubits)
+        return [np.sort(indices[a:b]) for a, b in zip(indptr[:-1], indptr[1:])]
+
+    @staticmethod
+    def _products(indptr, indices, errors, packed):
+        """Return binary symplectic products of errors with CSR rows (with pre-swapped indices)."""
+        errors = np.asarray(errors)
+        if packed:
+            # (2n, words) -> (n_rows, words)
+            gathered = errors[indices]
+            axis = 0
+        else:
+            # (shots, 2n) -> (shots, n_rows)
+            gathered = np.asarray(errors, dtype=np.uint8)[:, indices]
+            axis = 1
+        n_rows = len(indptr) - 1
+        if not len(indices):
+            shape = (n_rows, errors.shape[1]) if packed else (errors.shape[0], n_rows)
+            return np.zeros(shape, dtype=gathered.dtype)
+        starts = np.minimum(indptr[:-1], len(indices) - 1)
+        products = np.bitwise_xor.reduceat(gathered, starts, axis=axis)
+        # reduceat returns a single element (not zero) for empty rows
+        empty = indptr[:-1] == indptr[1:]
+        if empty.any():
+            if packed:
+                products[empty] = 0
+            else:
+                products[:, empty] = 0
+        return products
+
+    def _transpose(self, indptr, indices):
+        """Return (indptr, rows) such that the rows with (swapped) bsf column c are rows[indptr[c]:indptr[c + 1]]."""
+        rows = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+        order = np.argsort(indices, kind='stable')
+        col_indptr = np.concatenate(([0], np.cumsum(np.bincount(indices, minlength=2 * self._n_qubits))))
+        return col_indptr, rows[order]
+
+    def _sparse_products(self, transposed, n_rows, shot_indices, bsf_indices, shots):
+        """Return binary symplectic products of sparse flips with rows, given transposed supports."""
+        col_indptr, col_rows = transposed
+        bsf_indices = np.asarray(bsf_indices, dtype=np.intp)
+        starts = col_indptr[bsf_indices]
+        counts = col_indptr[bsf_indices + 1] - starts
+        # expand each flip into the rows it anticommutes with
+        offsets = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+        products = np.zeros((shots, n_rows), dtype=np.uint8)
+        np.bitwise_xor.at(products, (np.repeat(shot_indices, counts), col_rows[offsets]), 1)
+        return products
+
+    def syndromes_sparse(self, shot_indices, bsf_indices, shots):
+        """
+        Return the syndromes of errors given as sparse bsf flips, e.g. as sampled by ``generate_sparse``.
+
+        Notes:
+
+        * The cost scales with the number of flips rather than the number of qubits.
+        * Repeated flips of the same bit in the same shot cancel.
+
+        :param shot_indices: Shot index of each flip.
+        :type shot_indices: numpy.array (1d)
+        :param bsf_indices: Bsf index of each flip.
+        :type bsf_indices: numpy.array (1d)
+        :param shots: Number of shots.
+        :type shots: int
+        :return: Syndromes, one per row.
+        :rtype: numpy.array (2d) of uint8 with shape (shots, n_stabilizers)
+        """
+        if self._stabilizers_t is None:
+            self._stabilizers_t = self._transpose(*self._stabilizers)
+        return self._sparse_products(self._stabilizers_t, self.n_stabilizers, shot_indices, bsf_indices, shots)
+
+    def logical_commutations_sparse(self, shot_indices, bsf_indices, shots):
+        """
+        Return the logical commutations of errors given as sparse bsf flips.
+
+        See :meth:`syndromes_sparse` for parameters; the returned array has n_logicals in place of n_stabilizers.
+        """
+        if self._logicals_t is None:
+            self._logicals_t = self._transpose(*self._logicals)
+        return self._sparse_products(self._logicals_t, self.n_logicals, shot_indices, bsf_indices, shots)
+
+    def fault_map(self, measurement_flips=False):
+        """
+        Return the map of error columns to the syndrome bits and logical commutations they flip.
+
+        Notes:
+
+        * The map is in CSR format, i.e. bsf column c of an error flips the columns ``indices[indptr[c]:indptr[c + 1]]``
+          of (syndrome bits followed by logical commutations), see :meth:`FaultTable.map_columns`.
+        * If measurement_flips, the bsf columns are followed by one column per syndrome bit, each flipping that bit,
+          as sampled by :class:`MeasurementFlipLayer`.
+
+        :param measurement_flips: If columns include measurement flips of syndrome bits. (default=False)
+        :type measurement_flips: bool
+        :return: CSR index pointer and indices of the map.
+        :rtype: 2-tuple of numpy.array (1d)
+        """
+        if self._stabilizers_t is None:
+            self._stabilizers_t = self._transpose(*self._stabilizers)
+        if self._logicals_t is None:
+            self._logicals_t = self._transpose(*self._logicals)
+        n_bsf, n_stabilizers = 2 * self._n_qubits, self.n_stabilizers
+        (stabilizers_indptr, stabilizers_rows), (logicals_indptr, logicals_rows) = self._stabilizers_t, self._logicals_t
+        columns = [np.repeat(np.arange(n_bsf), np.diff(stabilizers_indptr)),
+                   np.repeat(np.arange(n_bsf), np.diff(logicals_indptr))]
+        rows = [stabilizers_rows, logicals_rows + n_stabilizers]
+        n_columns = n_bsf
+        if measurement_flips:
+            columns.append(n_bsf + np.arange(n_stabilizers))
+            rows.append(np.arange(n_stabilizers))
+            n_columns += n_stabilizers
+        columns, rows = np.concatenate(columns), np.concatenate(rows)
+        order = np.argsort(columns, kind='stable')
+        indptr = np.concatenate(([0], np.cumsum(np.bincount(columns, minlength=n_columns))))
+        return indptr, rows[order]
+
+    def syndromes(self, errors, packed=False):
+        r"""
+        Return the syndromes of the given errors, i.e. errors :math:`\odot` ``code.stabilizers``:math:`^T`.
+
+        :param errors: Errors in bsf format, one per row, or packed as by :func:`pack_shots` if packed.
+        :type errors: numpy.array (2d) with shape (shots, 2 * n_qubits), or (2 * n_qubits, words) of uint64 if packed
+        :param packed: If errors are bit-packed along the shots axis. (default=False)
+        :type packed: bool
+        :return: Syndromes, one per row, or packed along the shots axis if packed.
+        :rtype: numpy.array (2d) of uint8 with shape (shots, n_stabilizers), or (n_stabilizers, words) if packed
+        """
+        return self._products(*self._stabilizers, errors, packed)
+
+    def logical_commutations(self, errors, packed=False):
+        r"""
+        Return the logical commutations of the given errors, i.e. errors :math:`\odot` ``code.logicals``:math:`^T`.
+
+        See :meth:`syndromes` for parameters; the returned array has n_logicals in place of n_stabilizers.
+        """
+        return self._products(*self._logicals, errors, packed)
+
+    def resolve(self, errors, recoveries, packed=False):
+        """
+        Resolve the outcomes of applying the given recoveries to the given errors.
+
+        :param errors: Errors in bsf format, see :meth:`syndromes`.
+        :type errors: numpy.array (2d)
+        :param recoveries: Recoveries in bsf format, in the same format as errors.
+        :type recoveries: numpy.array (2d)
+        :param packed: If errors and recoveries are bit-packed along the shots axis. (default=False)
+        :type packed: bool
+        :return: Flags if recovered errors commute with all stabilizers, and their logical commutations.
+        :rtype: 2-tuple of (numpy.array (1d) of bool with shape (shots,) or (words,) of uint64 if packed,
+            numpy.array (2d) as returned by :meth:`logical_commutations`)
+        """
+        recovered = np.bitwise_xor(errors, recoveries)
+        syndromes = self.syndromes(recovered, packed)
+        if packed:
+            # bit i of each word is set if shot i returns to codespace, i.e. its syndrome bits are all clear
+            commutes_with_stabilizers = ~np.bitwise_or.reduce(syndromes, axis=0)
+        else:
+            commutes_with_stabilizers = ~syndromes.any(axis=1)
+        return commutes_with_stabilizers, self.logical_commutations(recovered, packed)
+
+    def __repr__(self):
+        return '{}(n_qubits={}, n_stabilizers={}, n_logicals={})'.format(
+            type(self).__name__, self.n_qubits, self.n_stabilizers, self.n_logicals)
+
+
+@functools.lru_cache(maxsize=2 ** 8)
+def code_supports(code):
+    """
+    Return the (cached) compact code representation of the given code.
+
+    Notes:
+
+    * Supports are stored in the artifact cache, if enabled, so a code is built once per machine, see
+      :class:`ArtifactCache`.
+
+    :param code: Planar or rotated planar code.
+    :type code: StabilizerCode
+    :return: Code supports.
+    :rtype: CodeSupports
+    """
+    return CodeSupports.from_arrays(artifact_cache().get(code, 'supports', lambda: CodeSupports(code).to_arrays()))
@@ -0,0 +1,562 @@
+import abc
+import contextlib
+import functools
+
+import numpy as np
+
+from models.common._codesupports import code_supports
+from models.common._paulichannel import TWO_QUBIT_PAULIS, AliasTable
+from models.common._sparsesampling import sample_faults
+
+
+def _expand_csr(indptr, indices, keys, rows):
+    """Return keys and CSR entries of rows, with each key repeated for each entry of its row."""
+    starts = indptr[rows]
+    counts = indptr[rows + 1] - starts
+    offsets = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+    return np.repeat(keys, counts), indices[offsets]
+
+
+class FaultTable:
+    """
+    Compiled noise: independent fault locations, each with mutually exclusive outcomes that flip sets of columns.
+
+    Notes:
+
+    * Columns are the bsf columns of errors, optionally followed by one column per syndrome bit for measurement flips.
+    * Location l faults with probability P_l, the sum of the probabilities of its outcomes, and a fault selects one of
+      its outcomes in proportion to their probabilities.
+    * Outcome flips are stored in CSR format, i.e. outcome o flips the columns ``indices[indptr[o]:indptr[o + 1]]``.
+    * Sampling draws faults with a Bernoulli mask over (shots x locations) by :func:`sample_faults`, whose cost scales
+      with the number of faults, selects their outcome in O(1) each from the :class:`AliasTable` of the conditional
+      outcome probabilities of all locations (one row per location), and XORs the flips of the outcomes.
+    """
+
+    def __init__(self, n_columns, probabilities, flips):
+        """
+        Initialise new fault table.
+
+        :param n_columns: Number of columns.
+        :type n_columns: int
+        :param probabilities: Probability of each outcome of each location.
+        :type probabilities: numpy.array (2d) with shape (n_locations, n_outcomes)
+        :param flips: Columns flipped by each outcome of each location, padded with -1.
+        :type flips: numpy.array (3d) of int with shape (n_locations, n_outcomes, max_flips)
+        :raises ValueError: if probabilities are not >= 0, or outcomes of a location have total probability > 1.
+        """
+        probabilities = np.asarray(probabilities, dtype=float)
+        flips = np.asarray(flips, dtype=np.intp)
+        totals = probabilities.sum(axis=1) if probabilities.size else np.zeros(len(probabilities))
+        if not (np.all(probabilities >= 0) and np.all(totals <= 1 + 1e-12)):
+            raise ValueError('{} valid probabilities are >= 0 with total <= 1 per location'.format(
+                type(self).__name__))
+        # drop locations that never fault
+        active = totals > 0
+        probabilities, flips, totals = probabilities[active], flips[active], totals[active]
+        n_locations, n_outcomes = probabilities.shape
+        self._n_columns = n_columns
+        self._probabilities = np.minimum(totals, 1.0)
+        # alias tables of outcomes conditioned on a fault, one row per location
+        self._n_outcomes = n_outcomes
+        self._outcome_table = AliasTable(probabilities.reshape(n_locations, n_outcomes)) if n_locations else None
+        # CSR flips of outcomes
+        flips = flips.reshape(n_locations * n_outcomes, flips.shape[2])
+        valid = flips >= 0
+        self._indptr = np.concatenate(([0], np.cumsum(valid.sum(axis=1))))
+        self._indices = flips[valid]
+
+    @property
+    def n_columns(self):
+        """
+        Number of columns, i.e. bsf columns and any measurement flip columns.
+
+        :rtype: int
+        """
+        return self._n_columns
+
+    @property
+    def n_locations(self):
+        """
+        Number of fault locations with non-zero fault probability.
+
+        :rtype: int
+        """
+        return len(self._probabilities)
+
+    @property
+    def location_probabilities(self):
+        """
+        Fault probability of each location.
+
+        :rtype: numpy.array (1d)
+        """
+        return self._probabilities
+
+    def sample_outcomes(self, shots, rng):
+        """
+        Sample the outcomes of faults over a batch of shots.
+
+        :param shots: Number of shots.
+        :type shots: int
+        :param rng: Random number generator.
+        :type rng: numpy.random.Generator
+        :return: Shot indices and outcome indices of faults.
+        :rtype: 2-tuple of numpy.array (1d)
+        """
+        shot_indices, locations, draws = sample_faults(self.n_locations, self._probabilities, shots, rng)
+        if not len(locations):
+            return shot_indices, locations
+        # draws below the fault probability, rescaled to [0, 1), select the outcome of each fault
+        rnd = np.minimum(draws / self._probabilities[locations], 1.0)
+        return shot_indices, locations * self._n_outcomes + self._outcome_table.sample(rnd, locations)
+
+    def flips(self, shot_indices, outcomes):
+        """
+        Return the column flips of the given outcomes, e.g. as sampled by :meth:`sample_outcomes`.
+
+        :param shot_indices: Shot index of each outcome.
+        :type shot_indices: numpy.array (1d)
+        :param outcomes: Outcome indices.
+        :type outcomes: numpy.array (1d)
+        :return: Shot indices and column indices of flips, where repeated flips of the same column cancel.
+        :rtype: 2-tuple of numpy.array (1d)
+        """
+        return _expand_csr(self._indptr, self._indices, shot_indices, outcomes)
+
+    def sample_sparse(self, shots, rng):
+        """
+        Sample faults over a batch of shots as sparse column flips.
+
+        :param shots: Number of shots.
+        :type shots: int
+        :param rng: Random number generator.
+        :type rng: numpy.random.Generator
+        :return: Shot indices and column indices of flips, where repeated flips of the same column cancel.
+        :rtype: 2-tuple of numpy.array (1d)
+        """
+        return self.flips(*self.sample_outcomes(shots, rng))
+
+    def sample(self, shots, rng):
+        """
+        Sample faults over a batch of shots as dense column flips.
+
+        Flips are XORed straight into the uint8 result, so no wider intermediate array of the same size is formed.
+
+        See :meth:`sample_sparse` for parameters.
+
+        :return: Column flips, one row per shot.
+        :rtype: numpy.array (2d) of uint8 with shape (shots, n_columns)
+        """
+        shot_indices, columns = self.sample_sparse(shots, rng)
+        flips = np.zeros((shots, self._n_columns), dtype=np.uint8)
+        np.bitwise_xor.at(flips, (shot_indices, columns), 1)
+        return flips
+
+    def sample_packed(self, shots, rng):
+        """
+        Sample faults over a batch of shots as column flips bit-packed along the shots axis, see :func:`pack_shots`.
+
+        Flips are XORed straight into the packed words, so the dense (shots, n_columns) array is never formed.
+
+        See :meth:`sample_sparse` for parameters.
+
+        :return: Packed column flips.
+        :rtype: numpy.array (2d) of uint64 with shape (n_columns, ceil(shots / 64))
+        """
+        shot_indices, columns = self.sample_sparse(shots, rng)
+        packed = np.zeros((self._n_columns, -(-shots // 64)), dtype=np.uint64)
+        bits = np.left_shift(np.uint64(1), (shot_indices % 64).astype(np.uint64))
+        np.bitwise_xor.at(packed, (columns, shot_indices // 64), bits)
+        return packed
+
+    def map_columns(self, n_columns, indptr, indices):
+        """
+        Return a fault table with the same locations and outcomes, whose outcomes flip mapped columns.
+
+        Notes:
+
+        * Column c of this table is mapped to the columns ``indices[indptr[c]:indptr[c + 1]]`` of the new table, and
+          each outcome flips the parity of the mapped columns of its flips.
+        * Outcomes are shared, so outcomes sampled by :meth:`sample_outcomes` of either table can be expanded by
+          :meth:`flips` of both, e.g. into errors and into syndromes of the same faults.
+
+        :param n_columns: Number of columns of the new table.
+        :type n_columns: int
+        :param indptr: CSR index pointer of the map, of length n_columns of this table + 1.
+        :type indptr: numpy.array (1d)
+        :param indices: CSR columns of the map.
+        :type indices: numpy.array (1d)
+        :return: Fault table with mapped columns.
+        :rtype: FaultTable
+        """
+        n_outcomes = len(self._indptr) - 1
+        outcomes = np.repeat(np.arange(n_outcomes), np.diff(self._indptr))
+        # expand each flip into its mapped columns, and keep mapped columns flipped an odd number of times
+        outcomes, columns = _expand_csr(indptr, indices, outcomes, self._indices)
+        keys, counts = np.unique(outcomes * n_columns + columns, return_counts=True)
+        keys = keys[counts % 2 == 1]
+        outcomes, columns = np.divmod(keys, n_columns)
+        table = object.__new__(FaultTable)
+        table.__dict__.update(self.__dict__)
+        table._n_columns = n_columns
+        table._indptr = np.concatenate(([0], np.cumsum(np.bincount(outcomes, minlength=n_outcomes))))
+        table._indices = columns
+        return table
+
+    def __repr__(self):
+        return '{}(n_columns={}, n_locations={})'.format(type(self).__name__, self.n_columns, self.n_locations)
+
+
+class NoiseLayer(metaclass=abc.ABCMeta):
+    """
+    Layer of a :class:`NoisePipeline`.
+
+    Layers are declared once and evaluated per code and parameters by :meth:`faults`. Each layer reads the
+    parameters it depends on by name, so layers of different models can be stacked freely.
+    """
+
+    @abc.abstractmethod
+    def faults(self, code, params):
+        """
+        Return the fault locations of this layer on the given code.
+
+        :param code: Stabilizer code.
+        :type code: StabilizerCode
+        :param params: Parameters of the pipeline, e.g. ``{'error_probability': 0.1}``.
+        :type params: dict
+        :return: Probability of each outcome of each location, and columns flipped by each outcome padded with -1,
+            where columns are bsf columns followed by syndrome bits (see :class:`MeasurementFlipLayer`).
+        :rtype: 2-tuple of numpy.array (2d) with shape (n_locations, n_outcomes) and numpy.array (3d) of int
+        """
+
+
+# columns flipped by X, Y, Z on qubit q as offsets (0 for X half, 1 for Z half, -1 for none)
+_PAULI_HALVES = np.array([[0, -1], [0, 1], [1, -1]])
+
+
+class SingleQubitPauliLayer(NoiseLayer):
+    """
+    Independent single-qubit Pauli errors, with probabilities (p_x, p_y, p_z) of each qubit.
+
+    Subclasses define the probabilities by :meth:`pauli_probabilities`.
+    """
+
+    @abc.abstractmethod
+    def pauli_probabilities(self, code, params):
+        """
+        Return the probabilities of X, Y, Z errors of each qubit.
+
+        :param code: Stabilizer code.
+        :type code: StabilizerCode
+        :param params: Parameters of the pipeline.
+        :type params: dict
+        :return: Probabilities (p_x, p_y, p_z) of each qubit, in bsf qubit order.
+        :rtype: numpy.array (2d) with shape (n_qubits, 3)
+        """
+
+    def faults(self, code, params):
+        """See :meth:`NoiseLayer.faults`"""
+        n_qubits = code.n_k_d[0]
+        qubits = np.arange(n_qubits)[:, np.newaxis, np.newaxis]
+        flips = np.where(_PAULI_HALVES >= 0, qubits + _PAULI_HALVES * n_qubits, -1)
+        # Y flips X and Z halves
+        flips[:, 1] = qubits[:, 0] + np.array([0, n_qubits])
+        return self.pauli_probabilities(code, params), flips
+
+
+class DepolarizingLayer(SingleQubitPauliLayer):
+    """
+    Single-qubit depolarizing errors, i.e. X, Y, Z each with probability p/3 on every qubit.
+    """
+
+    def __init__(self, parameter):
+        """
+        Initialise new depolarizing layer.
+
+        :param parameter: Name of the error probability parameter.
+        :type parameter: str
+        """
+        self._parameter = parameter
+
+    def pauli_probabilities(self, code, params):
+        """See :meth:`SingleQubitPauliLayer.pauli_probabilities`"""
+        return np.full((code.n_k_d[0], 3), params[self._parameter] / 3)
+
+    def __repr__(self):
+        return '{}({!r})'.format(type(self).__name__, self._parameter)
+
+
+# lookup table of offsets of columns flipped by each non-identity 2-qubit Pauli: (qubit 1 or 2, X or Z half)
+def _two_qubit_flip_offsets():
+    offsets = np.full((len(TWO_QUBIT_PAULIS) - 1, 4, 2), -1)
+    for i, pauli in enumerate(TWO_QUBIT_PAULIS[1:]):
+        for j, op in enumerate(pauli):
+            if op in 'XY':
+                offsets[i, 2 * j] = (j, 0)
+            if op in 'ZY':
+                offsets[i, 2 * j + 1] = (j, 1)
+    return offsets
+
+
+_TWO_QUBIT_FLIP_OFFSETS = _two_qubit_flip_offsets()
+
+
+class BondPauliLayer(NoiseLayer):
+    """
+    Independent 2-qubit Pauli errors on bonds (pairs of qubits), see :class:`TwoQubitPauliChannel`.
+
+    Each bond is hit with its error probability p, in which case the 2-qubit Pauli is drawn from the distribution of
+    the channel, i.e. the outcomes of a bond are the 15 non-identity Paulis with probabilities p D(P).
+    """
+
+    def __init__(self, channel, parameter, bonds):
+        """
+        Initialise new bond layer.
+
+        :param channel: 2-qubit Pauli channel.
+        :type channel: TwoQubitPauliChannel
+        :param parameter: Name of the error probability parameter.
+        :type parameter: str
+        :param bonds: Function of (code, error probability) returning the first and second qubit of each bond and
+            the error probability of each bond (common or one per bond), e.g. including any boundary rescaling.
+        :type bonds: callable
+        """
+        self._channel = channel
+        self._parameter = parameter
+        self._bonds = bonds
+
+    def faults(self, code, params):
+        """See :meth:`NoiseLayer.faults`"""
+        n_qubits = code.n_k_d[0]
+        qubits_1, qubits_2, probability = self._bonds(code, params[self._parameter])
+        probability = np.broadcast_to(np.minimum(probability, 1.0), qubits_1.shape)
+        weights = np.array(self._channel.distribution[1:])
+        # columns: qubit + half * n_qubits, with qubit taken from first or second qubit of the bond
+        which, half = _TWO_QUBIT_FLIP_OFFSETS[..., 0], _TWO_QUBIT_FLIP_OFFSETS[..., 1]
+        qubits = np.where(which == 0, qubits_1[:, np.newaxis, np.newaxis], qubits_2[:, np.newaxis, np.newaxis])
+        flips = np.where(which >= 0, qubits + half * n_qubits, -1)
+        return probability[:, np.newaxis] * weights, flips
+
+    def __repr__(self):
+        return '{}({!r}, {!r}, {!r})'.format(type(self).__name__, self._channel, self._parameter, self._bonds)
+
+
+class MeasurementFlipLayer(NoiseLayer):
+    """
+    Independent flips of syndrome bits, each with the measurement error probability.
+
+    Flips are in the columns following the bsf columns, one per stabilizer in the order of ``code.stabilizers``.
+    """
+
+    def __init__(self, parameter):
+        """
+        Initialise new measurement flip layer.
+
+        :param parameter: Name of the measurement error probability parameter.
+        :type parameter: str
+        """
+        self._parameter = parameter
+
+    def faults(self, code, params):
+        """See :meth:`NoiseLayer.faults`"""
+        n_stabilizers = code_supports(code).n_stabilizers
+        probabilities = np.full((n_stabilizers, 1), params[self._parameter], dtype=float)
+        flips = (2 * code.n_k_d[0] + np.arange(n_stabilizers)).reshape(-1, 1, 1)
+        return probabilities, flips
+
+    def __repr__(self):
+        return '{}({!r})'.format(type(self).__name__, self._parameter)
+
+
+class NoisePipeline:
+    """
+    Noise model declared as stacked layers, compiled once per code and parameters into a :class:`FaultTable`.
+
+    Notes:
+
+    * Layers are independent, so the errors of the pipeline are the XOR of the errors of its layers.
+    * Compiled fault tables are cached, so repeated sampling with the same code and parameters only samples. Within
+      :meth:`uncached`, tables are compiled afresh and not cached, e.g. for parameters that are used only once.
+    * Columns of sampled flips are the bsf columns of errors, followed by syndrome bits if any layer is a
+      :class:`MeasurementFlipLayer`.
+
+    For example, the depolarizing single-qubit + XZ error model::
+
+        NoisePipeline([DepolarizingLayer('error_probability_1'),
+                       BondPauliLayer(two_qubit_channel((('XZ', 0.5), ('ZX', 0.5))), 'error_probability', bonds)])
+    """
+
+    def __init__(self, layers):
+        """
+        Initialise new noise pipeline.
+
+        :param layers: Noise layers.
+        :type layers: sequence of NoiseLayer
+        """
+        self._layers = tuple(layers)
+        self._uncached = 0  # depth of uncached contexts
+
+    @property
+    def layers(self):
+        """
+        Noise layers.
+
+        :rtype: tuple of NoiseLayer
+        """
+        return self._layers
+
+    @contextlib.contextmanager
+    def uncached(self):
+        """
+        Context in which :meth:`compile` and :meth:`compile_syndromes` neither read nor fill their caches.
+
+        Notes:
+
+        * Use for parameters that are used only once, e.g. the drifted error probabilities of each block of
+          :class:`DriftingErrorModel`, so their fault tables are released after use instead of filling the caches.
+
+        :return: Context manager yielding this pipeline.
+        :rtype: contextmanager
+        """
+        self._uncached += 1
+        try:
+            yield self
+        finally:
+            self._uncached -= 1
+
+    def compile(self, code, **params):
+        """
+        Return the (cached) fault table of the pipeline for the given code and parameters.
+
+        :param code: Stabilizer code.
+        :type code: StabilizerCode
+        :param params: Parameters of layers, e.g. ``error_probability_1=0.01, error_probability=0.02``.
+        :type params: float
+        :return: Fault table.
+        :rtype: FaultTable
+        """
+        if self._uncached:
+            return self.build(code, **params)
+        return self._compile(code, **params)
+
+    @functools.lru_cache(maxsize=2 ** 8)
+    def _compile(self, code, **params):
+        """Return cached fault table, see :meth:`compile`."""
+        return self.build(code, **params)
+
+    def build(self, code, **params):
+        """
+        Return a new (uncached) fault table of the pipeline for the given code and parameters.
+
+        :param code: Stabilizer code.
+        :type code: StabilizerCode
+        :param params: Parameters of layers, e.g. ``error_probability_1=0.01, error_probability=0.02``.
+        :type params: float
+        :return: Fault table.
+        :rtype: FaultTable
+        """
+        n_columns = 2 * code.n_k_d[0]
+        if any(isinstance(layer, MeasurementFlipLayer) for layer in self._layers):
+            n_columns += code_supports(code).n_stabilizers
+        # pad outcomes and flips of layers to common shapes
+        faults = [layer.faults(code, params) for layer in self._layers]
+        n_outcomes = max((p.shape[1] for p, _ in faults), default=1)
+        max_flips = max((f.shape[2] for _, f in faults), default=1)
+        probabilities = np.concatenate(
+            [np.pad(p, ((0, 0), (0, n_outcomes - p.shape[1]))) for p, _ in faults]
+            or [np.zeros((0, n_outcomes))])
+        flips = np.concatenate(
+            [np.pad(f, ((0, 0), (0, n_outcomes - f.shape[1]), (0, max_flips - f.shape[2])), constant_values=-1)
+             for _, f in faults] or [np.zeros((0, n_outcomes, max_flips), dtype=int)])
+        return FaultTable(n_columns, probabilities, flips)
+
+    def compile_syndromes(self, code, **params):
+        """
+        Return the (cached) fault table of the pipeline mapped to syndrome bits and logical commutations.
+
+        Notes:
+
+        * Outcomes are shared with the fault table returned by :meth:`compile`, see :meth:`FaultTable.map_columns`.
+        * Columns are the syndrome bits (including any measurement flips) followed by the logical commutations, i.e.
+          n_stabilizers + n_logicals columns, see :meth:`CodeSupports.fault_map`.
+
+        See :meth:`compile` for parameters.
+
+        :return: Fault table of syndrome bits and logical commutations.
+        :rtype: FaultTable
+        """
+        if self._uncached:
+            return self._map_syndromes(code, self.build(code, **params))
+        return self._compile_syndromes(code, **params)
+
+    @functools.lru_cache(maxsize=2 ** 8)
+    def _compile_syndromes(self, code, **params):
+        """Return cached fault table of syndrome bits and logical commutations, see :meth:`compile_syndromes`."""
+        return self._map_syndromes(code, self.compile(code, **params))
+
+    @staticmethod
+    def _map_syndromes(code, table):
+        """Return the given fault table mapped to syndrome bits and logical commutations."""
+        supports = code_supports(code)
+        fault_map = supports.fault_map(measurement_flips=table.n_columns > 2 * code.n_k_d[0])
+        return table.map_columns(supports.n_stabilizers + supports.n_logicals, *fault_map)
+
+    def sample_syndromes(self, code, shots, rng=None, packed=False, **params):
+        """
+        Sample a batch of syndromes and logical commutations of errors, without forming the errors.
+
+        :param code: Stabilizer code.
+        :type code: StabilizerCode
+        :param shots: Number of shots.
+        :type shots: int
+        :param rng: Random number generator. (default=None resolves to numpy.random.default_rng())
+        :type rng: numpy.random.Generator
+        :param packed: If results are bit-packed along the shots axis, see :func:`pack_shots`. (default=False)
+        :type packed: bool
+        :param params: Parameters of layers.
+        :type params: float
+        :return: Syndromes and logical commutations, one row per shot, or packed along the shots axis if packed.
+        :rtype: 2-tuple of numpy.array (2d) of uint8 with shapes (shots, n_stabilizers) and (shots, n_logicals), or
+            of uint64 with shapes (n_stabilizers, words) and (n_logicals, words) if packed
+        """
+        rng = np.random.default_rng() if rng is None else rng
+        table = self.compile_syndromes(code, **params)
+        n_stabilizers = code_supports(code).n_stabilizers
+        if packed:
+            flips = table.sample_packed(shots, rng)
+            return flips[:n_stabilizers], flips[n_stabilizers:]
+        flips = table.sample(shots, rng)
+        return flips[:, :n_stabilizers], flips[:, n_stabilizers:]
+
+    def sample(self, code, shots, rng=None, **params):
+        """
+        Sample a batch of column flips, see :meth:`FaultTable.sample`.
+
+        :param code: Stabilizer code.
+        :type code: StabilizerCode
+        :param shots: Number of shots.
+        :type shots: int
+        :param rng: Random number generator. (default=None resolves to numpy.random.default_rng())
+        :type rng: numpy.random.Generator
+        :param params: Parameters of layers.
+        :type params: float
+        :return: Column flips, one row per shot.
+        :rtype: numpy.array (2d) of uint8 with shape (shots, n_columns)
+        """
+        rng = np.random.default_rng() if rng is None else rng
+        return self.compile(code, **params).sample(shots, rng)
+
+    def sample_sparse(self, code, shots, rng=None, **params):
+        """
+        Sample a batch of sparse column flips, see :meth:`FaultTable.sample_sparse`.
+
+        See :meth:`sample` for parameters.
+
+        :return: Shot indices and column indices of flips.
+        :rtype: 2-tuple of numpy.array (1d)
+        """
+        rng = np.random.default_rng() if rng is None else rng
+        return self.compile(code, **params).sample_sparse(shots, rng)
+
+    def __repr__(self):
+        return '{}({!r})'.format(type(self).__name__, list(self._layers))
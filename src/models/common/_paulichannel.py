@@ -0,0 +1,136 @@
+import functools
+import math
+from collections.abc import Mapping
+
+import numpy as np
+
+#: 2-qubit Paulis in the order of distributions, where the first letter applies to the first qubit of each bond.
+TWO_QUBIT_PAULIS = tuple(a + b for a in 'IXYZ' for b in 'IXYZ')
+
+
+class AliasTable:
+    """
+    Walker alias table for sampling outcomes of a discrete probability distribution in O(1) per sample.
+
+    Notes:
+
+    * The table is built once per distribution in O(k) for k outcomes.
+    * Each sample takes a single uniform draw u in [0, 1): column ``floor(k * u)`` is selected and the fractional part
+      of ``k * u`` is compared against the column threshold to choose between the column and its alias.
+    * Several distributions over the same number of outcomes may be given as the rows of a 2d array. Their tables are
+      built together, pairing one small with one large column of every row per step, and each draw is mapped by the
+      table of its row, e.g. the outcomes of the fault locations of a :class:`FaultTable`.
+    """
+
+    def __init__(self, probabilities):
+        """
+        Initialise new alias table.
+
+        :param probabilities: Relative probabilities of outcomes (normalized internally), or one row of relative
+            probabilities per distribution.
+        :type probabilities: sequence of float or numpy.array (2d)
+        :raises ValueError: if probabilities are not non-negative finite numbers with a positive sum (per row).
+        """
+        probabilities = np.asarray(probabilities, dtype=float)
+        totals = probabilities.sum(axis=-1, keepdims=True)
+        if not (np.all(probabilities >= 0) and np.all(np.isfinite(totals)) and np.all(totals > 0)):
+            raise ValueError('{} valid probabilities are numbers >= 0 with sum > 0'.format(type(self).__name__))
+        k = probabilities.shape[-1]
+        scaled = (probabilities * (k / totals)).reshape(-1, k)
+        thresholds = np.ones(scaled.shape)
+        aliases = np.tile(np.arange(k), (len(scaled), 1))
+        paired = np.zeros(scaled.shape, dtype=bool)
+        for _ in range(k - 1):
+            small, large = (scaled < 1) & ~paired, (scaled >= 1) & ~paired
+            rows = np.flatnonzero(small.any(axis=1) & large.any(axis=1))
+            if not len(rows):
+                break
+            s, g = small[rows].argmax(axis=1), large[rows].argmax(axis=1)
+            thresholds[rows, s], aliases[rows, s] = scaled[rows, s], g
+            scaled[rows, g] -= 1 - scaled[rows, s]
+            paired[rows, s] = True
+        # any remaining outcomes fill their column (up to rounding error)
+        self._thresholds = thresholds.reshape(probabilities.shape)
+        self._aliases = aliases.reshape(probabilities.shape)
+
+    def sample(self, rnd, rows=None):
+        """
+        Map uniform draws to outcomes.
+
+        :param rnd: Uniform draws in [0, 1).
+        :type rnd: numpy.array
+        :param rows: Distribution of each draw, if the table has one row per distribution. (default=None)
+        :type rows: numpy.array of int with the same shape as rnd
+        :return: Outcome indices.
+        :rtype: numpy.array of int with the same shape as rnd
+        """
+        k = self._thresholds.shape[-1]
+        scaled = rnd * k
+        columns = np.minimum(scaled.astype(np.intp), k - 1)
+        index = columns if rows is None else (rows, columns)
+        return np.where(scaled - columns < self._thresholds[index], columns, self._aliases[index])
+
+
+class TwoQubitPauliChannel:
+    """
+    General 2-qubit Pauli channel applied independently to bonds (pairs of qubits).
+
+    Notes:
+
+    * With error probability p, the 2-qubit Pauli applied to each bond is distributed as (1 - p) II + p D, where D is
+      the given distribution over :data:`TWO_QUBIT_PAULIS`.
+    * Error probabilities may be common to all bonds or given per bond (non-identically distributed bonds).
+    * The channel is sampled as a layer of a noise pipeline, see :class:`BondPauliLayer`, whose fault table selects
+      the Pauli of each faulty bond with an :class:`AliasTable`.
+
+    Use :func:`two_qubit_channel` to get a cached instance for a given distribution.
+    """
+
+    def __init__(self, distribution):
+        """
+        Initialise new 2-qubit Pauli channel.
+
+        :param distribution: Relative probabilities of 2-qubit Paulis as a mapping from Paulis (e.g. 'XZ', 'IX'), or
+            a sequence of 16 values in the order of :data:`TWO_QUBIT_PAULIS`.
+        :type distribution: mapping of str to float, or sequence of float
+        :raises ValueError: if distribution has unknown Paulis, or is not non-negative with a positive sum.
+        """
+        if isinstance(distribution, Mapping):
+            unknown = set(distribution) - set(TWO_QUBIT_PAULIS)
+            if unknown:
+                raise ValueError('{} unknown 2-qubit Paulis: {}'.format(type(self).__name__, sorted(unknown)))
+            distribution = [distribution.get(p, 0.0) for p in TWO_QUBIT_PAULIS]
+        weights = np.asarray(distribution, dtype=float)
+        if weights.shape != (len(TWO_QUBIT_PAULIS),):
+            raise ValueError('{} requires {} probabilities'.format(type(self).__name__, len(TWO_QUBIT_PAULIS)))
+        if not (np.all(weights >= 0) and math.isfinite(weights.sum()) and weights.sum() > 0):
+            raise ValueError('{} valid probabilities are numbers >= 0 with sum > 0'.format(type(self).__name__))
+        self._weights = weights / weights.sum()
+
+    @property
+    def distribution(self):
+        """
+        Normalized probabilities of 2-qubit Paulis, in the order of :data:`TWO_QUBIT_PAULIS`.
+
+        :rtype: tuple of float
+        """
+        return tuple(self._weights.tolist())
+
+    def __repr__(self):
+        return '{}({!r})'.format(type(self).__name__, {p: w for p, w in zip(TWO_QUBIT_PAULIS, self.distribution) if w})
+
+
+@functools.lru_cache(maxsize=2 ** 8)
+def two_qubit_channel(distribution):
+    """
+    Return the (cached) 2-qubit Pauli channel for the given distribution.
+
+    :param distribution: Relative probabilities of 2-qubit Paulis as a tuple of (Pauli, probability) pairs or of 16
+        values in the order of :data:`TWO_QUBIT_PAULIS`.
+    :type distribution: tuple
+    :return: 2-qubit Pauli channel.
+    :rtype: TwoQubitPauliChannel
+    """
+    if distribution and isinstance(distribution[0], tuple):
+        distribution = dict(distribution)
+    return TwoQubitPauliChannel(distribution)
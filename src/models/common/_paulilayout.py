@@ -0,0 +1,103 @@
+import numpy as np
+
+
+def css_layout(code):
+    """
+    Return the Pauli layout of the CSS planar code, see :func:`layout_operators`.
+
+    Notes:
+
+    * Plaquettes on the primal lattice (odd rows) are Z-type and plaquettes on the dual lattice (even rows) X-type, so
+      sites on even rows have Z to the north and south and X to the west and east, and sites on odd rows the reverse.
+
+    :param code: Planar code.
+    :type code: PlanarCode
+    :return: Paulis applied to each site by its north/south plaquettes (op_v) and by its west/east plaquettes (op_h).
+    :rtype: 2-tuple of numpy.array (2d) of str with shape (2 * rows - 1, 2 * cols - 1)
+    """
+    rows, cols = code.size
+    even_rows = (np.arange(2 * rows - 1) % 2 == 0)[:, np.newaxis]
+    shape = (2 * rows - 1, 2 * cols - 1)
+    op_v = np.where(np.broadcast_to(even_rows, shape), 'Z', 'X')
+    op_h = np.where(np.broadcast_to(even_rows, shape), 'X', 'Z')
+    return op_v, op_h
+
+
+def mmhh_layout(qubit_probabilities):
+    """
+    Return the Pauli layout of the MMHH code for the given local error probabilities, see :func:`layout_operators`.
+
+    Notes:
+
+    * The Paulis of each site are sorted from the least to the most probable (ties in the order X, Y, Z), as by
+      :meth:`PlanarPauliMMHH.qubit_paulis`, in one vectorized sort over all sites.
+    * Sites with (abs(row - col)) % 4 == 0 have the most probable Pauli (high) to the north and south and the second
+      most probable (medium) to the west and east, and sites with (abs(row - col)) % 4 == 2 the reverse.
+
+    :param qubit_probabilities: Pauli error probabilities (p_x, p_y, p_z) of each lattice index.
+    :type qubit_probabilities: numpy.array (3d) with shape (3, 2 * rows - 1, 2 * cols - 1)
+    :return: Paulis applied to each site by its north/south plaquettes (op_v) and by its west/east plaquettes (op_h).
+    :rtype: 2-tuple of numpy.array (2d) of str
+    """
+    order = np.argsort(qubit_probabilities, axis=0, kind='stable')
+    paulis = np.array(['X', 'Y', 'Z'])
+    high, medium = paulis[order[2]], paulis[order[1]]
+    rows, cols = np.indices(qubit_probabilities.shape[1:])
+    vertical_high = abs(rows - cols) % 4 == 0
+    return np.where(vertical_high, high, medium), np.where(vertical_high, medium, high)
+
+
+def layout_operators(code, op_v, op_h):
+    """
+    Return the stabilizers and logicals of a planar code given by its Pauli layout, built in one vectorized pass.
+
+    Notes:
+
+    * The plaquette at (r, c) applies op_v of the sites (r - 1, c) and (r + 1, c) and op_h of the sites (r, c - 1) and
+      (r, c + 1), and sites outside the lattice are skipped, as by ``code.new_pauli().plaquette``.
+    * The logical X applies op_h of the sites of the rightmost column and the logical Z op_v of the sites of the
+      bottom row, as by ``code.new_pauli().logical_x`` and ``code.new_pauli().logical_z``.
+    * Matrices are uint8, 1/8 of the memory of int bsf, which keeps the stabilizers of a 100x100 code below 1 GB.
+    * Layouts of :class:`PlanarCodeXZ`, :class:`PlanarCodeCSS` and :class:`LocalCodeMMHH` are given by their
+      ``pauli_layout`` methods, see :func:`css_layout` and :func:`mmhh_layout`.
+
+    :param code: Planar code.
+    :type code: PlanarCode
+    :param op_v: Pauli ('X', 'Y' or 'Z') applied to each site by its north and south plaquettes.
+    :type op_v: numpy.array (2d) of str with shape (2 * rows - 1, 2 * cols - 1)
+    :param op_h: Pauli ('X', 'Y' or 'Z') applied to each site by its west and east plaquettes.
+    :type op_h: numpy.array (2d) of str with shape (2 * rows - 1, 2 * cols - 1)
+    :return: Stabilizers, logical Xs and logical Zs in bsf format, keyed by 'stabilizers', 'logical_xs' and
+        'logical_zs'.
+    :rtype: dict of str to numpy.array (2d) of uint8
+    """
+    rows, cols = code.size
+    n_qubits = code.n_k_d[0]
+    n_rows, n_cols = 2 * rows - 1, 2 * cols - 1
+
+    def flatten(r, c):
+        # see PlanarPauli._flatten_site_index
+        return (r // 2) * (cols - c % 2) + (c // 2) + (r % 2 * rows * cols)
+
+    def apply(bsf, targets, r, c, ops):
+        # flip (X, Z) bits of ops at in-bounds sites (r, c) of targets
+        valid = (r >= 0) & (r < n_rows) & (c >= 0) & (c < n_cols)
+        targets, r, c = targets[valid], r[valid], c[valid]
+        op = ops[r, c]
+        qubits = flatten(r, c)
+        bsf[targets, qubits] ^= ((op == 'X') | (op == 'Y')).astype(bsf.dtype)
+        bsf[targets, n_qubits + qubits] ^= ((op == 'Z') | (op == 'Y')).astype(bsf.dtype)
+
+    plaquettes = np.array(code._plaquette_indices).reshape(-1, 2)
+    pr, pc = plaquettes[:, 0], plaquettes[:, 1]
+    targets = np.arange(len(plaquettes))
+    stabilizers = np.zeros((len(plaquettes), 2 * n_qubits), dtype=np.uint8)
+    for dr, dc, ops in ((-1, 0, op_v), (1, 0, op_v), (0, -1, op_h), (0, 1, op_h)):
+        apply(stabilizers, targets, pr + dr, pc + dc, ops)
+    logical_xs = np.zeros((1, 2 * n_qubits), dtype=np.uint8)
+    r = np.arange(0, n_rows, 2)
+    apply(logical_xs, np.zeros_like(r), r, np.full_like(r, n_cols - 1), op_h)
+    logical_zs = np.zeros((1, 2 * n_qubits), dtype=np.uint8)
+    c = np.arange(0, n_cols, 2)
+    apply(logical_zs, np.zeros_like(c), np.full_like(c, n_rows - 1), c, op_v)
+    return {'stabilizers': stabilizers, 'logical_xs': logical_xs, 'logical_zs': logical_zs}
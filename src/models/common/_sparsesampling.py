@@ -0,0 +1,83 @@
+import numpy as np
+
+
+def _bernoulli_positions(n_trials, probability, rng):
+    """
+    Return sorted positions of successes among independent Bernoulli trials with equal probability.
+
+    Gaps between successes are geometrically distributed, so the cost is proportional to the number of successes
+    rather than the number of trials.
+    """
+    if n_trials <= 0 or probability <= 0:
+        return np.zeros(0, dtype=np.int64)
+    if probability >= 1:
+        return np.arange(n_trials, dtype=np.int64)
+    chunks = []
+    last = -1
+    while True:
+        # draw enough gaps to cover the remaining trials with high probability
+        expected = (n_trials - 1 - last) * probability
+        gaps = rng.geometric(probability, size=int(expected + 5 * np.sqrt(expected) + 16))
+        positions = last + np.cumsum(gaps)
+        if positions[-1] >= n_trials:
+            chunks.append(positions[positions < n_trials])
+            break
+        chunks.append(positions)
+        last = positions[-1]
+    return np.concatenate(chunks)
+
+
+def sample_faults(n_locations, probabilities, shots, rng):
+    """
+    Sample independent faults at a number of locations over a batch of shots.
+
+    Notes:
+
+    * Each location faults independently in each shot with the given probability.
+    * Candidate faults are sampled at the maximum probability by skipping geometrically distributed gaps over the
+      (shots x locations) trials, and then thinned to the probability of each location. The cost therefore scales
+      with the number of faults rather than the number of locations.
+    * Each fault comes with a uniform draw in [0, probability of its location), which callers use to select the
+      Pauli applied by the fault, e.g. ``draws * 3 / probability`` selects X, Y or Z with equal probability.
+
+    :param n_locations: Number of fault locations.
+    :type n_locations: int
+    :param probabilities: Fault probability, common to all locations or one per location.
+    :type probabilities: float or numpy.array (1d)
+    :param shots: Number of shots.
+    :type shots: int
+    :param rng: Random number generator.
+    :type rng: numpy.random.Generator
+    :return: Shot indices, location indices and uniform draws of faults, in order of increasing shot.
+    :rtype: 3-tuple of numpy.array (1d)
+    """
+    probabilities = np.asarray(probabilities, dtype=float)
+    max_probability = float(probabilities.max()) if probabilities.size else 0.0
+    positions = _bernoulli_positions(shots * n_locations, max_probability, rng)
+    shot_indices, location_indices = np.divmod(positions, n_locations)
+    draws = rng.random(len(positions)) * min(max_probability, 1.0)
+    if probabilities.ndim:
+        # thin candidates to the probability of each location
+        accepted = draws < probabilities[location_indices]
+        shot_indices, location_indices, draws = shot_indices[accepted], location_indices[accepted], draws[accepted]
+    return shot_indices, location_indices, draws
+
+
+def sparse_to_bsf(shot_indices, bsf_indices, shots, n_qubits):
+    """
+    Return the dense bsf errors of sparse flips, where repeated flips of the same bit cancel.
+
+    :param shot_indices: Shot index of each flip.
+    :type shot_indices: numpy.array (1d)
+    :param bsf_indices: Bsf index of each flip.
+    :type bsf_indices: numpy.array (1d)
+    :param shots: Number of shots.
+    :type shots: int
+    :param n_qubits: Number of qubits.
+    :type n_qubits: int
+    :return: Errors in bsf format, one per row.
+    :rtype: numpy.array (2d) of uint8 with shape (shots, 2 * n_qubits)
+    """
+    errors = np.zeros((shots, 2 * n_qubits), dtype=np.uint8)
+    np.bitwise_xor.at(errors, (shot_indices, bsf_indices), 1)
+    return errors
@@ -9,3 +9,7 @@ from ._decoder_correlated import PlanarMWPMDecoderCorrelated  # noqa: F401
 from ._decoder_correlated import PlanarMWPMDecoderCorrelatedDeg  # noqa: F401
 from ._decoder_independent import PlanarMWPMDecoderIndependent  # noqa: F401
 from ._decoder_independent import PlanarMWPMDecoderIndependentDeg  # noqa: F401
+from ._decoder_unionfind import PlanarUFDecoderCorrelated  # noqa: F401
+from ._decoder_unionfind import PlanarUFDecoderCorrelatedDeg  # noqa: F401
+from ._decoder_unionfind import PlanarUFDecoderIndependent  # noqa: F401
+from ._decoder_unionfind import PlanarUFDecoderIndependentDeg  # noqa: F401
@@ -1,10 +1,6 @@
-import functools
-import math
-import numpy as np
-from scipy import special
-
 from qecsim.model import cli_description
 from models.correlatednoise.nonrotatedplanarcode.generic._planarmwpmdecoder import PlanarMWPMDecoder
+from models.correlatednoise.nonrotatedplanarcode.generic._weightkernel import matching_weights
 
 @cli_description('MWPMCorrelatations')
 class PlanarMWPMDecoderCorrelated(PlanarMWPMDecoder):
@@ -14,14 +10,9 @@ class PlanarMWPMDecoderCorrelated(PlanarMWPMDecoder):
     """
 
     @classmethod
-    @functools.lru_cache(maxsize=2 ** 26)  # to handle up to 100x100 codes.
-    def distance(cls, code, a_index, b_index, p1, p2, degeneracy):
-        """Distance function weighted to prefer steps along rows and allow for degeneracy if specified."""
-        steps_along_rows, steps_along_cols = code.translation(a_index, b_index)
-        a, b = np.sort([abs(steps_along_rows), abs(steps_along_cols)])
-        probability = p1 ** (a + b) + (1 - (a + b) % 2) * p2 ** b
-        separation = -math.log(probability)
-        return separation
+    def weights(cls, row_steps, col_steps, p1, p2, degeneracy):
+        """See :meth:`PlanarMWPMDecoder.weights`"""
+        return matching_weights(row_steps, col_steps, p1, p2, correlated=True)
 
     @property
     def label(self):
@@ -36,14 +27,9 @@ class PlanarMWPMDecoderCorrelatedDeg(PlanarMWPMDecoder):
     """
 
     @classmethod
-    @functools.lru_cache(maxsize=2 ** 26)  # to handle up to 100x100 codes.
-    def distance(cls, code, a_index, b_index, p1, p2, degeneracy):
-        """Distance function weighted to prefer steps along rows and allow for degeneracy if specified."""
-        steps_along_rows, steps_along_cols = code.translation(a_index, b_index)
-        a, b = np.sort([abs(steps_along_rows), abs(steps_along_cols)])
-        probability = special.binom(a + b, a) * p1 ** (a + b) + (1 - (a + b) % 2) * special.binom(b, (b - a) / 2) * p2 ** b
-        separation = -math.log(probability)
-        return separation
+    def weights(cls, row_steps, col_steps, p1, p2, degeneracy):
+        """See :meth:`PlanarMWPMDecoder.weights`"""
+        return matching_weights(row_steps, col_steps, p1, p2, correlated=True, degenerate=True)
 
     @property
     def label(self):
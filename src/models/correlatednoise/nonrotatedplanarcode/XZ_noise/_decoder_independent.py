@@ -1,9 +1,6 @@
-import functools
-import math
-from scipy import special
-import numpy as np
 from qecsim.model import cli_description
 from models.correlatednoise.nonrotatedplanarcode.generic._planarmwpmdecoder import PlanarMWPMDecoder
+from models.correlatednoise.nonrotatedplanarcode.generic._weightkernel import matching_weights
 
 @cli_description('MWPMDecoder')
 class PlanarMWPMDecoderIndependent(PlanarMWPMDecoder):
@@ -13,12 +10,9 @@ class PlanarMWPMDecoderIndependent(PlanarMWPMDecoder):
     """
 
     @classmethod
-    @functools.lru_cache(maxsize=2 ** 26)  # to handle up to 100x100 codes.
-    def distance(cls, code, a_index, b_index, p1, p2, degeneracy):
-        """Distance function weighted to prefer steps along rows and allow for degeneracy if specified."""
-        steps_along_rows, steps_along_cols = code.translation(a_index, b_index)
-        separation = abs(steps_along_rows) + abs(steps_along_cols)
-        return separation
+    def weights(cls, row_steps, col_steps, p1, p2, degeneracy):
+        """See :meth:`PlanarMWPMDecoder.weights`"""
+        return matching_weights(row_steps, col_steps, p1, p2)
 
     @property
     def label(self):
@@ -33,15 +27,9 @@ class PlanarMWPMDecoderIndependentDeg(PlanarMWPMDecoder):
     """
 
     @classmethod
-    @functools.lru_cache(maxsize=2 ** 26)  # to handle up to 100x100 codes.
-    def distance(cls, code, a_index, b_index, p1, p2, degeneracy):
-        """Distance function weighted to prefer steps along rows and allow for degeneracy if specified."""
-        steps_along_rows, steps_along_cols = code.translation(a_index, b_index)
-        separation = abs(steps_along_rows) + abs(steps_along_cols)
-        # degeneracy = cls.degeneracy_term(abs(steps_along_rows), abs(steps_along_cols)) if degeneracy else 0
-        a, b = np.sort([abs(steps_along_rows), abs(steps_along_cols)])
-        degeneracy_simp = math.log(special.binom(a + b, a))
-        return separation - degeneracy_simp
+    def weights(cls, row_steps, col_steps, p1, p2, degeneracy):
+        """See :meth:`PlanarMWPMDecoder.weights`"""
+        return matching_weights(row_steps, col_steps, p1, p2, degenerate=True)
 
     @property
     def label(self):
@@ -0,0 +1,66 @@
+from qecsim.model import cli_description
+from models.correlatednoise.nonrotatedplanarcode.generic._planarufdecoder import PlanarUFDecoder
+from models.correlatednoise.nonrotatedplanarcode.generic._weightkernel import matching_weights
+
+@cli_description('UFDecoder')
+class PlanarUFDecoderIndependent(PlanarUFDecoder):
+    """
+    Implements a planar weighted Union-Find (UF) decoder.
+    Degeneracy factor is not taken into account, i.e. the weights are those of :meth:`PlanarUFDecoder.weights`
+    """
+
+    @property
+    def label(self):
+        """See :meth:`qecsim.model.Decoder.label`"""
+        return 'Planar UF Independent'
+
+@cli_description('UFDecoderDegeneracy')
+class PlanarUFDecoderIndependentDeg(PlanarUFDecoder):
+    """
+    Implements a planar weighted Union-Find (UF) decoder.
+    Code degeneracy is taken into account when calculating the growth weights
+    """
+
+    @classmethod
+    def weights(cls, row_steps, col_steps, p1, p2):
+        """See :meth:`PlanarUFDecoder.weights`"""
+        return matching_weights(row_steps, col_steps, p1, p2, degenerate=True)
+
+    @property
+    def label(self):
+        """See :meth:`qecsim.model.Decoder.label`"""
+        return 'Planar UF Independent Degenerate'
+
+@cli_description('UFCorrelations')
+class PlanarUFDecoderCorrelated(PlanarUFDecoder):
+    """
+    Implements a planar weighted Union-Find (UF) decoder
+    Two-qubit correlations are explicitly taken into account when calculating the growth weights.
+    """
+
+    @classmethod
+    def weights(cls, row_steps, col_steps, p1, p2):
+        """See :meth:`PlanarUFDecoder.weights`"""
+        return matching_weights(row_steps, col_steps, p1, p2, correlated=True)
+
+    @property
+    def label(self):
+        """See :meth:`qecsim.model.Decoder.label`"""
+        return 'Planar UF Correlated'
+
+@cli_description('UFCorrelationsAndDegeneracy')
+class PlanarUFDecoderCorrelatedDeg(PlanarUFDecoder):
+    """
+    Implements a planar weighted Union-Find (UF) decoder
+    Code degeneracy and two-qubit correlations are taken into account when calculating the growth weights.
+    """
+
+    @classmethod
+    def weights(cls, row_steps, col_steps, p1, p2):
+        """See :meth:`PlanarUFDecoder.weights`"""
+        return matching_weights(row_steps, col_steps, p1, p2, correlated=True, degenerate=True)
+
+    @property
+    def label(self):
+        """See :meth:`qecsim.model.Decoder.label`"""
+        return 'Planar UF Correlated Degenerate'
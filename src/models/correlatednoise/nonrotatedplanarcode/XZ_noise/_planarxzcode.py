@@ -1,6 +1,10 @@
+import functools
+
+import numpy as np
 from qecsim.model import cli_description
 from qecsim.models.planar import PlanarCode
 from models.correlatednoise.nonrotatedplanarcode.XZ_noise import PlanarPauliXZ
+from models.common._artifactcache import code_fingerprint, code_operators
 
 @cli_description('Planar XZZX code')
 class PlanarCodeXZ(PlanarCode):
@@ -19,3 +23,41 @@ class PlanarCodeXZ(PlanarCode):
         :rtype: PlanarPauli
         """
         return PlanarPauliXZ(self, bsf)
+
+    @functools.lru_cache()
+    def pauli_layout(self):
+        """
+        Return the Paulis applied to each site by its north/south plaquettes (op_v, all Z) and by its west/east
+        plaquettes (op_h, all X), see :func:`layout_operators`.
+
+        :rtype: 2-tuple of numpy.array (2d) of str with shape (2 * rows - 1, 2 * cols - 1)
+        """
+        shape = (2 * self.size[0] - 1, 2 * self.size[1] - 1)
+        return np.full(shape, 'Z'), np.full(shape, 'X')
+
+    @property
+    @functools.lru_cache()
+    def stabilizers(self):
+        """See :meth:`qecsim.model.StabilizerCode.stabilizers`, built once per machine, see :func:`code_operators`."""
+        return code_operators(self)['stabilizers']
+
+    @property
+    @functools.lru_cache()
+    def logical_xs(self):
+        """See :meth:`qecsim.model.StabilizerCode.logical_xs`"""
+        return code_operators(self)['logical_xs']
+
+    @property
+    @functools.lru_cache()
+    def logical_zs(self):
+        """See :meth:`qecsim.model.StabilizerCode.logical_zs`"""
+        return code_operators(self)['logical_zs']
+
+    @property
+    def fingerprint(self):
+        """
+        Stable fingerprint of the code, covering its type and size, see :func:`code_fingerprint`.
+
+        :rtype: str
+        """
+        return code_fingerprint(self)
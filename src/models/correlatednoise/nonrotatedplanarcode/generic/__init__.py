@@ -1,3 +1,38 @@
+from ._ratemaps import bond_rates  # noqa: F401
+from ._ratemaps import truncated_normal_rates  # noqa: F401
+from ._correlatederrormodel import TwoQubitPauliErrorModel  # noqa: F401
 from ._correlatederrormodel import CorrelatedXZErrorModel  # noqa: F401
 from ._correlatederrormodel import CorrelatedXXErrorModel  # noqa: F401
 from ._correlatederrormodel import CorrelatedDepolarizingErrorModel  # noqa: F401
+from ._driftingerrormodel import DriftingErrorModel  # noqa: F401
+from ._driftingerrormodel import OrnsteinUhlenbeckDrift  # noqa: F401
+from ._driftingerrormodel import RandomWalkDrift  # noqa: F401
+from ._circuiterrormodel import CircuitErrorModel  # noqa: F401
+from ._circuiterrormodel import SyndromeCircuit  # noqa: F401
+from ._circuiterrormodel import planar_schedule  # noqa: F401
+from ._circuiterrormodel import rotated_schedule  # noqa: F401
+from ._circuiterrormodel import syndrome_circuit  # noqa: F401
+from ._gridindex import nearest_neighbours  # noqa: F401
+from ._matching import MATCHING_BACKENDS  # noqa: F401
+from ._matching import Matcher  # noqa: F401
+from ._matching import mwpm_blossom5  # noqa: F401
+from ._matching import mwpm_networkx  # noqa: F401
+from ._matching import mwpm_sparse_blossom  # noqa: F401
+from ._matching import quantize_weights  # noqa: F401
+from ._pathmasks import PathMasks  # noqa: F401
+from ._pathmasks import path_masks  # noqa: F401
+from ._planarmwpmdecoder import DecodeStats  # noqa: F401
+from ._predecoder import GreedyPredecoder  # noqa: F401
+from ._predecoder import PredecoderStats  # noqa: F401
+from ._predecoder import local_faults  # noqa: F401
+from ._unionfind import fault_graph  # noqa: F401
+from ._unionfind import growth_lengths  # noqa: F401
+from ._unionfind import peel  # noqa: F401
+from ._unionfind import union_find_clusters  # noqa: F401
+from ._unionfind import union_find_correction  # noqa: F401
+from ._weightkernel import log_binom  # noqa: F401
+from ._weightkernel import matching_weights  # noqa: F401
+from ._weighttables import BytesLRUCache  # noqa: F401
+from ._weighttables import CacheInfo  # noqa: F401
+from ._weighttables import WeightTable  # noqa: F401
+from ._weighttables import WeightTableCache  # noqa: F401
@@ -0,0 +1,414 @@
+import functools
+
+import numpy as np
+from qecsim.model import ErrorModel
+from qecsim.models.rotatedplanar import RotatedPlanarCode
+
+from models.common._codesupports import code_supports, unpack_shots
+from models.common._noisepipeline import FaultTable
+from models.common._noisepipeline import _PAULI_HALVES, _TWO_QUBIT_FLIP_OFFSETS
+from models.common._paulichannel import TWO_QUBIT_PAULIS, two_qubit_channel
+
+
+def planar_schedule(code, index):
+    """
+    Return the order in which the ancilla of a plaquette of a (non-rotated) planar code couples to its qubits.
+
+    Notes:
+
+    * Order is North, West, East, South for every plaquette, which measures neighbouring plaquettes consistently and
+      applies to :class:`PlanarCodeXZ` (Z at North and South, X at West and East) as to the CSS planar code.
+    * Offsets are in the format (row, column) relative to the plaquette index.
+
+    :param code: Planar code.
+    :type code: PlanarCode
+    :param index: Index identifying the plaquette in the format (row, column).
+    :type index: 2-tuple of int
+    :return: Offsets of the coupled qubits, one per time slot.
+    :rtype: tuple of 2-tuple of int
+    """
+    return (-1, 0), (0, -1), (0, 1), (1, 0)
+
+
+def rotated_schedule(code, index):
+    """
+    Return the order in which the ancilla of a plaquette of a rotated planar code couples to its qubits.
+
+    Notes:
+
+    * Z-type plaquettes couple NW, NE, SW, SE ("Z" shape) and X-type plaquettes couple NW, SW, NE, SE ("N" shape), so
+      that hook errors (horizontal Z pairs and vertical X pairs) run perpendicular to the logical operator of the same
+      type, see :meth:`RotatedPlanarPauli.logical_z`.
+    * Offsets are in the format (x, y) relative to the plaquette index, i.e. its lower left (SW) qubit.
+
+    :param code: Rotated planar code.
+    :type code: RotatedPlanarCode
+    :param index: Index identifying the plaquette in the format (x, y).
+    :type index: 2-tuple of int
+    :return: Offsets of the coupled qubits, one per time slot.
+    :rtype: tuple of 2-tuple of int
+    """
+    if code.is_z_plaquette(index):
+        return (0, 1), (1, 1), (0, 0), (1, 0)
+    return (0, 1), (0, 0), (1, 1), (1, 0)
+
+
+class SyndromeCircuit:
+    """
+    Stabilizer-measurement circuit of a round of syndrome extraction, compiled to layers of 2-qubit gates.
+
+    Notes:
+
+    * Each stabilizer is measured by its own ancilla, prepared in the +1 eigenstate of X, coupled to each qubit of
+      the support by a controlled-P gate (P the Pauli of the stabilizer on that qubit, e.g. CNOT for X and CZ for Z),
+      and measured in the X basis.
+    * The schedule gives the order of the gates of each ancilla as offsets from its plaquette index, and gates in the
+      same time slot form a layer. Gates of a layer act on distinct qubits, so a layer is applied to the Pauli frames
+      of all its gates at once. Offsets may be None (idle slot) and offsets outside the lattice are skipped, e.g. at
+      the boundaries.
+    * The schedule must measure the stabilizers, i.e. interleave the gates of neighbouring ancillas consistently.
+      Only the consistency of the schedule with the supports is checked.
+
+    Use :func:`syndrome_circuit` to get a cached instance for a given code and schedule.
+    """
+
+    def __init__(self, code, schedule):
+        """
+        Initialise new syndrome circuit.
+
+        :param code: Planar or rotated planar code.
+        :type code: StabilizerCode
+        :param schedule: Function of (code, plaquette index) returning the offsets of the coupled qubits, one per time
+            slot, e.g. :func:`planar_schedule` or :func:`rotated_schedule`.
+        :type schedule: callable
+        :raises ValueError: if the schedule does not couple each qubit of each stabilizer exactly once, or couples a
+            qubit to several ancillas in the same time slot.
+        """
+        n_qubits = code.n_k_d[0]
+        gates = []  # (slot, ancilla, qubit, x bit, z bit)
+        for ancilla, index in enumerate(code._plaquette_indices):
+            stabilizer = code.new_pauli().plaquette(index).to_bsf()
+            coupled = []
+            for slot, offset in enumerate(schedule(code, index)):
+                if offset is None:
+                    continue
+                site = tuple(i + o for i, o in zip(index, offset))
+                qubit = np.flatnonzero(code.new_pauli().site('X', site).to_bsf()[:n_qubits])
+                if not len(qubit):
+                    continue  # outside lattice
+                qubit = qubit[0]
+                gates.append((slot, ancilla, qubit, stabilizer[qubit], stabilizer[n_qubits + qubit]))
+                coupled.append(qubit)
+            support = np.flatnonzero(stabilizer[:n_qubits] | stabilizer[n_qubits:])
+            if sorted(coupled) != support.tolist():
+                raise ValueError('{} schedule does not couple stabilizer {} to its support'.format(
+                    type(self).__name__, index))
+        gates = np.array(gates, dtype=np.intp).reshape(-1, 5)
+        self._n_qubits = n_qubits
+        self._n_ancillas = len(code._plaquette_indices)
+        self._layers = []
+        for slot in np.unique(gates[:, 0]):
+            _, ancillas, qubits, xs, zs = gates[gates[:, 0] == slot].T
+            if len(np.unique(qubits)) != len(qubits):
+                raise ValueError('{} schedule couples a qubit to several ancillas in time slot {}'.format(
+                    type(self).__name__, slot))
+            # masks select frame words updated by the X and Z parts of the gate Paulis
+            x_masks = np.where(xs, ~np.uint64(0), np.uint64(0))[:, np.newaxis]
+            z_masks = np.where(zs, ~np.uint64(0), np.uint64(0))[:, np.newaxis]
+            self._layers.append((n_qubits + ancillas, qubits, x_masks, z_masks))
+
+    @property
+    def n_qubits(self):
+        """
+        Number of data qubits, which are the first rows of frames.
+
+        :rtype: int
+        """
+        return self._n_qubits
+
+    @property
+    def n_ancillas(self):
+        """
+        Number of ancillas, one per stabilizer in the order of ``code.stabilizers``, which follow the data qubits.
+
+        :rtype: int
+        """
+        return self._n_ancillas
+
+    @property
+    def layers(self):
+        """
+        Layers of gates, as the frame rows of ancillas, the frame rows of qubits and word masks of the X and Z parts
+        of the controlled Paulis.
+
+        :rtype: list of 4-tuple of numpy.array
+        """
+        return self._layers
+
+    def apply_layer(self, layer, xs, zs):
+        """
+        Propagate bit-packed Pauli frames through a layer of controlled-P gates, in place.
+
+        Notes:
+
+        * A controlled-P gate from ancilla a to qubit q maps X_a to X_a P_q, and Q_q to Z_a Q_q if Q anticommutes with
+          P, and leaves Z_a and commuting Q_q unchanged.
+
+        :param layer: Layer of gates, see :attr:`layers`.
+        :type layer: 4-tuple of numpy.array
+        :param xs: X parts of frames of data qubits and ancillas.
+        :type xs: numpy.array (2d) of uint64 with shape (n_qubits + n_ancillas, words)
+        :param zs: Z parts of frames of data qubits and ancillas.
+        :type zs: numpy.array (2d) of uint64 with shape (n_qubits + n_ancillas, words)
+        """
+        ancillas, qubits, x_masks, z_masks = layer
+        xa, xq, zq = xs[ancillas], xs[qubits], zs[qubits]
+        zs[ancillas] ^= (xq & z_masks) ^ (zq & x_masks)
+        xs[qubits] = xq ^ (xa & x_masks)
+        zs[qubits] = zq ^ (xa & z_masks)
+
+    def __repr__(self):
+        return '{}(n_qubits={}, n_ancillas={}, n_layers={})'.format(
+            type(self).__name__, self._n_qubits, self._n_ancillas, len(self._layers))
+
+
+@functools.lru_cache(maxsize=2 ** 8)
+def syndrome_circuit(code, schedule):
+    """
+    Return the (cached) syndrome circuit for the given code and schedule.
+
+    :param code: Planar or rotated planar code.
+    :type code: StabilizerCode
+    :param schedule: Schedule, see :class:`SyndromeCircuit`.
+    :type schedule: callable
+    :return: Syndrome circuit.
+    :rtype: SyndromeCircuit
+    """
+    return SyndromeCircuit(code, schedule)
+
+
+def _single_qubit_faults(n_rows, rows, probability):
+    """Return fault table of depolarizing errors on the given frame rows, with columns X rows followed by Z rows."""
+    rows = rows[:, np.newaxis, np.newaxis]
+    flips = np.where(_PAULI_HALVES >= 0, rows + _PAULI_HALVES * n_rows, -1)
+    # Y flips X and Z parts
+    flips[:, 1] = rows[:, 0] + np.array([0, n_rows])
+    return FaultTable(2 * n_rows, np.full((len(rows), 3), probability / 3), flips)
+
+
+def _two_qubit_faults(n_rows, rows_1, rows_2, probability, channel):
+    """Return fault table of 2-qubit Pauli errors on the given pairs of frame rows, see :class:`BondPauliLayer`."""
+    which, half = _TWO_QUBIT_FLIP_OFFSETS[..., 0], _TWO_QUBIT_FLIP_OFFSETS[..., 1]
+    rows = np.where(which == 0, rows_1[:, np.newaxis, np.newaxis], rows_2[:, np.newaxis, np.newaxis])
+    flips = np.where(which >= 0, rows + half * n_rows, -1)
+    probabilities = np.broadcast_to(probability * np.array(channel.distribution[1:]), (len(rows_1), len(flips[0])))
+    return FaultTable(2 * n_rows, probabilities, flips)
+
+
+def _xor_faults(table, words, shots, rng):
+    """Sample faults of the table and XOR them into the bit-packed words, in place."""
+    shot_indices, columns = table.sample_sparse(shots, rng)
+    bits = np.left_shift(np.uint64(1), (shot_indices % 64).astype(np.uint64))
+    np.bitwise_xor.at(words, (columns, shot_indices // 64), bits)
+
+
+class CircuitErrorModel(ErrorModel):
+    """
+    Circuit-level noise of syndrome extraction, simulated by propagating bit-packed Pauli frames.
+
+    Notes:
+
+    * Each round of syndrome extraction is the :class:`SyndromeCircuit` of the code and schedule. Before each round,
+      each data qubit suffers a depolarizing error with error_probability_1. After each gate, the ancilla and qubit
+      suffer a 2-qubit Pauli error with error_probability, drawn from the distribution of the channel (by default
+      2-qubit depolarizing). Each ancilla measurement (including its preparation) is flipped with
+      measurement_error_probability.
+    * Errors on ancillas propagate to data qubits and vice versa, so the correlated (hook) errors of the circuit arise
+      from the gate order, rather than from a code-capacity approximation.
+    * Frames of 64 shots are packed into each uint64 word, see :func:`pack_shots`, and each layer of gates is applied
+      to all ancillas, qubits and shots at once. Faults are sampled sparsely per layer, see :class:`FaultTable`.
+    * Of time_steps >= 2 rounds, the last is a perfect round, and detection events are the changes of measurement
+      outcomes between rounds, i.e. the (time_steps, n_stabilizers) syndrome expected by ``decode_ftp`` with
+      time-periodic measurement errors (see :func:`appcorrelated.run_ftp`), where the last measurement error is 0.
+      Their sum over rounds is the syndrome of the final error of the data qubits.
+    * :meth:`generate` returns the data error of a single noisy round, so the model can be used for ideal decoding.
+    * :meth:`generate` and :meth:`generate_ftp` simulate one shot from the given rng, so runs are reproducible from
+      their seed. Use :meth:`sample_detection_events` to simulate many shots at once.
+    """
+
+    def __init__(self, schedule=None, distribution=None):
+        """
+        Initialise new circuit error model.
+
+        :param schedule: Schedule of stabilizer-measurement circuits, see :class:`SyndromeCircuit`.
+            (default=None resolves to :func:`rotated_schedule` for rotated planar codes and :func:`planar_schedule`
+            otherwise)
+        :type schedule: callable
+        :param distribution: Distribution of 2-qubit Pauli errors after each gate (first Pauli on the ancilla), see
+            :func:`two_qubit_channel`. (default=None, i.e. uniform over the 15 non-identity Paulis)
+        :type distribution: tuple
+        """
+        self._schedule = schedule
+        self._distribution = tuple((p, 1.0) for p in TWO_QUBIT_PAULIS[1:]) if distribution is None else distribution
+        self._channel = two_qubit_channel(self._distribution)
+
+    def circuit(self, code):
+        """
+        Return the syndrome circuit of the given code.
+
+        :param code: Planar or rotated planar code.
+        :type code: StabilizerCode
+        :return: Syndrome circuit.
+        :rtype: SyndromeCircuit
+        """
+        schedule = self._schedule
+        if schedule is None:
+            schedule = rotated_schedule if isinstance(code, RotatedPlanarCode) else planar_schedule
+        return syndrome_circuit(code, schedule)
+
+    @functools.lru_cache(maxsize=2 ** 8)
+    def _fault_tables(self, code, error_probability_1, error_probability, measurement_error_probability):
+        """Return (cached) fault tables of data qubits, of each layer of gates and of measurements."""
+        circuit = self.circuit(code)
+        n_rows = circuit.n_qubits + circuit.n_ancillas
+        data_table = _single_qubit_faults(n_rows, np.arange(circuit.n_qubits), error_probability_1)
+        layer_tables = [_two_qubit_faults(n_rows, ancillas, qubits, error_probability, self._channel)
+                        for ancillas, qubits, _, _ in circuit.layers]
+        measurement_table = FaultTable(circuit.n_ancillas,
+                                       np.full((circuit.n_ancillas, 1), measurement_error_probability),
+                                       np.arange(circuit.n_ancillas).reshape(-1, 1, 1))
+        return data_table, layer_tables, measurement_table
+
+    def simulate(self, code, time_steps, error_probability_1, error_probability, measurement_error_probability, shots,
+                 rng=None):
+        """
+        Simulate rounds of syndrome extraction over a batch of shots with bit-packed Pauli frames.
+
+        :param code: Planar or rotated planar code.
+        :type code: StabilizerCode
+        :param time_steps: Number of rounds, the last of which is perfect, so at least one round is noisy.
+        :type time_steps: int
+        :param error_probability_1: Depolarizing error probability of data qubits per round.
+        :type error_probability_1: float
+        :param error_probability: 2-qubit error probability per gate.
+        :type error_probability: float
+        :param measurement_error_probability: Error probability per ancilla measurement.
+        :type measurement_error_probability: float
+        :param shots: Number of shots.
+        :type shots: int
+        :param rng: Random number generator. (default=None resolves to numpy.random.default_rng())
+        :type rng: numpy.random.Generator
+        :return: Detection events and final errors of data qubits in bsf format, packed along the shots axis.
+        :rtype: 2-tuple of numpy.array of uint64 with shapes (time_steps, n_stabilizers, words) and
+            (2 * n_qubits, words)
+        :raises ValueError: if time_steps is not >= 2.
+        """
+        if not time_steps >= 2:
+            raise ValueError('{} valid time_steps is an integer >= 2, i.e. at least one noisy round followed by the '
+                             'perfect round'.format(type(self).__name__))
+        rng = np.random.default_rng() if rng is None else rng
+        circuit = self.circuit(code)
+        data_table, layer_tables, measurement_table = self._fault_tables(
+            code, error_probability_1, error_probability, measurement_error_probability)
+        n_qubits, n_ancillas = circuit.n_qubits, circuit.n_ancillas
+        n_words = -(-shots // 64)
+        # frames of data qubits followed by ancillas, X parts followed by Z parts
+        frames = np.zeros((2 * (n_qubits + n_ancillas), n_words), dtype=np.uint64)
+        xs, zs = frames[:n_qubits + n_ancillas], frames[n_qubits + n_ancillas:]
+        detection_events = np.empty((time_steps, n_ancillas, n_words), dtype=np.uint64)
+        previous = np.zeros((n_ancillas, n_words), dtype=np.uint64)
+        for t in range(time_steps):
+            noisy = t < time_steps - 1
+            if noisy:
+                _xor_faults(data_table, frames, shots, rng)
+            # ancillas prepared afresh
+            xs[n_qubits:] = 0
+            zs[n_qubits:] = 0
+            for layer, layer_table in zip(circuit.layers, layer_tables):
+                circuit.apply_layer(layer, xs, zs)
+                if noisy:
+                    _xor_faults(layer_table, frames, shots, rng)
+            # X measurement of ancillas is flipped by Z part of frames
+            outcomes = zs[n_qubits:].copy()
+            if noisy:
+                _xor_faults(measurement_table, outcomes, shots, rng)
+            detection_events[t] = outcomes ^ previous
+            previous = outcomes
+        return detection_events, np.concatenate((xs[:n_qubits], zs[:n_qubits]))
+
+    def sample_detection_events(self, code, time_steps, error_probability_1, error_probability,
+                                measurement_error_probability, shots, rng=None, packed=False):
+        """
+        Sample a batch of detection events and logical commutations of final errors of data qubits.
+
+        See :meth:`simulate` for parameters.
+
+        :param packed: If results are bit-packed along the shots axis, see :func:`pack_shots`. (default=False)
+        :type packed: bool
+        :return: Detection events in the layout of ``decode_ftp`` and logical commutations, one per shot, or packed
+            along the shots axis if packed.
+        :rtype: 2-tuple of numpy.array of uint8 with shapes (shots, time_steps, n_stabilizers) and
+            (shots, n_logicals), or of uint64 with shapes (time_steps, n_stabilizers, words) and (n_logicals, words)
+            if packed
+        """
+        detection_events, errors = self.simulate(code, time_steps, error_probability_1, error_probability,
+                                                 measurement_error_probability, shots, rng)
+        logical_commutations = code_supports(code).logical_commutations(errors, packed=True)
+        if packed:
+            return detection_events, logical_commutations
+        n_words = detection_events.shape[-1]
+        detection_events = unpack_shots(detection_events.reshape(-1, n_words), shots).reshape(shots, time_steps, -1)
+        return detection_events, unpack_shots(logical_commutations, shots)
+
+    def _single_shot(self, code, time_steps, probabilities, rng):
+        """Return detection events and error of a single shot simulated with the given rng."""
+        detection_events, errors = self.simulate(code, time_steps, *probabilities, 1, rng)
+        detection_events = unpack_shots(detection_events.reshape(-1, detection_events.shape[-1]), 1)
+        return detection_events.reshape(time_steps, -1).astype(int), unpack_shots(errors, 1)[0].astype(int)
+
+    def generate(self, code, error_probability_1, error_probability, rng=None):
+        """
+        Generate the error of the data qubits after a single noisy round (without measurement errors).
+
+        :param code: Planar or rotated planar code.
+        :type code: StabilizerCode
+        :param error_probability_1: Depolarizing error probability of data qubits per round.
+        :type error_probability_1: float
+        :param error_probability: 2-qubit error probability per gate.
+        :type error_probability: float
+        :param rng: Random number generator. (default=None resolves to numpy.random.default_rng())
+        :type rng: numpy.random.Generator
+        :return: Error in bsf format.
+        :rtype: numpy.array (1d)
+        """
+        rng = np.random.default_rng() if rng is None else rng
+        return self._single_shot(code, 2, (error_probability_1, error_probability, 0.0), rng)[1]
+
+    def generate_ftp(self, code, time_steps, error_probability_1, error_probability, measurement_error_probability,
+                     rng=None):
+        """
+        Generate the detection events of rounds of syndrome extraction and the final error of the data qubits.
+
+        See :meth:`simulate` for parameters.
+
+        :return: Detection events in the layout of ``decode_ftp``, and error in bsf format.
+        :rtype: 2-tuple of numpy.array (2d) with shape (time_steps, n_stabilizers) and numpy.array (1d)
+        """
+        rng = np.random.default_rng() if rng is None else rng
+        return self._single_shot(code, time_steps,
+                                 (error_probability_1, error_probability, measurement_error_probability), rng)
+
+    @functools.lru_cache()
+    def probability_distribution(self, probability):
+        """See :meth:`qecsim.model.ErrorModel.probability_distribution`"""
+        p_x = p_y = p_z = probability / 3
+        p_i = 1 - sum((p_x, p_y, p_z))
+        return p_i, p_x, p_y, p_z
+
+    @property
+    def label(self):
+        """See :meth:`qecsim.model.ErrorModel.label`"""
+        return 'Circuit-level'
+
+    def __repr__(self):
+        return '{}({!r}, {!r})'.format(type(self).__name__, self._schedule, self._distribution)
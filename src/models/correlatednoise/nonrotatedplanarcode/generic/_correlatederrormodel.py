@@ -1,119 +1,230 @@
 import functools
 import numpy as np
-from qecsim import paulitools as pt
 from qecsim.model import cli_description
 from qecsim.models.generic import SimpleErrorModel
-from qecsim.models.generic import DepolarizingErrorModel
+from models.common._noisepipeline import BondPauliLayer, DepolarizingLayer
+from models.common._noisepipeline import NoisePipeline
+from models.common._paulichannel import two_qubit_channel
+from models.correlatednoise.nonrotatedplanarcode.generic._ratemaps import RatesDigest, bond_rates
 
-@cli_description('Depolarizing single-qubit error + XZ error')
-class CorrelatedXZErrorModel(SimpleErrorModel):
+
+@functools.lru_cache(maxsize=2 ** 8)
+def _neighbour_bonds(code):
     """
-    Implements a depolarizing single-qubit + 2-qubit XZ error model.
+    Return the pairs of neighbouring qubits subject to two-qubit errors on the given planar code.
+
+    Notes:
+
+    * Pairs are grouped by direction: lower-left, lower-right, upper-left, upper-right.
+    * Each group is a 2-tuple of index arrays (qubits_1, qubits_2), where qubits_1 are qubits on horizontal edges and
+      qubits_2 their neighbours on vertical edges, in bsf qubit order.
+    * Qubits in the first (last) column have no left (right) neighbour, so those pairs are masked out.
+
+    :param code: Planar code.
+    :type code: PlanarCode
+    :return: Index arrays of neighbouring qubits for each direction.
+    :rtype: 4-tuple of 2-tuple of numpy.array (1d)
+    """
+    n, m = code.size
+    d = n * m - 1
+    bonds = []
+    # qubits with a neighbour below (row_offset=0) and above (row_offset=-1)
+    for qubits, row_offset in ((np.arange(0, d - m - 1), 0), (np.arange(m, d), -1)):
+        i = qubits // m
+        k = qubits % m
+        # neighbours to the left (col_offset=0) and right (col_offset=1)
+        for col_offset, mask in ((0, k > 0), (1, k < m - 1)):
+            neighbours = d + (m - 1) * (i + row_offset) + k + col_offset
+            bonds.append((qubits[mask], neighbours[mask]))
+    return tuple(bonds)
+
+
+def _two_qubit_probability(code, error_probability):
+    """
+    Return the two-qubit error probability per pair of neighbouring qubits.
+
+    Qubits on the boundary have less nearest neighbours, hence the effect of two-qubit errors overall reduced. To
+    simulate correctly the effect of two-qubit noise we multiply the two-qubit error probability by factor beta > 1,
+    which becomes close to 1 for large codes.
     """
+    n, m = code.size
+    return error_probability * (n * m + (n - 1) * (m - 1)) / (
+        4 * 0.25 + (2 * n + 2 * m - 8) * 0.5 + n * m + (n - 1) * (m - 1) - 2 * n - 2 * m + 4)
+
+
+@cli_description('Depolarizing single-qubit error + general 2-qubit Pauli error')
+class TwoQubitPauliErrorModel(SimpleErrorModel):
+    """
+    Implements a depolarizing single-qubit + general 2-qubit Pauli error model.
+
+    Notes:
+
+    * Each bond (pair of qubits) is hit by a 2-qubit error with the two-qubit error probability p, in which case the
+      2-qubit Pauli is drawn from the given distribution over the 16 Paulis II, IX, ..., ZZ, see
+      :class:`TwoQubitPauliChannel`. Terms such as IX and XI describe errors acting on one qubit of the bond only.
+    * By default, bonds are the pairs of neighbouring qubits of the planar code, and p is rescaled by the boundary
+      factor beta. Otherwise bonds are given explicitly and p applies to each bond as is.
+    * Optionally, bonds have relative error rates (non-identically distributed two-qubit errors), given per bond or as
+      a spatial rate map, e.g. drawn by :func:`truncated_normal_rates`. The error probability of each bond is then
+      its rate times p, see :meth:`bond_probabilities`.
+    * The model is a :class:`NoisePipeline` of a :class:`DepolarizingLayer` and a :class:`BondPauliLayer`, compiled
+      once per code and probabilities, so every distribution is sampled by the same sampler at the same speed.
+    """
+
+    #: Default distribution of 2-qubit Paulis (defined by subclasses for standard error models).
+    default_distribution = None
+
+    def __init__(self, distribution=None, bonds=None, rates=None):
+        """
+        Initialise new 2-qubit Pauli error model.
+
+        :param distribution: Relative probabilities of 2-qubit Paulis as a mapping from Paulis (e.g. 'XZ', 'IX'), or
+            a sequence of 16 values in the order of :data:`TWO_QUBIT_PAULIS`, where the first letter applies to the
+            first qubit of each bond. (default=None resolves to :attr:`default_distribution`)
+        :type distribution: mapping of str to float, or sequence of float
+        :param bonds: Pairs of qubits (in bsf qubit order) subject to 2-qubit errors. (default=None, i.e. pairs of
+            neighbouring qubits of the planar code, first qubit on a horizontal edge)
+        :type bonds: sequence of 2-tuple of int
+        :param rates: Relative error rates of bonds, one per bond in the order of :meth:`bonds`, or a spatial rate map
+            of shape (2 * rows - 1, 2 * cols - 1) or larger, see :func:`bond_rates`. (default=None, i.e. all rates 1)
+        :type rates: numpy.array (1d or 2d)
+        :raises ValueError: if distribution is not valid, see :class:`TwoQubitPauliChannel`.
+        """
+        # as given, for repr, with rates by digest so large rate maps are not embedded
+        self._params = [('distribution', distribution), ('bonds', bonds),
+                        ('rates', None if rates is None else RatesDigest(rates))]
+        distribution = self.default_distribution if distribution is None else distribution
+        if distribution is None:
+            raise ValueError('{} requires a 2-qubit Pauli distribution'.format(type(self).__name__))
+        # hashable form of distribution for cached channel
+        self._distribution = (tuple(sorted(distribution.items())) if isinstance(distribution, dict)
+                              else tuple(float(w) for w in distribution))
+        self._channel = two_qubit_channel(self._distribution)
+        self._rates = None if rates is None else np.asarray(rates, dtype=float)
+        self._bonds = None if bonds is None else tuple(np.array(bonds, dtype=np.intp).reshape(-1, 2).T)
+        self._pipeline = NoisePipeline([
+            DepolarizingLayer('error_probability_1'),
+            BondPauliLayer(self._channel, 'error_probability', self._bond_layer_bonds),
+        ])
+
+    @property
+    def channel(self):
+        """
+        The 2-qubit Pauli channel applied to each bond.
+
+        :rtype: TwoQubitPauliChannel
+        """
+        return self._channel
+
+    @property
+    def pipeline(self):
+        """
+        The noise pipeline of the model, with parameters error_probability_1 and error_probability.
+
+        :rtype: NoisePipeline
+        """
+        return self._pipeline
+
+    def bonds(self, code):
+        """
+        Return the bonds (pairs of qubits) subject to two-qubit errors on the given code, in the order of rates.
+
+        :param code: Planar code.
+        :type code: PlanarCode
+        :return: First and second qubit of each bond, in bsf qubit order.
+        :rtype: 2-tuple of numpy.array (1d)
+        """
+        if self._bonds is None:
+            return tuple(np.concatenate(qubits) for qubits in zip(*_neighbour_bonds(code)))
+        return self._bonds
+
+    @functools.lru_cache(maxsize=2 ** 8)
+    def bond_probabilities(self, code, error_probability):
+        """
+        Return the error probability of each bond, i.e. its relative rate times the error probability.
+
+        :param code: Planar code.
+        :type code: PlanarCode
+        :param error_probability: Two-qubit error probability per bond (after rescaling by the boundary factor).
+        :type error_probability: float
+        :return: Error probability of each bond in the order of :meth:`bonds`, clipped to 1.
+        :rtype: numpy.array (1d)
+        :raises ValueError: if rates are not valid for the code, see :func:`bond_rates`.
+        """
+        qubits_1, qubits_2 = self.bonds(code)
+        rates = np.ones(len(qubits_1)) if self._rates is None else bond_rates(code, self._rates, qubits_1, qubits_2)
+        return np.minimum(rates * error_probability, 1.0)
+
+    def _bond_layer_bonds(self, code, error_probability):
+        """Return bonds and the two-qubit error probability (common or per bond) for the given code."""
+        qubits_1, qubits_2 = self.bonds(code)
+        if self._bonds is None:
+            error_probability = _two_qubit_probability(code, error_probability)
+        if self._rates is None:
+            return qubits_1, qubits_2, error_probability
+        return qubits_1, qubits_2, self.bond_probabilities(code, error_probability)
 
     def generate(self, code, error_probability_1, error_probability, rng=None):
         """
-        Generates single-qubit errors (depolarizing model) and two-qubit errors (XZ correlations)
+        Generates single-qubit errors (depolarizing model) and two-qubit errors (see :attr:`channel`)
         """
+        return self.generate_batch(code, error_probability_1, error_probability, 1, rng)[0].astype(int)
 
-        n = code.size[0]
-        m = code.size[1]
-        d = n * m - 1
-        step = code.n_k_d[0]
-        # Probability of single-qubit error gate:
-        error_probability_1 = error_probability_1
-        # Probability of a two-qubit error gate. Qubits on the boundary have less nearest neighbours, hence the
-        # effect of two-qubit errors overall reduced. To simulate correctly the effect of two-qubit noise we multiply
-        # the two-qubit error probability by factor beta > 1, which becomes close to 1 for large codes.
-        error_probability = error_probability * (n * m + (n - 1) * (m - 1)) / (4 * 0.25 + (2 * n + 2 * m - 8) * 0.5 + n * m + (n - 1) * (m - 1) - 2 * n - 2 * m + 4)
-        rng = np.random.default_rng() if rng is None else rng
-        n_qubits = code.n_k_d[0]
-        # generate single-qubit errors
-        error_pauli = ''.join(rng.choice(
-            ('I', 'X', 'Y', 'Z'),
-            size=n_qubits,
-            p=self.probability_distribution(error_probability_1)
-        ))
-        total_error = pt.pauli_to_bsf(error_pauli)
-        # generate two-qubit errors
-        # for two-qubit errors, the location of the qubit matters because edge qubits only have neibhours from one side
-        for q in range(0, d - m - 1):
-            i = q // m
-            k = q % m
-            col = k
-            rnd = np.random.uniform(0, 1)
-            if rnd < error_probability / 2:
-                # multiply qubit #q by X and lower-left by Z
-                if col > 0:
-                    total_error[q] = (total_error[q] + 1) % 2
-                    total_error[q + step] = total_error[q + step]
-                    total_error[d + (m - 1) * i + k] = total_error[d + (m - 1) * i + k]
-                    total_error[d + (m - 1) * i + k + step] = (total_error[d + (m - 1) * i + k + step] + 1) % 2
-            elif error_probability / 2 < rnd < error_probability:
-                # multiply qubit #q by Z and lower-left by X
-                if col > 0:
-                    total_error[q] = total_error[q]
-                    total_error[q + step] = (total_error[q + step] + 1) % 2
-                    total_error[d + (m - 1) * i + k] = (total_error[d + (m - 1) * i + k] + 1) % 2
-                    total_error[d + (m - 1) * i + k + step] = total_error[d + (m - 1) * i + k + step]
-        for q in range(0, d - m - 1):
-            i = q // m
-            k = q % m
-            col = k
-            rnd = np.random.uniform(0, 1)
-            if rnd < error_probability / 2:
-                # multiply qubit #q by X and lower-right by Z
-                if col < m - 1:
-                    total_error[q] = (total_error[q] + 1) % 2
-                    total_error[q + step] = total_error[q + step]
-                    total_error[d + (m - 1) * i + k + 1] = total_error[d + (m - 1) * i + k + 1]
-                    total_error[d + (m - 1) * i + k + 1 + step] = (total_error[d + (m - 1) * i + k + 1 + step] + 1) % 2
-            elif error_probability / 2 < rnd < error_probability:
-                # multiply qubit #q by Z and lower-right by X
-                if col < m - 1:
-                    total_error[q] = total_error[q]
-                    total_error[q + step] = (total_error[q + step] + 1) % 2
-                    total_error[d + (m - 1) * i + k + 1] = (total_error[d + (m - 1) * i + k + 1] + 1) % 2
-                    total_error[d + (m - 1) * i + k + 1 + step] = total_error[d + (m - 1) * i + k + 1 + step]
-        for q in range(m, d):
-            i = q // m
-            k = q % m
-            col = k
-            rnd = np.random.uniform(0, 1)
-            if rnd < error_probability / 2:
-                # multiply qubit #q by X and upper-left by Z
-                if col > 0:
-                    total_error[q] = (total_error[q] + 1) % 2
-                    total_error[q + step] = total_error[q + step]
-                    total_error[d + (m - 1) * (i - 1) + k] = total_error[d + (m - 1) * (i - 1) + k]
-                    total_error[d + (m - 1) * (i - 1) + k + step] = (total_error[d + (m - 1) * (i - 1) + k + step] + 1) % 2
-            elif error_probability / 2 < rnd < error_probability:
-                # multiply qubit #q by Z and upper-left by X
-                if col > 0:
-                    total_error[q] = total_error[q]
-                    total_error[q + step] = (total_error[q + step] + 1) % 2
-                    total_error[d + (m - 1) * (i - 1) + k] = (total_error[d + (m - 1) * (i - 1) + k] + 1) % 2
-                    total_error[d + (m - 1) * (i - 1) + k + step] = total_error[d + (m - 1) * (i - 1) + k + step]
-        for q in range(m, d):
-            i = q // m
-            k = q % m
-            col = k
-            rnd = np.random.uniform(0, 1)
-            if rnd < error_probability / 2:
-                # multiply qubit #q by X and upper-right by Z
-                if col < m - 1:
-                    total_error[q] = (total_error[q] + 1) % 2
-                    total_error[q + step] = total_error[q + step]
-                    total_error[d + (m - 1) * (i - 1) + k + 1] = total_error[d + (m - 1) * (i - 1) + k + 1]
-                    total_error[d + (m - 1) * (i - 1) + k + 1 + step] = (total_error[d + (m - 1) * (i - 1) + k + 1 + step] + 1) % 2
-            elif error_probability / 2 < rnd < error_probability:
-                # multiply qubit #q by Z and upper-right by X
-                if col < m - 1:
-                    total_error[q] = total_error[q]
-                    total_error[q + step] = (total_error[q + step] + 1) % 2
-                    total_error[d + (m - 1) * (i - 1) + k + 1] = (total_error[d + (m - 1) * (i - 1) + k + 1] + 1) % 2
-                    total_error[d + (m - 1) * (i - 1) + k + 1 + step] = total_error[d + (m - 1) * (i - 1) + k + 1 + step]
-        return total_error
+    def generate_batch(self, code, error_probability_1, error_probability, shots, rng=None):
+        """
+        Generates a batch of errors, each distributed as the errors returned by :meth:`generate`.
+
+        :param code: Planar code.
+        :type code: PlanarCode
+        :param error_probability_1: Single-qubit error probability.
+        :type error_probability_1: float
+        :param error_probability: Two-qubit error probability.
+        :type error_probability: float
+        :param shots: Number of errors to generate.
+        :type shots: int
+        :param rng: Random number generator. (default=None resolves to numpy.random.default_rng())
+        :type rng: numpy.random.Generator
+        :return: Errors in bsf format, one per row.
+        :rtype: numpy.array (2d) of uint8 with shape (shots, 2 * n_qubits)
+        """
+        return self._pipeline.sample(code, shots, rng, error_probability_1=error_probability_1,
+                                     error_probability=error_probability)
+
+    def generate_sparse(self, code, error_probability_1, error_probability, shots, rng=None):
+        """
+        Generates a batch of errors as sparse bsf flips, each distributed as the errors returned by :meth:`generate`.
+
+        Notes:
+
+        * Faults are sampled by skipping geometrically distributed gaps, see :func:`sample_faults`, so the cost scales
+          with the number of faults rather than the number of qubits and bonds.
+        * Flips can be passed directly to :meth:`CodeSupports.syndromes_sparse`, or converted to dense errors using
+          :func:`sparse_to_bsf`.
+
+        See :meth:`generate_batch` for parameters.
+
+        :return: Shot indices and bsf indices of flips, where repeated flips of the same bit cancel.
+        :rtype: 2-tuple of numpy.array (1d)
+        """
+        return self._pipeline.sample_sparse(code, shots, rng, error_probability_1=error_probability_1,
+                                            error_probability=error_probability)
+
+    def generate_syndromes(self, code, error_probability_1, error_probability, shots, rng=None, packed=False):
+        """
+        Generates a batch of syndromes and logical commutations of errors distributed as by :meth:`generate`.
+
+        Faults are mapped to the syndrome bits and logical commutations they flip once per code and probabilities,
+        so the errors themselves are never formed, see :meth:`NoisePipeline.sample_syndromes`.
+
+        See :meth:`generate_batch` for parameters.
+
+        :param packed: If results are bit-packed along the shots axis, see :func:`pack_shots`. (default=False)
+        :type packed: bool
+        :return: Syndromes and logical commutations, one row per shot, or packed along the shots axis if packed.
+        :rtype: 2-tuple of numpy.array (2d)
+        """
+        return self._pipeline.sample_syndromes(code, shots, rng, packed, error_probability_1=error_probability_1,
+                                               error_probability=error_probability)
 
     @functools.lru_cache()
     def probability_distribution(self, probability):
@@ -121,234 +232,54 @@ class CorrelatedXZErrorModel(SimpleErrorModel):
         p_x = p_y = p_z = probability / 3
         return 1 - sum((p_x, p_y, p_z)), p_x, p_y, p_z
 
+    @property
+    def label(self):
+        """See :meth:`qecsim.model.ErrorModel.label`"""
+        return 'Depolarizing 1-qubit error + 2-qubit Pauli error'
+
+    def __repr__(self):
+        params = ', '.join('{}={!r}'.format(k, v) for k, v in self._params if v is not None)
+        return '{}({})'.format(type(self).__name__, params)
+
+
+@cli_description('Depolarizing single-qubit error + XZ error')
+class CorrelatedXZErrorModel(TwoQubitPauliErrorModel):
+    """
+    Implements a depolarizing single-qubit + 2-qubit XZ error model.
+    """
+
+    # multiply qubit #q by X and neighbour by Z, or qubit #q by Z and neighbour by X
+    default_distribution = {'XZ': 1 / 2, 'ZX': 1 / 2}
+
     @property
     def label(self):
         """See :meth:`qecsim.model.ErrorModel.label`"""
         return 'Depolarizing 1-qubit error + 2-qubit XZ error'
 
+
 @cli_description('Depolarizing single-qubit error + XX error')
-class CorrelatedXXErrorModel(SimpleErrorModel):
+class CorrelatedXXErrorModel(TwoQubitPauliErrorModel):
     """
     Implements a depolarizing single-qubit + 2-qubit XX error model.
     """
 
-    def generate(self, code, error_probability_1, error_probability, rng=None):
-        """
-        Generates single-qubit errors (depolarizing model) and two-qubit errors (XX correlations)
-        """
-
-        n = code.size[0]
-        m = code.size[1]
-        d = n * m - 1
-        step = code.n_k_d[0]
-        # Probability of single-qubit error gate:
-        error_probability_1 = error_probability_1
-        # Probability of a two-qubit error gate. Qubits on the boundary have less nearest neighbours, hence the
-        # effect of two-qubit errors overall reduced. To simulate correctly the effect of two-qubit noise we multiply
-        # the two-qubit error probability by factor beta > 1, which becomes close to 1 for large codes.
-        error_probability = error_probability * (n * m + (n - 1) * (m - 1)) / (
-                    4 * 0.25 + (2 * n + 2 * m - 8) * 0.5 + n * m + (n - 1) * (m - 1) - 2 * n - 2 * m + 4)
-        #  Generate single-qubit errors
-        rng = np.random.default_rng()  # if rng is None else rng
-        n_qubits = code.n_k_d[0]
-        error_pauli = ''.join(rng.choice(
-            ('I', 'X', 'Y', 'Z'),
-            size=n_qubits,
-            p=self.probability_distribution(error_probability_1)
-        ))
-        total_error = pt.pauli_to_bsf(error_pauli)
-        # Generate two-qubit errors
-        # First, a loop over all primal qubits
-        for q in range(0, d - m - 1):
-            i = q // m
-            k = q % m
-            col = k
-            # Error between a primal qubit q and bottom-left from it
-            qubit_1 = q
-            qubit_2 = d + (m - 1) * i + k
-            if col > 0:
-                total_error[qubit_1], total_error[qubit_1 + step], total_error[qubit_2], total_error[
-                    qubit_2 + step] = self.two_qubit_error_generator(total_error[qubit_1], total_error[qubit_1 + step],
-                                                                     total_error[qubit_2], total_error[qubit_2 + step],
-                                                                     error_probability)
-            # Error between a primal qubit q and bottom-right from it
-            qubit_1 = q
-            qubit_2 = d + (m - 1) * i + k + 1
-            if col < m - 1:
-                total_error[qubit_1], total_error[qubit_1 + step], total_error[qubit_2], total_error[
-                    qubit_2 + step] = self.two_qubit_error_generator(total_error[qubit_1], total_error[qubit_1 + step],
-                                                                     total_error[qubit_2], total_error[qubit_2 + step],
-                                                                     error_probability)
-        # a loop over all dual qubits
-        for q in range(m, d):
-            i = q // m
-            k = q % m
-            col = k
-            qubit_1 = q
-            qubit_2 = d + (m - 1) * (i - 1) + k
-            if col > 0:
-                total_error[qubit_1], total_error[qubit_1 + step], total_error[qubit_2], total_error[
-                    qubit_2 + step] = self.two_qubit_error_generator(total_error[qubit_1], total_error[qubit_1 + step],
-                                                                     total_error[qubit_2], total_error[qubit_2 + step],
-                                                                     error_probability)
-            qubit_1 = q
-            qubit_2 = d + (m - 1) * (i - 1) + k + 1
-            if col < m - 1:
-                total_error[qubit_1], total_error[qubit_1 + step], total_error[qubit_2], total_error[
-                    qubit_2 + step] = self.two_qubit_error_generator(total_error[qubit_1], total_error[qubit_1 + step],
-                                                                     total_error[qubit_2], total_error[qubit_2 + step],
-                                                                     error_probability)
-        return total_error
-
-    def two_qubit_error_generator(self, qubit_1_x, qubit_1_z, qubit_2_x, qubit_2_z, error_probability):
-        rnd = np.random.uniform(0, 1)
-        if (rnd < error_probability):
-            qubit_1_x, qubit_1_z = self.mult_by_x(qubit_1_x, qubit_1_z)
-            qubit_2_x, qubit_2_z = self.mult_by_x(qubit_2_x, qubit_2_z)
-        return qubit_1_x, qubit_1_z, qubit_2_x, qubit_2_z
-
-    def mult_by_x(self, qubit_x, qubit_z):
-        qubit_x = (qubit_x + 1) % 2
-        qubit_z = qubit_z
-        return qubit_x, qubit_z
-
-    @functools.lru_cache()
-    def probability_distribution(self, probability):
-        p_x = p_y = p_z = probability / 3
-        return 1 - sum((p_x, p_y, p_z)), p_x, p_y, p_z
+    default_distribution = {'XX': 1.0}
 
     @property
     def label(self):
         """See :meth:`qecsim.model.ErrorModel.label`"""
         return 'Depolarizing 1-qubit error + 2-qubit XX error'
 
+
 @cli_description('Depolarizing single-qubit error + depolarizing 2-qubit error')
-class CorrelatedDepolarizingErrorModel(SimpleErrorModel):
+class CorrelatedDepolarizingErrorModel(TwoQubitPauliErrorModel):
     """
     Implements depolarizing single-qubit + depolarizing 2-qubit errors.
     """
 
-    def generate(self, code, error_probability_1, error_probability, rng=None):
-        """
-        Generates single-qubit errors (depolarizing model) and two-qubit errors (depolarizing model)
-        """
+    # products of non-identity Paulis with equal probability
+    default_distribution = {a + b: 1 / 9 for a in 'XYZ' for b in 'XYZ'}
 
-        n = code.size[0]
-        m = code.size[1]
-        d = n * m - 1
-        step = code.n_k_d[0]
-
-        # Probability of single-qubit error gate:
-        error_probability_1 = error_probability_1
-        # Probability of a two-qubit error gate. Qubits on the boundary have less nearest neighbours, hence the
-        # effect of two-qubit errors overall reduced. To simulate correctly the effect of two-qubit noise we multiply
-        # the two-qubit error probability by factor beta > 1, which becomes close to 1 for large codes.
-        error_probability = error_probability * (n * m + (n - 1) * (m - 1)) / (4 * 0.25 + (2 * n + 2 * m - 8) * 0.5 + n * m + (n - 1) * (m - 1) - 2 * n - 2 * m + 4)
-        #  Generate single-qubit errors
-        rng = np.random.default_rng() # if rng is None else rng
-        n_qubits = code.n_k_d[0]
-        error_pauli = ''.join(rng.choice(
-            ('I', 'X', 'Y', 'Z'),
-            size=n_qubits,
-            p=self.probability_distribution(error_probability_1)
-        ))
-        total_error = pt.pauli_to_bsf(error_pauli)
-        #  Generate two-qubit errors
-        for q in range(0, d - m - 1):
-            i = q // m
-            k = q % m
-            col = k
-            qubit_1 = q
-            qubit_2 = d + (m - 1) * i + k
-            if col > 0:
-                total_error[qubit_1], total_error[qubit_1 + step], total_error[qubit_2], total_error[
-                    qubit_2 + step] = self.two_qubit_error_generator(total_error[qubit_1], total_error[qubit_1 + step],
-                                                                     total_error[qubit_2], total_error[qubit_2 + step],
-                                                                     error_probability)
-
-            qubit_1 = q
-            qubit_2 = d + (m - 1) * i + k + 1
-            if col < m - 1:
-                total_error[qubit_1], total_error[qubit_1 + step], total_error[qubit_2], total_error[
-                    qubit_2 + step] = self.two_qubit_error_generator(total_error[qubit_1], total_error[qubit_1 + step],
-                                                                     total_error[qubit_2], total_error[qubit_2 + step],
-                                                                     error_probability)
-
-        for q in range(m, d):
-            i = q // m
-            k = q % m
-            col = k
-            qubit_1 = q
-            qubit_2 = d + (m - 1) * (i - 1) + k
-            if col > 0:
-                total_error[qubit_1], total_error[qubit_1 + step], total_error[qubit_2], total_error[
-                    qubit_2 + step] = self.two_qubit_error_generator(total_error[qubit_1], total_error[qubit_1 + step],
-                                                                     total_error[qubit_2], total_error[qubit_2 + step],
-                                                                     error_probability)
-            qubit_1 = q
-            qubit_2 = d + (m - 1) * (i - 1) + k + 1
-            if col < m - 1:
-                total_error[qubit_1], total_error[qubit_1 + step], total_error[qubit_2], total_error[
-                    qubit_2 + step] = self.two_qubit_error_generator(total_error[qubit_1], total_error[qubit_1 + step],
-                                                                     total_error[qubit_2], total_error[qubit_2 + step],
-                                                                     error_probability)
-
-        return total_error
-    def two_qubit_error_generator(self, qubit_1_x, qubit_1_z, qubit_2_x, qubit_2_z, error_probability):
-        rnd = np.random.uniform(0, 1)
-        if rnd < error_probability / 9:
-            # multiply qubit #q by X and lower-left by X
-            qubit_1_x, qubit_1_z = self.mult_by_x(qubit_1_x, qubit_1_z)
-            qubit_2_x, qubit_2_z = self.mult_by_x(qubit_2_x, qubit_2_z)
-        elif error_probability / 9 < rnd < 2 * error_probability / 9:
-            # multiply qubit #q by Y and lower-left by Y
-            qubit_1_x, qubit_1_z = self.mult_by_y(qubit_1_x, qubit_1_z)
-            qubit_2_x, qubit_2_z = self.mult_by_y(qubit_2_x, qubit_2_z)
-        elif 2 * error_probability / 9 < rnd < 3 * error_probability / 9:
-            # multiply qubit #q by Z and lower-left by Z
-            qubit_1_x, qubit_1_z = self.mult_by_z(qubit_1_x, qubit_1_z)
-            qubit_2_x, qubit_2_z = self.mult_by_z(qubit_2_x, qubit_2_z)
-        elif 3 * error_probability / 9 < rnd < 4 * error_probability / 9:
-            # multiply qubit #q by X and lower-left by Y
-            qubit_1_x, qubit_1_z = self.mult_by_x(qubit_1_x, qubit_1_z)
-            qubit_2_x, qubit_2_z = self.mult_by_y(qubit_2_x, qubit_2_z)
-        elif 4 * error_probability / 9 < rnd < 5 * error_probability / 9:
-            # multiply qubit #q by Y and lower-left by X
-            qubit_1_x, qubit_1_z = self.mult_by_y(qubit_1_x, qubit_1_z)
-            qubit_2_x, qubit_2_z = self.mult_by_x(qubit_2_x, qubit_2_z)
-        elif 5 * error_probability / 9 < rnd < 6 * error_probability / 9:
-            # multiply qubit #q by X and lower-left by Z
-            qubit_1_x, qubit_1_z = self.mult_by_x(qubit_1_x, qubit_1_z)
-            qubit_2_x, qubit_2_z = self.mult_by_z(qubit_2_x, qubit_2_z)
-        elif 6 * error_probability / 9 < rnd < 7 * error_probability / 9:
-            # multiply qubit #q by Z and lower-left by X
-            qubit_1_x, qubit_1_z = self.mult_by_z(qubit_1_x, qubit_1_z)
-            qubit_2_x, qubit_2_z = self.mult_by_x(qubit_2_x, qubit_2_z)
-        elif 7 * error_probability / 9 < rnd < 8 * error_probability / 9:
-            # multiply qubit #q by Y and lower-left by Z
-            qubit_1_x, qubit_1_z = self.mult_by_y(qubit_1_x, qubit_1_z)
-            qubit_2_x, qubit_2_z = self.mult_by_z(qubit_2_x, qubit_2_z)
-        elif 8 * error_probability / 9 < rnd < error_probability:
-            # multiply qubit #q by Z and lower-left by Y
-            qubit_1_x, qubit_1_z = self.mult_by_z(qubit_1_x, qubit_1_z)
-            qubit_2_x, qubit_2_z = self.mult_by_y(qubit_2_x, qubit_2_z)
-        return qubit_1_x, qubit_1_z, qubit_2_x, qubit_2_z
-    def mult_by_x(self, qubit_x, qubit_z):
-        qubit_x = (qubit_x + 1) % 2
-        qubit_z = qubit_z
-        return qubit_x, qubit_z
-    def mult_by_z(self, qubit_x, qubit_z):
-        qubit_x = qubit_x
-        qubit_z = (qubit_z + 1) % 2
-        return qubit_x, qubit_z
-    def mult_by_y(self, qubit_x, qubit_z):
-        qubit_x = (qubit_x + 1) % 2
-        qubit_z = (qubit_z + 1) % 2
-        return qubit_x, qubit_z
-    @functools.lru_cache()
-    def probability_distribution(self, probability):
-        p_x = p_y = p_z = probability / 3
-        return 1 - sum((p_x, p_y, p_z)), p_x, p_y, p_z
     @property
     def label(self):
         """See :meth:`qecsim.model.ErrorModel.label`"""
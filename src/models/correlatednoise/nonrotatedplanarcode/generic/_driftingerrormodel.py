@@ -0,0 +1,253 @@
+import contextlib
+import math
+
+import numpy as np
+from scipy import signal
+from qecsim.model import ErrorModel
+
+from models.common._noisepipeline import NoisePipeline
+
+
+class OrnsteinUhlenbeckDrift:
+    """
+    Ornstein-Uhlenbeck process, i.e. mean-reverting drift, sampled at unit time steps.
+
+    Notes:
+
+    * Steps are sampled exactly as the AR(1) recursion x' = a x + s N(0, 1), with a = exp(-theta) and
+      s = sigma sqrt((1 - a^2) / (2 theta)), so the stationary standard deviation is sigma / sqrt(2 theta).
+    * A chunk of steps is evaluated in one vectorized call of :func:`scipy.signal.lfilter`.
+    """
+
+    def __init__(self, theta, sigma):
+        """
+        Initialise new Ornstein-Uhlenbeck drift.
+
+        :param theta: Mean reversion rate per time step.
+        :type theta: float
+        :param sigma: Volatility per square root of time step.
+        :type sigma: float
+        :raises ValueError: if theta is not > 0 or sigma is not >= 0.
+        """
+        if not (theta > 0 and math.isfinite(theta) and sigma >= 0 and math.isfinite(sigma)):
+            raise ValueError('{} valid theta is a number > 0 and sigma a number >= 0'.format(type(self).__name__))
+        self._theta = theta
+        self._sigma = sigma
+
+    def sample(self, x, n_steps, rng):
+        """
+        Return the next steps of the process.
+
+        :param x: Current value of the process.
+        :type x: float
+        :param n_steps: Number of steps.
+        :type n_steps: int
+        :param rng: Random number generator.
+        :type rng: numpy.random.Generator
+        :return: Values of the process after each step.
+        :rtype: numpy.array (1d)
+        """
+        a = math.exp(-self._theta)
+        s = self._sigma * math.sqrt((1 - a ** 2) / (2 * self._theta))
+        steps, _ = signal.lfilter([1.0], [1.0, -a], s * rng.standard_normal(n_steps), zi=[a * x])
+        return steps
+
+    def __repr__(self):
+        return '{}({!r}, {!r})'.format(type(self).__name__, self._theta, self._sigma)
+
+
+class RandomWalkDrift:
+    """
+    Gaussian random walk, i.e. unbounded drift, sampled at unit time steps.
+    """
+
+    def __init__(self, sigma):
+        """
+        Initialise new random walk drift.
+
+        :param sigma: Standard deviation per time step.
+        :type sigma: float
+        :raises ValueError: if sigma is not >= 0.
+        """
+        if not (sigma >= 0 and math.isfinite(sigma)):
+            raise ValueError('{} valid sigma is a number >= 0'.format(type(self).__name__))
+        self._sigma = sigma
+
+    def sample(self, x, n_steps, rng):
+        """See :meth:`OrnsteinUhlenbeckDrift.sample`"""
+        return x + np.cumsum(self._sigma * rng.standard_normal(n_steps))
+
+    def __repr__(self):
+        return '{}({!r})'.format(type(self).__name__, self._sigma)
+
+
+class DriftingErrorModel(ErrorModel):
+    """
+    Wraps an error model so that its error probabilities drift over shots.
+
+    Notes:
+
+    * Shots are generated in blocks of ``block_size`` shots. Each block uses the given error probabilities scaled by
+      exp(x), where x is the value of the drift process at that block (independent processes for each error
+      probability), and the result is clipped to [0, 1]. x starts at 0 and takes one step per block.
+    * Drift trajectories are generated lazily, ``chunk_size`` blocks at a time, and each block of errors is
+      generated in one call of the ``generate_batch`` method of the wrapped model. Only the current chunk and block
+      are held, so memory does not grow with the number of shots. Drifted probabilities are used for one block
+      only, so the fault tables of wrapped models with a :class:`NoisePipeline` are compiled per block without
+      caching, see :meth:`NoisePipeline.uncached`.
+    * :meth:`generate` returns the next error of the current block, so the wrapper can be passed to
+      :func:`appcorrelated.run` in place of the wrapped model. :attr:`block` identifies the block of the last error,
+      from which :func:`appcorrelated.run` records runs and failures per block in ``drift_blocks`` of the runs data.
+    * Any wrapped model with ``generate_batch(code, *probabilities, shots, rng)`` can drift, e.g. the correlated
+      error models (error_probability_1 and error_probability) or :class:`LocalErrorModel` (the scale of the
+      landscape of :class:`LocalCode`).
+    """
+
+    def __init__(self, error_model, drift, block_size=1024, chunk_size=256):
+        """
+        Initialise new drifting error model.
+
+        :param error_model: Error model with a ``generate_batch`` method.
+        :type error_model: ErrorModel
+        :param drift: Drift process of the log-scale of error probabilities, e.g. :class:`OrnsteinUhlenbeckDrift`.
+        :type drift: OrnsteinUhlenbeckDrift or RandomWalkDrift
+        :param block_size: Number of shots per block of constant error probabilities. (default=1024)
+        :type block_size: int
+        :param chunk_size: Number of blocks per lazily generated chunk of the drift trajectory. (default=256)
+        :type chunk_size: int
+        :raises ValueError: if block_size or chunk_size is not >= 1.
+        """
+        if not (block_size >= 1 and chunk_size >= 1):
+            raise ValueError('{} valid block_size and chunk_size are integers >= 1'.format(type(self).__name__))
+        self._error_model = error_model
+        self._drift = drift
+        self._block_size = block_size
+        self._chunk_size = chunk_size
+        self.reset()
+
+    def reset(self):
+        """
+        Restart drift at 0 and discard generated blocks.
+        """
+        self._probabilities = None  # nominal probabilities of current trajectory
+        self._x = None  # last values of drift processes (one per probability)
+        self._chunk = None  # drift values of current chunk, shape (n_probabilities, chunk_size)
+        self._chunk_position = 0
+        self._block = -1  # index of current block
+        self._block_probabilities = None
+        self._errors = None  # errors of current block
+        self._error_position = 0
+
+    @property
+    def error_model(self):
+        """
+        The wrapped error model.
+
+        :rtype: ErrorModel
+        """
+        return self._error_model
+
+    @property
+    def block(self):
+        """
+        Index of the block of the last generated error, or -1 if no error has been generated.
+
+        :rtype: int
+        """
+        return self._block
+
+    @property
+    def block_probabilities(self):
+        """
+        Drifted error probabilities of the current block, or None if no error has been generated.
+
+        :rtype: tuple of float
+        """
+        return self._block_probabilities
+
+    def _next_block_probabilities(self, probabilities, rng):
+        """Advance to the next block and return its drifted error probabilities."""
+        if probabilities != self._probabilities:
+            # new nominal probabilities start a new trajectory
+            self.reset()
+            self._probabilities = probabilities
+            self._x = np.zeros(len(probabilities))
+        if self._chunk is None or self._chunk_position == self._chunk_size:
+            self._chunk = np.array([self._drift.sample(x, self._chunk_size, rng) for x in self._x])
+            self._x = self._chunk[:, -1]
+            self._chunk_position = 0
+        x = self._chunk[:, self._chunk_position]
+        self._chunk_position += 1
+        self._block += 1
+        return tuple(float(v) for v in np.clip(np.asarray(probabilities) * np.exp(x), 0.0, 1.0))
+
+    def generate_blocks(self, code, *probabilities, shots, rng=None):
+        """
+        Generate errors in blocks of drifted error probabilities.
+
+        :param code: Stabilizer code.
+        :type code: StabilizerCode
+        :param probabilities: Nominal error probabilities, as passed to the wrapped model.
+        :type probabilities: float
+        :param shots: Total number of errors to generate.
+        :type shots: int
+        :param rng: Random number generator. (default=None resolves to numpy.random.default_rng())
+        :type rng: numpy.random.Generator
+        :return: Iterator of block index, drifted error probabilities and errors of the block (the last block may
+            have fewer than block_size errors).
+        :rtype: iterator of (int, tuple of float, numpy.array (2d))
+        """
+        rng = np.random.default_rng() if rng is None else rng
+        while shots > 0:
+            block_shots = min(shots, self._block_size)
+            self._block_probabilities = self._next_block_probabilities(probabilities, rng)
+            errors = self._generate_block(code, block_shots, rng)
+            # errors are yielded as a whole, so the next call of generate starts a new block
+            self._errors = None
+            yield self._block, self._block_probabilities, errors
+            shots -= block_shots
+
+    def _generate_block(self, code, shots, rng):
+        """Return errors of the current block, without caching the fault tables of its drifted probabilities."""
+        pipeline = getattr(self._error_model, 'pipeline', None)
+        context = pipeline.uncached() if isinstance(pipeline, NoisePipeline) else contextlib.nullcontext()
+        with context:
+            return self._error_model.generate_batch(code, *self._block_probabilities, shots, rng)
+
+    def generate(self, code, *args, rng=None):
+        """
+        Generate the next error of the current block, starting a new block when the current one is exhausted.
+
+        :param code: Stabilizer code.
+        :type code: StabilizerCode
+        :param args: Nominal error probabilities, as passed to the wrapped model, optionally followed by a random
+            number generator.
+        :type args: float
+        :param rng: Random number generator. (default=None resolves to numpy.random.default_rng())
+        :type rng: numpy.random.Generator
+        :return: Error in bsf format.
+        :rtype: numpy.array (1d)
+        """
+        if args and isinstance(args[-1], np.random.Generator):
+            args, rng = args[:-1], args[-1]
+        rng = np.random.default_rng() if rng is None else rng
+        if args != self._probabilities or self._errors is None or self._error_position == len(self._errors):
+            self._block_probabilities = self._next_block_probabilities(args, rng)
+            self._errors = self._generate_block(code, self._block_size, rng)
+            self._error_position = 0
+        error = self._errors[self._error_position]
+        self._error_position += 1
+        return error.astype(int)
+
+    def probability_distribution(self, probability):
+        """See :meth:`qecsim.model.ErrorModel.probability_distribution`"""
+        return self._error_model.probability_distribution(probability)
+
+    @property
+    def label(self):
+        """See :meth:`qecsim.model.ErrorModel.label`"""
+        return 'Drifting {}'.format(self._error_model.label)
+
+    def __repr__(self):
+        return '{}({!r}, {!r}, {!r}, {!r})'.format(type(self).__name__, self._error_model, self._drift,
+                                                   self._block_size, self._chunk_size)
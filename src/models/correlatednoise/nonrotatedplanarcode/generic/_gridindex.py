@@ -0,0 +1,61 @@
+import collections
+
+import numpy as np
+
+
+def nearest_neighbours(rows, cols, k):
+    """
+    Return the k nearest points of each point, found with a grid bucket index.
+
+    Notes:
+
+    * Distance is taxicab distance abs(row_a - row_b) + abs(col_a - col_b). Ties are broken by point number.
+    * Points are bucketed in square cells holding about k points on average. The cells around each point are searched
+      in rings of increasing Chebyshev distance until the k-th nearest candidate is closer than any point in the next
+      ring, so each point only visits nearby buckets.
+
+    :param rows: Row of each point.
+    :type rows: numpy.array (1d) of int
+    :param cols: Column of each point.
+    :type cols: numpy.array (1d) of int
+    :param k: Number of neighbours.
+    :type k: int
+    :return: Indices of the min(k, n_points - 1) nearest other points of each point, nearest first.
+    :rtype: numpy.array (2d) of int with shape (n_points, min(k, n_points - 1))
+    """
+    rows, cols = np.asarray(rows, dtype=int), np.asarray(cols, dtype=int)
+    n_points = len(rows)
+    k = max(0, min(k, n_points - 1))
+    neighbours = np.empty((n_points, k), dtype=int)
+    if k == 0:
+        return neighbours
+    # cell size such that cells hold about k points on average
+    span = max(np.ptp(rows), np.ptp(cols)) + 1
+    cell = max(1, int(np.ceil(span * np.sqrt(k / n_points))))
+    cell_rows, cell_cols = rows // cell, cols // cell
+    buckets = collections.defaultdict(list)
+    for i, key in enumerate(zip(cell_rows.tolist(), cell_cols.tolist())):
+        buckets[key].append(i)
+    buckets = {key: np.array(points) for key, points in buckets.items()}
+    max_ring = max(np.ptp(cell_rows), np.ptp(cell_cols))
+    for i in range(n_points):
+        candidates = []
+        ring = 0
+        while True:
+            # add buckets on the square ring at Chebyshev distance ring from the cell of point i
+            for dr in range(-ring, ring + 1):
+                for dc in ((-ring, ring) if abs(dr) != ring else range(-ring, ring + 1)):
+                    points = buckets.get((cell_rows[i] + dr, cell_cols[i] + dc))
+                    if points is not None:
+                        candidates.append(points)
+            # points beyond the ring are at least ring * cell + 1 away
+            if ring >= max_ring or sum(len(c) for c in candidates) > k:
+                found = np.concatenate(candidates)
+                found = found[found != i]
+                distances = np.abs(rows[found] - rows[i]) + np.abs(cols[found] - cols[i])
+                order = np.lexsort((found, distances))[:k]
+                if ring >= max_ring or (len(order) == k and distances[order[-1]] <= ring * cell):
+                    neighbours[i] = found[order]
+                    break
+            ring += 1
+    return neighbours
@@ -0,0 +1,539 @@
+import networkx as nx
+import numpy as np
+from qecsim.graphtools import blossom5
+
+#: Matching backends, see :class:`Matcher`.
+MATCHING_BACKENDS = ('auto', 'networkx', 'blossom5', 'sparse_blossom')
+
+
+def quantize_weights(weights, resolution=2 ** 24):
+    """
+    Return integer weights proportional to the given weights, and the precision lost by rounding.
+
+    Notes:
+
+    * Weights are scaled so the largest finite absolute weight is ``resolution`` and rounded to the nearest integer.
+      Non-finite weights are clipped to twice the resolution (with the sign of the weight).
+    * The precision loss is the largest absolute rounding error of a weight, in units of the given weights, i.e. at
+      most 0.5 / scale. The total weight of a matching of m edges is off by at most m times the precision loss.
+
+    :param weights: Weights.
+    :type weights: numpy.array (1d) of float
+    :param resolution: Integer of the largest finite absolute weight. (default=2**24)
+    :type resolution: int
+    :return: Integer weights, scale (integer weights / weights) and precision loss.
+    :rtype: 3-tuple of (numpy.array (1d) of int64, float, float)
+    """
+    weights = np.asarray(weights, dtype=float)
+    finite = np.isfinite(weights)
+    max_abs = np.abs(weights[finite]).max() if finite.any() else 0.0
+    scale = resolution / max_abs if max_abs else 1.0
+    scaled = np.where(finite, weights * scale, np.sign(weights) * 2 * resolution)
+    int_weights = np.rint(scaled).astype(np.int64)
+    precision_loss = float(np.abs(int_weights - scaled)[finite].max() / scale) if finite.any() else 0.0
+    return int_weights, scale, precision_loss
+
+
+def mwpm_networkx(n_nodes, u, v, w):
+    """
+    Minimum weight perfect matching over edge arrays (using NetworkX Python library).
+
+    :param n_nodes: Number of nodes, labelled 0 to n_nodes - 1.
+    :type n_nodes: int
+    :param u: First node of each edge.
+    :type u: numpy.array (1d) of int
+    :param v: Second node of each edge.
+    :type v: numpy.array (1d) of int
+    :param w: Weight of each edge.
+    :type w: numpy.array (1d) of float or int
+    :return: Matching as mate of each node (-1 if unmatched).
+    :rtype: numpy.array (1d) of int
+    """
+    mates = np.full(n_nodes, -1)
+    if len(u):
+        # networkx max_weight_matching is maximum weight matching so we take negative of all edge weight
+        graph = nx.Graph()
+        graph.add_weighted_edges_from(zip(u.tolist(), v.tolist(), (-np.asarray(w)).tolist()))
+        for a, b in nx.algorithms.max_weight_matching(graph, maxcardinality=True):
+            mates[a], mates[b] = b, a
+    return mates
+
+
+def mwpm_blossom5(n_nodes, u, v, w):
+    """
+    Minimum weight perfect matching over edge arrays with integer weights (using Blossom V C++ library).
+
+    See :func:`mwpm_networkx` for parameters. Every node must be in at least one edge.
+
+    :raises OSError: if Blossom V library cannot be loaded.
+    """
+    mates = np.full(n_nodes, -1)
+    if len(u):
+        edges = list(zip(u.tolist(), v.tolist(), np.asarray(w, dtype=np.int64).tolist()))
+        for a, b in blossom5.mwpm_ids(edges):
+            mates[a], mates[b] = b, a
+    return mates
+
+
+def mwpm_sparse_blossom(n_nodes, u, v, w):
+    """
+    Minimum weight perfect matching over edge arrays with integer weights (using in-repo blossom algorithm).
+
+    See :func:`mwpm_networkx` for parameters.
+
+    Notes:
+
+    * This is Edmonds' primal-dual blossom algorithm, after the ``mwmatching`` implementation of J. van Rantwijk (the
+      basis of :func:`networkx.algorithms.max_weight_matching`), on flat lists indexed by node and edge number rather
+      than on graph dicts. Only the given edges are stored, so sparse graphs are cheaper than complete graphs.
+    * Weights are reflected (largest weight + 1 - weight) and doubled, so a maximum weight maximum cardinality
+      matching is a minimum weight perfect matching, and all dual variables stay integer.
+    """
+    mates = np.full(n_nodes, -1)
+    if not len(u):
+        return mates
+    w = np.asarray(w, dtype=np.int64)
+    weights = (2 * (int(w.max()) + 1 - w)).tolist()
+    matched = _max_weight_matching(n_nodes, u.tolist(), v.tolist(), weights)
+    for a, b in enumerate(matched):
+        mates[a] = b
+    return mates
+
+
+def _max_weight_matching(n_vertices, edge_u, edge_v, edge_w):
+    """Return the mate of each vertex (-1 if unmatched) in a maximum weight maximum cardinality matching, for
+    non-negative even integer weights."""
+    n_edges = len(edge_w)
+    # endpoint[p] is the vertex of endpoint p: edge k has endpoints 2k (edge_u[k]) and 2k + 1 (edge_v[k])
+    endpoint = [0] * (2 * n_edges)
+    endpoint[0::2], endpoint[1::2] = edge_u, edge_v
+    # neighbend[i] lists the remote endpoints of the edges of vertex i
+    neighbend = [[] for _ in range(n_vertices)]
+    for k in range(n_edges):
+        neighbend[edge_u[k]].append(2 * k + 1)
+        neighbend[edge_v[k]].append(2 * k)
+    max_weight = max(0, max(edge_w))
+    # mate[i] is the remote endpoint of the matched edge of vertex i, or -1
+    mate = [-1] * n_vertices
+    # labels of top-level blossoms (0 free, 1 S, 2 T, 5 scanned), and of vertices if labelled from outside
+    label = [0] * (2 * n_vertices)
+    labelend = [-1] * (2 * n_vertices)
+    inblossom = list(range(n_vertices))
+    blossomparent = [-1] * (2 * n_vertices)
+    blossomchilds = [None] * (2 * n_vertices)
+    blossombase = list(range(n_vertices)) + [-1] * n_vertices
+    blossomendps = [None] * (2 * n_vertices)
+    bestedge = [-1] * (2 * n_vertices)
+    blossombestedges = [None] * (2 * n_vertices)
+    unusedblossoms = list(range(n_vertices, 2 * n_vertices))
+    dualvar = [max_weight] * n_vertices + [0] * n_vertices
+    allowedge = [False] * n_edges
+    queue = []
+
+    def slack(k):
+        return dualvar[edge_u[k]] + dualvar[edge_v[k]] - 2 * edge_w[k]
+
+    def blossom_leaves(b):
+        if b < n_vertices:
+            yield b
+        else:
+            for t in blossomchilds[b]:
+                if t < n_vertices:
+                    yield t
+                else:
+                    yield from blossom_leaves(t)
+
+    def assign_label(w, t, p):
+        # label vertex w and its top-level blossom with t, reached through endpoint p
+        b = inblossom[w]
+        label[w] = label[b] = t
+        labelend[w] = labelend[b] = p
+        bestedge[w] = bestedge[b] = -1
+        if t == 1:
+            queue.extend(blossom_leaves(b))
+        elif t == 2:
+            base = blossombase[b]
+            assign_label(endpoint[mate[base]], 1, mate[base] ^ 1)
+
+    def scan_blossom(v, w):
+        # trace back from v and w to find a new blossom (return its base) or an augmenting path (return -1)
+        path = []
+        base = -1
+        while v != -1 or w != -1:
+            b = inblossom[v]
+            if label[b] & 4:
+                base = blossombase[b]
+                break
+            path.append(b)
+            label[b] = 5
+            if labelend[b] == -1:
+                v = -1
+            else:
+                v = endpoint[labelend[b]]
+                b = inblossom[v]
+                v = endpoint[labelend[b]]
+            if w != -1:
+                v, w = w, v
+        for b in path:
+            label[b] = 1
+        return base
+
+    def add_blossom(base, k):
+        # construct a new blossom with the given base, through S-vertices joined by edge k
+        v, w = edge_u[k], edge_v[k]
+        bb = inblossom[base]
+        bv = inblossom[v]
+        bw = inblossom[w]
+        b = unusedblossoms.pop()
+        blossombase[b] = base
+        blossomparent[b] = -1
+        blossomparent[bb] = b
+        blossomchilds[b] = path = []
+        blossomendps[b] = endps = []
+        while bv != bb:
+            blossomparent[bv] = b
+            path.append(bv)
+            endps.append(labelend[bv])
+            v = endpoint[labelend[bv]]
+            bv = inblossom[v]
+        path.append(bb)
+        path.reverse()
+        endps.reverse()
+        endps.append(2 * k)
+        while bw != bb:
+            blossomparent[bw] = b
+            path.append(bw)
+            endps.append(labelend[bw] ^ 1)
+            w = endpoint[labelend[bw]]
+            bw = inblossom[w]
+        label[b] = 1
+        labelend[b] = labelend[bb]
+        dualvar[b] = 0
+        for v in blossom_leaves(b):
+            if label[inblossom[v]] == 2:
+                queue.append(v)
+            inblossom[v] = b
+        # least-slack edges from the new blossom to each neighbouring S-blossom
+        bestedgeto = {}
+        for bv in path:
+            if blossombestedges[bv] is None:
+                nblist = [p // 2 for v in blossom_leaves(bv) for p in neighbend[v]]
+            else:
+                nblist = blossombestedges[bv]
+            for k in nblist:
+                i, j = edge_u[k], edge_v[k]
+                if inblossom[j] == b:
+                    i, j = j, i
+                bj = inblossom[j]
+                if bj != b and label[bj] == 1 and (bj not in bestedgeto or slack(k) < slack(bestedgeto[bj])):
+                    bestedgeto[bj] = k
+            blossombestedges[bv] = None
+            bestedge[bv] = -1
+        blossombestedges[b] = list(bestedgeto.values())
+        bestedge[b] = -1
+        for k in blossombestedges[b]:
+            if bestedge[b] == -1 or slack(k) < slack(bestedge[b]):
+                bestedge[b] = k
+
+    def expand_blossom(b, endstage):
+        # expand the given top-level blossom
+        for s in blossomchilds[b]:
+            blossomparent[s] = -1
+            if s < n_vertices:
+                inblossom[s] = s
+            elif endstage and dualvar[s] == 0:
+                expand_blossom(s, endstage)
+            else:
+                for v in blossom_leaves(s):
+                    inblossom[v] = s
+        if not endstage and label[b] == 2:
+            # relabel the sub-blossoms on the path from the entry child to the base as T and S
+            entrychild = inblossom[endpoint[labelend[b] ^ 1]]
+            j = blossomchilds[b].index(entrychild)
+            if j & 1:
+                j -= len(blossomchilds[b])
+                jstep, endptrick = 1, 0
+            else:
+                jstep, endptrick = -1, 1
+            p = labelend[b]
+            while j != 0:
+                label[endpoint[p ^ 1]] = 0
+                label[endpoint[blossomendps[b][j - endptrick] ^ endptrick ^ 1]] = 0
+                assign_label(endpoint[p ^ 1], 2, p)
+                allowedge[blossomendps[b][j - endptrick] // 2] = True
+                j += jstep
+                p = blossomendps[b][j - endptrick] ^ endptrick
+                allowedge[p // 2] = True
+                j += jstep
+            bv = blossomchilds[b][j]
+            label[endpoint[p ^ 1]] = label[bv] = 2
+            labelend[endpoint[p ^ 1]] = labelend[bv] = p
+            bestedge[bv] = -1
+            j += jstep
+            while blossomchilds[b][j] != entrychild:
+                bv = blossomchilds[b][j]
+                if label[bv] == 1:
+                    j += jstep
+                    continue
+                for v in blossom_leaves(bv):
+                    if label[v] != 0:
+                        break
+                if label[v] != 0:
+                    label[v] = 0
+                    label[endpoint[mate[blossombase[bv]]]] = 0
+                    assign_label(v, 2, labelend[v])
+                j += jstep
+        label[b] = labelend[b] = -1
+        blossomchilds[b] = blossomendps[b] = None
+        blossombase[b] = -1
+        blossombestedges[b] = None
+        bestedge[b] = -1
+        unusedblossoms.append(b)
+
+    def augment_blossom(b, v):
+        # swap matched and unmatched edges on the even path from vertex v to the base of blossom b
+        t = v
+        while blossomparent[t] != b:
+            t = blossomparent[t]
+        if t >= n_vertices:
+            augment_blossom(t, v)
+        i = j = blossomchilds[b].index(t)
+        if i & 1:
+            j -= len(blossomchilds[b])
+            jstep, endptrick = 1, 0
+        else:
+            jstep, endptrick = -1, 1
+        while j != 0:
+            j += jstep
+            t = blossomchilds[b][j]
+            p = blossomendps[b][j - endptrick] ^ endptrick
+            if t >= n_vertices:
+                augment_blossom(t, endpoint[p])
+            j += jstep
+            t = blossomchilds[b][j]
+            if t >= n_vertices:
+                augment_blossom(t, endpoint[p ^ 1])
+            mate[endpoint[p]] = p ^ 1
+            mate[endpoint[p ^ 1]] = p
+        blossomchilds[b] = blossomchilds[b][i:] + blossomchilds[b][:i]
+        blossomendps[b] = blossomendps[b][i:] + blossomendps[b][:i]
+        blossombase[b] = blossombase[blossomchilds[b][0]]
+
+    def augment_matching(k):
+        # swap matched and unmatched edges on the augmenting path through edge k
+        for s, p in (edge_u[k], 2 * k + 1), (edge_v[k], 2 * k):
+            while True:
+                bs = inblossom[s]
+                if bs >= n_vertices:
+                    augment_blossom(bs, s)
+                mate[s] = p
+                if labelend[bs] == -1:
+                    break
+                t = endpoint[labelend[bs]]
+                bt = inblossom[t]
+                s = endpoint[labelend[bt]]
+                j = endpoint[labelend[bt] ^ 1]
+                if bt >= n_vertices:
+                    augment_blossom(bt, j)
+                mate[j] = labelend[bt]
+                p = labelend[bt] ^ 1
+
+    # each stage augments the matching by one edge, or ends the algorithm
+    for _ in range(n_vertices):
+        label[:] = [0] * (2 * n_vertices)
+        bestedge[:] = [-1] * (2 * n_vertices)
+        blossombestedges[n_vertices:] = [None] * n_vertices
+        allowedge[:] = [False] * n_edges
+        queue[:] = []
+        for v in range(n_vertices):
+            if mate[v] == -1 and label[inblossom[v]] == 0:
+                assign_label(v, 1, -1)
+        augmented = False
+        while True:
+            # grow alternating trees from S-vertices along tight edges
+            while queue and not augmented:
+                v = queue.pop()
+                for p in neighbend[v]:
+                    k = p // 2
+                    w = endpoint[p]
+                    if inblossom[v] == inblossom[w]:
+                        continue
+                    if not allowedge[k]:
+                        kslack = slack(k)
+                        if kslack <= 0:
+                            allowedge[k] = True
+                    if allowedge[k]:
+                        if label[inblossom[w]] == 0:
+                            assign_label(w, 2, p ^ 1)
+                        elif label[inblossom[w]] == 1:
+                            base = scan_blossom(v, w)
+                            if base >= 0:
+                                add_blossom(base, k)
+                            else:
+                                augment_matching(k)
+                                augmented = True
+                                break
+                        elif label[w] == 0:
+                            label[w] = 2
+                            labelend[w] = p ^ 1
+                    elif label[inblossom[w]] == 1:
+                        b = inblossom[v]
+                        if bestedge[b] == -1 or kslack < slack(bestedge[b]):
+                            bestedge[b] = k
+                    elif label[w] == 0:
+                        if bestedge[w] == -1 or kslack < slack(bestedge[w]):
+                            bestedge[w] = k
+            if augmented:
+                break
+            # no tight edge to follow, so update the dual variables by the least slack
+            deltatype, delta, deltaedge, deltablossom = -1, None, -1, -1
+            for v in range(n_vertices):
+                if label[inblossom[v]] == 0 and bestedge[v] != -1:
+                    d = slack(bestedge[v])
+                    if deltatype == -1 or d < delta:
+                        deltatype, delta, deltaedge = 2, d, bestedge[v]
+            for b in range(2 * n_vertices):
+                if blossomparent[b] == -1 and label[b] == 1 and bestedge[b] != -1:
+                    d = slack(bestedge[b]) // 2
+                    if deltatype == -1 or d < delta:
+                        deltatype, delta, deltaedge = 3, d, bestedge[b]
+            for b in range(n_vertices, 2 * n_vertices):
+                if (blossombase[b] >= 0 and blossomparent[b] == -1 and label[b] == 2
+                        and (deltatype == -1 or dualvar[b] < delta)):
+                    deltatype, delta, deltablossom = 4, dualvar[b], b
+            if deltatype == -1:
+                # no further improvement possible, so end with maximum cardinality
+                deltatype, delta = 1, max(0, min(dualvar[:n_vertices]))
+            for v in range(n_vertices):
+                if label[inblossom[v]] == 1:
+                    dualvar[v] -= delta
+                elif label[inblossom[v]] == 2:
+                    dualvar[v] += delta
+            for b in range(n_vertices, 2 * n_vertices):
+                if blossombase[b] >= 0 and blossomparent[b] == -1:
+                    if label[b] == 1:
+                        dualvar[b] += delta
+                    elif label[b] == 2:
+                        dualvar[b] -= delta
+            if deltatype == 1:
+                break
+            elif deltatype == 2:
+                allowedge[deltaedge] = True
+                i, j = edge_u[deltaedge], edge_v[deltaedge]
+                if label[inblossom[i]] == 0:
+                    i, j = j, i
+                queue.append(i)
+            elif deltatype == 3:
+                allowedge[deltaedge] = True
+                queue.append(edge_u[deltaedge])
+            elif deltatype == 4:
+                expand_blossom(deltablossom, False)
+        if not augmented:
+            break
+        # expand S-blossoms with zero dual at the end of the stage
+        for b in range(n_vertices, 2 * n_vertices):
+            if blossomparent[b] == -1 and blossombase[b] >= 0 and label[b] == 1 and dualvar[b] == 0:
+                expand_blossom(b, True)
+    return [endpoint[p] if p >= 0 else -1 for p in mate]
+
+
+class Matcher:
+    """
+    Minimum weight perfect matching over edge arrays with a choice of backend.
+
+    Notes:
+
+    * Backends are 'networkx' (float weights, as :func:`qecsim.graphtools.mwpm_networkx`), 'blossom5' (Blossom V C++
+      library, see :mod:`qecsim.graphtools.blossom5`), 'sparse_blossom' (in-repo blossom algorithm, see
+      :func:`mwpm_sparse_blossom`) and 'auto' (blossom5 if available, else networkx, as
+      :func:`qecsim.graphtools.mwpm`).
+    * Integer backends match weights quantized by :func:`quantize_weights`. The largest precision loss of any matching
+      is reported by :attr:`precision_loss`.
+    """
+
+    def __init__(self, backend='auto', resolution=2 ** 24):
+        """
+        Initialise new matcher.
+
+        :param backend: Matching backend, one of :data:`MATCHING_BACKENDS`. (default='auto')
+        :type backend: str
+        :param resolution: Integer of the largest finite absolute weight of integer backends. (default=2**24)
+        :type resolution: int
+        :raises ValueError: if backend is not valid.
+        :raises OSError: if backend is 'blossom5' and Blossom V library cannot be loaded.
+        """
+        if backend not in MATCHING_BACKENDS:
+            raise ValueError('{} valid backends are {}'.format(type(self).__name__, MATCHING_BACKENDS))
+        if backend == 'auto':
+            backend = 'blossom5' if blossom5.available() else 'networkx'
+        if backend == 'blossom5':
+            blossom5.infty()  # raises OSError if Blossom V library cannot be loaded
+            # largest weight an order of magnitude smaller than "infty", see blossom5.weight_to_int_fn
+            resolution = min(resolution, blossom5.infty() // 10)
+        self._backend = backend
+        self._resolution = int(resolution)
+        self._precision_loss = 0.0
+
+    @property
+    def backend(self):
+        """
+        Matching backend.
+
+        :rtype: str
+        """
+        return self._backend
+
+    @property
+    def precision_loss(self):
+        """
+        Largest error in the total weight of a matching due to quantization, over all matchings so far.
+
+        :rtype: float
+        """
+        return self._precision_loss
+
+    def match(self, n_nodes, u, v, w):
+        """
+        Return the minimum weight perfect matching of the given graph.
+
+        :param n_nodes: Number of nodes, labelled 0 to n_nodes - 1.
+        :type n_nodes: int
+        :param u: First node of each edge.
+        :type u: numpy.array (1d) of int
+        :param v: Second node of each edge.
+        :type v: numpy.array (1d) of int
+        :param w: Weight of each edge.
+        :type w: numpy.array (1d) of float
+        :return: Matches as (a, b) with a < b.
+        :rtype: list of (int, int)
+        """
+        if self._backend == 'networkx':
+            mates = mwpm_networkx(n_nodes, u, v, w)
+        else:
+            int_weights, _, loss = quantize_weights(w, self._resolution)
+            self._precision_loss = max(self._precision_loss, loss * (n_nodes // 2))
+            mwpm = mwpm_blossom5 if self._backend == 'blossom5' else mwpm_sparse_blossom
+            mates = mwpm(n_nodes, u, v, int_weights)
+        a = np.flatnonzero(mates > np.arange(n_nodes))
+        return list(zip(a.tolist(), mates[a].tolist()))
+
+    def match_graph(self, graph):
+        """
+        Return the minimum weight perfect matching of the given graph of node objects.
+
+        :param graph: Graph of weighted edges between nodes, as {(a_node, b_node): weight, ...}.
+        :type graph: dict of (object, object) edges to float weights.
+        :return: Matches between nodes as (a_node, b_node).
+        :rtype: set of (object, object)
+        """
+        if not graph:
+            return set()
+        nodes = list(dict.fromkeys(node for edge in graph for node in edge))
+        node_ids = {node: i for i, node in enumerate(nodes)}
+        u = np.fromiter((node_ids[a] for a, _ in graph), dtype=int, count=len(graph))
+        v = np.fromiter((node_ids[b] for _, b in graph), dtype=int, count=len(graph))
+        w = np.fromiter(graph.values(), dtype=float, count=len(graph))
+        return {(nodes[a], nodes[b]) for a, b in self.match(len(nodes), u, v, w)}
+
+    def __repr__(self):
+        return '{}({!r}, {!r})'.format(type(self).__name__, self._backend, self._resolution)
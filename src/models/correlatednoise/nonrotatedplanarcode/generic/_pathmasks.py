@@ -0,0 +1,122 @@
+import functools
+
+import numpy as np
+
+
+class PathMasks:
+    """
+    Operators of the paths of a planar code, for building recoveries of many paths with a few array operations.
+
+    Notes:
+
+    * A path between plaquettes A and B, as by :meth:`qecsim.models.planar.PlanarPauli.path`, heads north/south along
+      the column of A to the row of B, then west/east along the row of B to B. It flips the sites crossed on the way,
+      each with the operator of the crossing direction, e.g. X for north/south and Z for west/east on XZ codes, or the
+      local operators of MMHH codes.
+    * The operator and bsf position of each site, for north/south and for west/east crossings, are read once per code
+      by applying single-step paths with ``code.new_pauli().path``, so the masks agree with the operator layout of any
+      planar Pauli, e.g. :class:`PlanarPauliXZ` or :class:`PlanarPauliMMHH`.
+    * Paths are added as toggles at their ends to difference arrays over the lattice, one for column segments and one
+      for row segments. Prefix-XOR along columns and rows gives the crossed sites of all paths at once, so a recovery
+      is built in O(rows * cols) however many and however long the paths are.
+    """
+
+    def __init__(self, code):
+        """
+        Initialise new path masks.
+
+        :param code: Planar code.
+        :type code: PlanarCode
+        """
+        rows, cols = code.size
+        self._size = code.size
+        self._n_qubits = code.n_k_d[0]
+        # grid positions are lattice indices offset by 1, to include virtual plaquettes
+        shape = (2 * rows + 1, 2 * cols + 1)
+        self._flat = {direction: -np.ones(shape, dtype=int) for direction in 'vh'}
+        self._xs = {direction: np.zeros(shape, dtype=int) for direction in 'vh'}
+        self._zs = {direction: np.zeros(shape, dtype=int) for direction in 'vh'}
+        # scratch difference arrays of column and row segments, reused by each recovery
+        self._toggles = {direction: np.zeros(shape, dtype=int) for direction in 'vh'}
+        pauli = code.new_pauli()
+        for r, c in zip(*np.nonzero(np.indices((2 * rows - 1, 2 * cols - 1)).sum(axis=0) % 2 == 0)):
+            for direction, a_index, b_index in (('v', (r - 1, c), (r + 1, c)), ('h', (r, c - 1), (r, c + 1))):
+                # apply and undo single-step path across site
+                bsf = pauli.path(a_index, b_index).to_bsf()
+                pauli.path(a_index, b_index)
+                flat = np.flatnonzero(bsf[:self._n_qubits] | bsf[self._n_qubits:])
+                if len(flat):
+                    self._flat[direction][r + 1, c + 1] = flat[0]
+                    self._xs[direction][r + 1, c + 1] = bsf[flat[0]]
+                    self._zs[direction][r + 1, c + 1] = bsf[self._n_qubits + flat[0]]
+
+    @property
+    def nbytes(self):
+        """
+        Memory used by the masks in bytes.
+
+        :rtype: int
+        """
+        return sum(array.nbytes for arrays in (self._flat, self._xs, self._zs, self._toggles)
+                   for array in arrays.values())
+
+    def recovery(self, a_indices, b_indices):
+        """
+        Return the recovery of the paths between the given pairs of plaquettes.
+
+        Notes:
+
+        * Pairs of plaquettes may be on either lattice. Pairs of virtual plaquettes are connected by a zero length
+          path, as by :meth:`qecsim.models.planar.PlanarPauli.path`.
+
+        :param a_indices: Plaquette indices as (row, column) of the start of each path.
+        :type a_indices: numpy.array (2d) of int
+        :param b_indices: Plaquette indices as (row, column) of the end of each path.
+        :type b_indices: numpy.array (2d) of int
+        :return: Recovery as binary symplectic vector.
+        :rtype: numpy.array (1d)
+        :raises IndexError: If indices are not plaquette indices within one step of the lattice.
+        """
+        rows, cols = self._size
+        a_r, a_c = np.asarray(a_indices, dtype=int).reshape(-1, 2).T
+        b_r, b_c = np.asarray(b_indices, dtype=int).reshape(-1, 2).T
+        indices = np.concatenate((a_r, b_r)), np.concatenate((a_c, b_c))
+        if (np.any((indices[0] + indices[1]) % 2 == 0) or np.any(indices[0] < -1) or np.any(indices[0] > 2 * rows - 1)
+                or np.any(indices[1] < -1) or np.any(indices[1] > 2 * cols - 1)):
+            raise IndexError('Indices are not plaquette indices for code of size {}.'.format(self._size))
+        # skip pairs of virtual plaquettes
+        a_in = (0 <= a_r) & (a_r <= 2 * rows - 2) & (0 <= a_c) & (a_c <= 2 * cols - 2)
+        b_in = (0 <= b_r) & (b_r <= 2 * rows - 2) & (0 <= b_c) & (b_c <= 2 * cols - 2)
+        keep = a_in | b_in
+        a_r, a_c, b_r, b_c = a_r[keep] + 1, a_c[keep] + 1, b_r[keep] + 1, b_c[keep] + 1
+        # toggle ends of column segments (along column of A) and row segments (along row of B)
+        toggles = self._toggles
+        for array in toggles.values():
+            array.fill(0)
+        np.bitwise_xor.at(toggles['v'], (np.concatenate((a_r, b_r)), np.concatenate((a_c, a_c))), 1)
+        np.bitwise_xor.at(toggles['h'], (np.concatenate((b_r, b_r)), np.concatenate((a_c, b_c))), 1)
+        # prefix-XOR gives the positions between the ends of an odd number of segments
+        xs, zs = np.zeros(self._n_qubits, dtype=int), np.zeros(self._n_qubits, dtype=int)
+        for direction, axis in ('v', 0), ('h', 1):
+            crossed = np.bitwise_xor.accumulate(toggles[direction], axis=axis).astype(bool)
+            crossed &= self._flat[direction] >= 0
+            flat = self._flat[direction][crossed]
+            xs[flat] ^= self._xs[direction][crossed]
+            zs[flat] ^= self._zs[direction][crossed]
+        return np.concatenate((xs, zs))
+
+    def __repr__(self):
+        return '{}(size={!r})'.format(type(self).__name__, self._size)
+
+
+@functools.lru_cache(maxsize=2 ** 6)
+def path_masks(code):
+    """
+    Return the (cached) path masks of the given code, see :class:`PathMasks`.
+
+    :param code: Planar code.
+    :type code: PlanarCode
+    :return: Path masks.
+    :rtype: PathMasks
+    """
+    return PathMasks(code)
@@ -1,76 +1,395 @@
+import collections
 import functools
-import itertools
-import math
 
-from qecsim import graphtools as gt
+import numpy as np
 from qecsim.model import Decoder, cli_description
 
+from models.common._artifactcache import code_fingerprint
+from models.correlatednoise.nonrotatedplanarcode.generic._gridindex import nearest_neighbours
+from models.correlatednoise.nonrotatedplanarcode.generic._matching import Matcher
+from models.correlatednoise.nonrotatedplanarcode.generic._pathmasks import path_masks
+from models.correlatednoise.nonrotatedplanarcode.generic._weighttables import BytesLRUCache, WeightTable, WeightTableCache
+
+#: Number of shots decoded by :class:`PlanarMWPMDecoder` by decoding path: zero syndrome, fully resolved by the
+#: predecoder, matched on one or both lattices, or recovered from the recovery cache.
+DecodeStats = collections.namedtuple('DecodeStats',
+                                     ['shots', 'trivial', 'predecoded', 'one_lattice', 'both_lattices', 'cached'])
+
+
+@functools.lru_cache(maxsize=2 ** 8)
+def syndrome_layout(size):
+    """
+    Return the plaquettes of each syndrome bit of a planar code of the given size, and their virtual plaquettes.
+
+    Notes:
+
+    * Syndrome bits are ordered as by :meth:`qecsim.models.planar.PlanarCode.syndrome_to_plaquette_indices`, i.e.
+      primal plaquettes then dual plaquettes, each in order of increasing row and column.
+    * Virtual plaquettes are as by :meth:`qecsim.models.planar.PlanarCode.virtual_plaquette_index`, i.e. just outside
+      the nearest row (primal) or column (dual) boundary.
+
+    :param size: Size of code as (rows, columns).
+    :type size: 2-tuple of int
+    :return: Lattice (True for primal), row, column, virtual row and virtual column of each syndrome bit, keyed by
+        'primal', 'rows', 'cols', 'virtual_rows' and 'virtual_cols'.
+    :rtype: dict of str to numpy.array (1d)
+    """
+    rows, cols = size
+    r, c = np.indices((2 * rows - 1, 2 * cols - 1))
+    primal = (r % 2 == 1) & (c % 2 == 0)
+    dual = (r % 2 == 0) & (c % 2 == 1)
+    plaquette_rows = np.concatenate((r[primal], r[dual]))
+    plaquette_cols = np.concatenate((c[primal], c[dual]))
+    is_primal = np.arange(len(plaquette_rows)) < np.count_nonzero(primal)
+    near_top = abs(plaquette_rows - 1) <= abs(2 * rows - 3 - plaquette_rows)
+    near_left = abs(plaquette_cols - 1) <= abs(2 * cols - 3 - plaquette_cols)
+    virtual_rows = np.where(is_primal, np.where(near_top, -1, 2 * rows - 1), plaquette_rows)
+    virtual_cols = np.where(is_primal, plaquette_cols, np.where(near_left, -1, 2 * cols - 1))
+    return {'primal': is_primal, 'rows': plaquette_rows, 'cols': plaquette_cols, 'virtual_rows': virtual_rows,
+            'virtual_cols': virtual_cols}
+
+
 @cli_description('MWPM')
 class PlanarMWPMDecoder(Decoder):
     """
     Implements a planar Minimum Weight Perfect Matching (MWPM) decoder.
+
+    Notes:
+
+    * Weights only depend on the absolute plaquette steps between nodes, so the decoder holds one
+      :class:`WeightTable` per code size and error probabilities, built in one vectorized call of :meth:`weights`.
+      Subclasses implement their weighting by overriding :meth:`weights`.
+    * Weight tables are kept in a least recently used cache bounded by ``max_table_bytes``, see :meth:`cache_info`.
+    * Graphs are matched by the given matching backend, see :class:`Matcher`.
+    * If ``n_neighbours`` is given, graphs are sparse, see :meth:`graphs`. A lattice falls back to the complete
+      graph if its sparse graph has no perfect matching, counted by :attr:`sparse_fallbacks`.
+    * The recovery of all matched paths is built at once from the :class:`PathMasks` of the code.
+    * If ``predecoder`` is given, isolated defects are resolved locally before matching, see
+      :class:`GreedyPredecoder`.
+    * Shots with a zero syndrome are not decoded, and lattices without defects are not matched, see
+      :meth:`decode_batch` and :attr:`decode_stats`.
+    * If ``recovery_cache_bytes`` is given, recoveries are cached by code, error probabilities and syndrome, so
+      repeated syndromes are not matched again, see :meth:`recovery_cache_info`.
     """
 
-    def __init__(self, degeneracy=True):
+    def __init__(self, degeneracy=True, max_table_bytes=2 ** 26, matching_backend='auto', weight_resolution=2 ** 24,
+                 n_neighbours=None, predecoder=None, recovery_cache_bytes=None):
         """
         Initialise new planar decoder.
 
         :param degeneracy: Apply degeneracy term. (default=True)
         :type degeneracy: bool
+        :param max_table_bytes: Memory budget of cached weight tables in bytes. (default=2**26)
+        :type max_table_bytes: int
+        :param matching_backend: Matching backend, 'auto', 'networkx', 'blossom5' or 'sparse_blossom'. (default='auto')
+        :type matching_backend: str
+        :param weight_resolution: Integer of the largest weight for integer matching backends. (default=2**24)
+        :type weight_resolution: int
+        :param n_neighbours: Number of nearest defects joined to each defect, or None for complete graphs.
+            (default=None)
+        :type n_neighbours: int or None
+        :param predecoder: Predecoder of isolated defects, or None to match all defects. (default=None)
+        :type predecoder: GreedyPredecoder or None
+        :param recovery_cache_bytes: Memory budget of cached (packed) recoveries in bytes, or None to not cache them.
+            (default=None)
+        :type recovery_cache_bytes: int or None
+        :raises ValueError: if matching_backend is not valid.
+        :raises OSError: if matching_backend is 'blossom5' and Blossom V library cannot be loaded.
         """
+        # as given, for repr
+        self._params = [('degeneracy', degeneracy), ('max_table_bytes', max_table_bytes),
+                        ('matching_backend', matching_backend), ('weight_resolution', weight_resolution),
+                        ('n_neighbours', n_neighbours), ('predecoder', predecoder),
+                        ('recovery_cache_bytes', recovery_cache_bytes)]
         self._degeneracy = bool(degeneracy)
+        self._tables = WeightTableCache(max_table_bytes)
+        self._matcher = Matcher(matching_backend, weight_resolution)
+        self._n_neighbours = None if n_neighbours is None else int(n_neighbours)
+        self._sparse_fallbacks = 0
+        self._predecoder = predecoder
+        self._decode_stats = DecodeStats(0, 0, 0, 0, 0, 0)
+        self._recoveries = None if recovery_cache_bytes is None else BytesLRUCache(recovery_cache_bytes)
+
+    @property
+    def matcher(self):
+        """
+        Matcher of graphs, which reports the matching backend and precision loss of weight quantization.
+
+        :rtype: Matcher
+        """
+        return self._matcher
+
+    @property
+    def sparse_fallbacks(self):
+        """
+        Number of sparse graphs without perfect matching that fell back to complete graphs.
+
+        :rtype: int
+        """
+        return self._sparse_fallbacks
+
+    @property
+    def predecoder(self):
+        """
+        Predecoder of isolated defects, which reports how many defects it resolved, or None.
+
+        :rtype: GreedyPredecoder or None
+        """
+        return self._predecoder
+
+    @property
+    def decode_stats(self):
+        """
+        Number of shots decoded so far, by decoding path.
+
+        :rtype: DecodeStats
+        """
+        return self._decode_stats
+
+    @classmethod
+    def weights(cls, row_steps, col_steps, p1, p2, degeneracy):
+        """
+        Vectorized weight function weighted to prefer steps along rows and allow for degeneracy if specified.
+
+        :param row_steps: Absolute row steps between plaquettes.
+        :type row_steps: numpy.array of int
+        :param col_steps: Absolute column steps between plaquettes.
+        :type col_steps: numpy.array of int
+        :param p1: Single-qubit error probability.
+        :type p1: float
+        :param p2: Two-qubit error probability.
+        :type p2: float
+        :param degeneracy: Apply degeneracy term.
+        :type degeneracy: bool
+        :return: Weights.
+        :rtype: numpy.array of float
+        """
+        probability = p1 ** (row_steps + col_steps) + p2 ** np.maximum(row_steps, col_steps)
+        with np.errstate(divide='ignore'):
+            return -np.log(probability)
 
     @classmethod
-    @functools.lru_cache(maxsize=2 ** 28)  # to handle up to 100x100 codes.
     def distance(cls, code, a_index, b_index, p1, p2, degeneracy):
         """Distance function weighted to prefer steps along rows and allow for degeneracy if specified."""
         steps_along_rows, steps_along_cols = code.translation(a_index, b_index)
-        max_steps = max(abs(steps_along_rows), abs(steps_along_cols))
-        probability = p1 ** (abs(steps_along_rows) + abs(steps_along_cols)) + p2 ** max_steps
-        separation = -math.log(probability)
-        return separation
+        return float(cls.weights(np.abs(steps_along_rows), np.abs(steps_along_cols), p1, p2, degeneracy))
+
+    def weight_table(self, code, p1, p2):
+        """
+        Return the (cached) weight table of the given code and error probabilities.
+
+        :param code: Planar code.
+        :type code: PlanarCode
+        :param p1: Single-qubit error probability.
+        :type p1: float
+        :param p2: Two-qubit error probability.
+        :type p2: float
+        :return: Weight table.
+        :rtype: WeightTable
+        """
+        key = (code.size, p1, p2, self._degeneracy)
+        return self._tables.get(key, lambda: WeightTable(
+            code, lambda row_steps, col_steps: self.weights(row_steps, col_steps, p1, p2, self._degeneracy)))
+
+    def cache_info(self):
+        """
+        Return statistics of the weight table cache.
+
+        :return: Hits, misses, evictions, memory budget, memory used and number of tables.
+        :rtype: CacheInfo
+        """
+        return self._tables.cache_info()
+
+    def recovery_cache_info(self):
+        """
+        Return statistics of the recovery cache, or None if recoveries are not cached.
+
+        :return: Hits, misses, evictions, memory budget, memory used and number of recoveries.
+        :rtype: CacheInfo or None
+        """
+        return None if self._recoveries is None else self._recoveries.cache_info()
+
+    def graphs(self, code, syndrome, error_probability_1, error_probability, n_neighbours=None):
+        """
+        Return the primal and dual matching graphs of the given syndrome as arrays of nodes and weighted edges.
+
+        Notes:
+
+        * Complete graphs (n_neighbours is None) have as nodes the defects of the lattice, followed by their
+          (distinct) virtual plaquettes and, if the number of nodes is odd, an extra virtual plaquette well
+          off-boundary. Edges join each defect to its virtual plaquette with the boundary weight, all pairs of defects
+          with their weight, and all pairs of virtual plaquettes with zero weight.
+        * Sparse graphs have as nodes the defects of the lattice, followed by one boundary node per defect (at its
+          virtual plaquette). Edges join each defect to its boundary node with the boundary weight, each defect to its
+          nearest defects (see :func:`nearest_neighbours`) with their weight, and the boundary nodes of each such pair
+          of defects with zero weight, instead of a clique of virtual plaquettes. Every defect can be matched to its
+          boundary node, so sparse graphs have O(k * n_neighbours) edges for k defects.
+        * Edges are assembled by broadcasting over :func:`syndrome_layout` and :meth:`weight_table`.
+
+        :param code: Planar code.
+        :type code: PlanarCode
+        :param syndrome: Syndrome as binary vector.
+        :type syndrome: numpy.array (1d)
+        :param error_probability_1: Single-qubit error probability.
+        :type error_probability_1: float
+        :param error_probability: Two-qubit error probability.
+        :type error_probability: float
+        :param n_neighbours: Number of nearest defects joined to each defect, or None for complete graphs.
+            (default=None)
+        :type n_neighbours: int or None
+        :return: For the primal and dual lattices, the number of defects, node indices as (row, column) and edges as
+            arrays of node numbers u, v and weights w.
+        :rtype: list of (int, numpy.array (2d), numpy.array (1d), numpy.array (1d), numpy.array (1d))
+        """
+        layout = syndrome_layout(code.size)
+        table = self.weight_table(code, error_probability_1, error_probability)
+        bits = np.flatnonzero(syndrome)
+        graphs = []
+        # extra virual indices are deliberately well off-boundary to be separate from nearest virtual indices
+        for primal, extra_vindex in (True, (-9, -10)), (False, (-10, -9)):
+            defects = bits[layout['primal'][bits] == primal]
+            n_defects = len(defects)
+            rows, cols = layout['rows'][defects], layout['cols'][defects]
+            vindices = np.stack((layout['virtual_rows'][defects], layout['virtual_cols'][defects]), axis=1)
+            boundary_u = np.arange(n_defects)
+            boundary_w = table.boundary(rows, cols)
+            if n_neighbours is None:
+                vindices, to_vindex = np.unique(vindices, axis=0, return_inverse=True)
+                # add extra virtual node if odd number of total nodes
+                if (n_defects + len(vindices)) % 2:
+                    vindices = np.concatenate((vindices, [extra_vindex]))
+                # weighted edges between nodes and virtual nodes
+                boundary_v = n_defects + to_vindex.reshape(-1)
+                # weighted edges between all (non-virtual) nodes
+                pair_u, pair_v = np.triu_indices(n_defects, k=1)
+                # zero weight edges between all virtual nodes
+                virtual_u, virtual_v = np.triu_indices(len(vindices), k=1)
+            else:
+                # weighted edges between nodes and their own boundary nodes
+                boundary_v = n_defects + boundary_u
+                # weighted edges between nodes and their nearest nodes (without duplicates)
+                neighbours = nearest_neighbours(rows // 2, cols // 2, n_neighbours)
+                pairs = np.stack((np.repeat(boundary_u, neighbours.shape[1]), neighbours.reshape(-1)), axis=1)
+                pair_u, pair_v = np.unique(np.sort(pairs, axis=1), axis=0).reshape(-1, 2).T
+                # zero weight edges between boundary nodes of nearest nodes
+                virtual_u, virtual_v = pair_u, pair_v
+            nodes = np.concatenate((np.stack((rows, cols), axis=1), vindices)).reshape(-1, 2)
+            pair_w = table.weights((rows[pair_u] - rows[pair_v]) // 2, (cols[pair_u] - cols[pair_v]) // 2)
+            u = np.concatenate((boundary_u, pair_u, n_defects + virtual_u))
+            v = np.concatenate((boundary_v, pair_v, n_defects + virtual_v))
+            w = np.concatenate((boundary_w, pair_w, np.zeros(len(virtual_u))))
+            graphs.append((n_defects, nodes, u, v, w))
+        return graphs
+
+    def _decode(self, code, syndrome, error_probability_1, error_probability):
+        """
+        Return the recovery of the given syndrome and the decoding path taken, i.e. a field of :class:`DecodeStats`.
+        """
+        syndrome = np.asarray(syndrome)
+        if not syndrome.any():
+            return np.zeros(2 * code.n_k_d[0], dtype=int), 'trivial'
+        if self._recoveries is None:
+            return self._match(code, syndrome, error_probability_1, error_probability)
+        # recoveries are cached packed, keyed by code, weights and packed syndrome
+        key = (code_fingerprint(code), error_probability_1, error_probability, self._degeneracy,
+               np.packbits(syndrome.astype(np.uint8)).tobytes())
+        paths = []
+
+        def build():
+            recovery, path = self._match(code, syndrome, error_probability_1, error_probability)
+            paths.append(path)
+            return np.packbits(recovery.astype(np.uint8))
+
+        packed = self._recoveries.get(key, build)
+        recovery = np.unpackbits(packed, count=2 * code.n_k_d[0]).astype(int)
+        return recovery, paths[0] if paths else 'cached'
+
+    def _match(self, code, syndrome, error_probability_1, error_probability):
+        """
+        Return the recovery of the given non-zero syndrome and the decoding path taken, see :meth:`_decode`.
+        """
+        # resolve isolated defects locally and match the residual syndrome
+        predecoded = None
+        if self._predecoder is not None:
+            predecoded, syndrome, _ = self._predecoder.predecode(code, syndrome)
+            if not syndrome.any():
+                return predecoded, 'predecoded'
+        # plaquettes of paths of recovery
+        a_indices, b_indices = [], []
+        # primal and dual graphs, and complete graphs in case sparse graphs have no perfect matching
+        graphs = self.graphs(code, syndrome, error_probability_1, error_probability, self._n_neighbours)
+        complete_graphs = None
+        n_lattices = 0
+        for lattice, (n_defects, nodes, u, v, w) in enumerate(graphs):
+            # skip lattice without defects
+            if not n_defects:
+                continue
+            n_lattices += 1
+            # find MWPM edges [(a, b), (c, d), ...]
+            mates = self._matcher.match(len(nodes), u, v, w)
+            if 2 * len(mates) < len(nodes):
+                self._sparse_fallbacks += 1
+                if complete_graphs is None:
+                    complete_graphs = self.graphs(code, syndrome, error_probability_1, error_probability)
+                n_defects, nodes, u, v, w = complete_graphs[lattice]
+                mates = self._matcher.match(len(nodes), u, v, w)
+            # add paths of edges (paths between virtual nodes are empty)
+            mates = np.array(mates, dtype=int).reshape(-1, 2)
+            mates = mates[mates.min(axis=1) < n_defects]
+            a_indices.append(nodes[mates[:, 0]])
+            b_indices.append(nodes[mates[:, 1]])
+        # recovery of all paths as bsf
+        recovery = path_masks(code).recovery(np.concatenate(a_indices), np.concatenate(b_indices))
+        recovery = recovery if predecoded is None else recovery ^ predecoded
+        return recovery, 'one_lattice' if n_lattices == 1 else 'both_lattices'
+
+    def _count(self, path, shots=1):
+        """Add the given number of shots that took the given decoding path to :attr:`decode_stats`."""
+        self._decode_stats = self._decode_stats._replace(
+            shots=self._decode_stats.shots + shots, **{path: getattr(self._decode_stats, path) + shots})
 
     def decode(self, code, syndrome, error_probability_1, error_probability, **kwargs):
         """See :meth:`qecsim.model.Decoder.decode`"""
-        # prepare recovery
-        recovery_pauli = code.new_pauli()
-        # get syndrome indices
-        syndrome_indices = code.syndrome_to_plaquette_indices(syndrome)
-        # split indices into primal and dual
-        primal_indices = [i for i in syndrome_indices if code.is_primal(i)]
-        dual_indices = [i for i in syndrome_indices if code.is_dual(i)]
-        # extra virual indices are deliberately well off-boundary to be separate from nearest virtual indices
-        primal_extra_vindex = (-9, -10)
-        dual_extra_vindex = (-10, -9)
-        # for each type of indices and extra virtual index
-        for indices, extra_vindex in (primal_indices, primal_extra_vindex), (dual_indices, dual_extra_vindex):
-            # prepare graph
-            graph = gt.SimpleGraph()
-            vindices = set()
-            # add weighted edges between nodes and virtual nodes
-            for index in indices:
-                vindex = code.virtual_plaquette_index(index)
-                vindices.add(vindex)
-                distance = self.distance(code, index, vindex, error_probability_1, error_probability, self._degeneracy)
-                graph.add_edge(index, vindex, distance)
-            # add extra virtual node if odd number of total nodes
-            if (len(indices) + len(vindices)) % 2:
-                vindices.add(extra_vindex)
-            # add weighted edges to graph between all (non-virtual) nodes
-            for a_index, b_index in itertools.combinations(indices, 2):
-                distance = self.distance(code, a_index, b_index, error_probability_1, error_probability, self._degeneracy)
-                graph.add_edge(a_index, b_index, distance)
-            # add zero weight edges between all virtual nodes
-            for a_index, b_index in itertools.combinations(vindices, 2):
-                graph.add_edge(a_index, b_index, 0)
-            # find MWPM edges {(a, b), (c, d), ...}
-            mates = gt.mwpm(graph)
-            # iterate edges
-            for a_index, b_index in mates:
-                # add path to recover
-                recovery_pauli.path(a_index, b_index)
-        # return recover as bsf
-        return recovery_pauli.to_bsf()
+        recovery, path = self._decode(code, syndrome, error_probability_1, error_probability)
+        self._count(path)
+        return recovery
+
+    def decode_batch(self, code, syndromes, error_probability_1, error_probability, **kwargs):
+        """
+        Return the recoveries of the given syndromes.
+
+        Notes:
+
+        * Shots with a zero syndrome are not decoded, and lattices without defects are not matched.
+        * Repeated syndromes are decoded once per batch, which saves most matchings at low error probabilities, where
+          few defects make repeats common. Each shot is counted in :attr:`decode_stats` by the decoding path of its
+          syndrome.
+        * Weight tables, syndrome layout and path masks of the code are shared by all shots of the batch.
+
+        :param code: Planar code.
+        :type code: PlanarCode
+        :param syndromes: Syndromes as binary array with one row per shot.
+        :type syndromes: numpy.array (2d)
+        :param error_probability_1: Single-qubit error probability.
+        :type error_probability_1: float
+        :param error_probability: Two-qubit error probability.
+        :type error_probability: float
+        :return: Recoveries as binary symplectic array with one row per shot.
+        :rtype: numpy.array (2d) with shape (shots, 2 * n_qubits)
+        """
+        syndromes = np.asarray(syndromes)
+        recoveries = np.zeros((len(syndromes), 2 * code.n_k_d[0]), dtype=int)
+        shots = np.flatnonzero(syndromes.any(axis=1))
+        self._count('trivial', len(syndromes) - len(shots))
+        if not len(shots):
+            return recoveries
+        unique, inverse, counts = np.unique(syndromes[shots], axis=0, return_inverse=True, return_counts=True)
+        decoded = np.empty((len(unique), recoveries.shape[1]), dtype=int)
+        for i, syndrome in enumerate(unique):
+            decoded[i], path = self._decode(code, syndrome, error_probability_1, error_probability)
+            self._count(path, int(counts[i]))
+        recoveries[shots] = decoded[inverse.reshape(-1)]
+        return recoveries
 
     @property
     def label(self):
@@ -78,4 +397,5 @@ class PlanarMWPMDecoder(Decoder):
         return 'Planar MWPM'
 
     def __repr__(self):
-        return '{}()'.format(type(self).__name__)
+        params = ', '.join('{}={!r}'.format(k, v) for k, v in self._params)
+        return '{}({})'.format(type(self).__name__, params)
@@ -0,0 +1,173 @@
+import functools
+
+import numpy as np
+from qecsim.model import Decoder, cli_description
+
+from models.correlatednoise.nonrotatedplanarcode.generic._pathmasks import path_masks
+from models.correlatednoise.nonrotatedplanarcode.generic._planarmwpmdecoder import syndrome_layout
+from models.correlatednoise.nonrotatedplanarcode.generic._unionfind import growth_lengths, union_find_correction
+from models.correlatednoise.nonrotatedplanarcode.generic._weightkernel import matching_weights
+from models.correlatednoise.nonrotatedplanarcode.generic._weighttables import WeightTable, WeightTableCache
+
+
+@functools.lru_cache(maxsize=2 ** 8)
+def lattice_graph(size, primal, diagonal=False):
+    """
+    Return the decoding graph of the primal or dual lattice of a planar code of the given size.
+
+    Notes:
+
+    * Nodes are the plaquettes of the lattice, in syndrome order (see :func:`syndrome_layout`), followed by the
+      virtual plaquettes just outside the row (primal) or column (dual) boundaries.
+    * Edges join plaquettes one step apart along rows or columns and, if diagonal, plaquettes one step apart along
+      both, except pairs of virtual plaquettes.
+
+    :param size: Size of code as (rows, columns).
+    :type size: 2-tuple of int
+    :param primal: Primal lattice, else dual lattice.
+    :type primal: bool
+    :param diagonal: Include diagonal edges. (default=False)
+    :type diagonal: bool
+    :return: Syndrome bits of the plaquettes, node indices as (row, column), boundary flag of each node and edges as
+        arrays of node numbers u, v and absolute row steps and column steps.
+    :rtype: 6-tuple of (numpy.array (1d), numpy.array (2d), numpy.array (1d), numpy.array (1d), numpy.array (1d),
+        numpy.array (2d))
+    """
+    rows, cols = size
+    layout = syndrome_layout(size)
+    bits = np.flatnonzero(layout['primal'] == primal)
+    # plaquettes and virtual plaquettes of the lattice on a grid with steps of 2
+    if primal:
+        grid_rows, grid_cols = np.arange(-1, 2 * rows, 2), np.arange(0, 2 * cols - 1, 2)
+    else:
+        grid_rows, grid_cols = np.arange(0, 2 * rows - 1, 2), np.arange(-1, 2 * cols, 2)
+    r, c = (a.reshape(-1) for a in np.meshgrid(grid_rows, grid_cols, indexing='ij'))
+    virtual = (r < 0) | (r > 2 * rows - 2) | (c < 0) | (c > 2 * cols - 2)
+    # number grid points as plaquettes in syndrome order then virtual plaquettes
+    grid = -np.ones((len(grid_rows), len(grid_cols)), dtype=int)
+    real_rows, real_cols = layout['rows'][bits], layout['cols'][bits]
+    grid[np.searchsorted(grid_rows, real_rows), np.searchsorted(grid_cols, real_cols)] = np.arange(len(bits))
+    grid_virtual = virtual.reshape(grid.shape)
+    grid[grid_virtual] = len(bits) + np.arange(np.count_nonzero(virtual))
+    nodes = np.concatenate((np.stack((real_rows, real_cols), axis=1),
+                            np.stack((r[virtual], c[virtual]), axis=1))).reshape(-1, 2)
+    is_boundary = np.arange(len(nodes)) >= len(bits)
+    # edges between grid points, skipping pairs of virtual plaquettes
+    offsets = ((1, 0), (0, 1), (1, 1), (1, -1)) if diagonal else ((1, 0), (0, 1))
+    us, vs, steps = [], [], []
+    for dr, dc in offsets:
+        a = grid[max(0, -dr):grid.shape[0] - max(0, dr), max(0, -dc):grid.shape[1] - max(0, dc)]
+        b = grid[max(0, dr):grid.shape[0] - max(0, -dr), max(0, dc):grid.shape[1] - max(0, -dc)]
+        keep = ~(is_boundary[a] & is_boundary[b])
+        us.append(a[keep])
+        vs.append(b[keep])
+        steps.append(np.tile((abs(dr), abs(dc)), (np.count_nonzero(keep), 1)))
+    u, v = np.concatenate(us), np.concatenate(vs)
+    return bits, nodes, is_boundary, u, v, np.concatenate(steps).reshape(-1, 2)
+
+
+@cli_description('UF')
+class PlanarUFDecoder(Decoder):
+    """
+    Implements a planar weighted Union-Find (UF) decoder.
+
+    Notes:
+
+    * Each lattice is decoded on the graph of :func:`lattice_graph` by :func:`union_find_correction`, and the
+      correction is applied as paths between its plaquettes, see :class:`PathMasks`. So the decoder supports every
+      planar code with a ``new_pauli().path``, e.g. XZ, CSS and MMHH planar codes.
+    * Edges are weighted by the same :meth:`weights` as the MWPM decoders, held in a :class:`WeightTable` per code
+      size and error probabilities, and grown with lengths of :func:`growth_lengths`. Diagonal edges are added where
+      the weight of one step along rows and columns is less than the weight of the two steps, e.g. for two-qubit
+      correlations or degeneracy. Subclasses implement their weighting, including any degeneracy term, by overriding
+      :meth:`weights`.
+    * Growth is almost linear in the size of the code, compared with the cubic matching of MWPM.
+    """
+
+    def __init__(self, max_table_bytes=2 ** 26, growth_resolution=2):
+        """
+        Initialise new planar UF decoder.
+
+        :param max_table_bytes: Memory budget of cached weight tables in bytes. (default=2**26)
+        :type max_table_bytes: int
+        :param growth_resolution: Growth length of the lightest edge, see :func:`growth_lengths`. (default=2)
+        :type growth_resolution: int
+        """
+        self._tables = WeightTableCache(max_table_bytes)
+        self._growth_resolution = int(growth_resolution)
+
+    @classmethod
+    def weights(cls, row_steps, col_steps, p1, p2):
+        """
+        Vectorized weight function, counting steps along rows and columns, without a degeneracy term.
+
+        :param row_steps: Absolute row steps between plaquettes.
+        :type row_steps: numpy.array of int
+        :param col_steps: Absolute column steps between plaquettes.
+        :type col_steps: numpy.array of int
+        :param p1: Single-qubit error probability.
+        :type p1: float
+        :param p2: Two-qubit error probability.
+        :type p2: float
+        :return: Weights.
+        :rtype: numpy.array of float
+        """
+        return matching_weights(row_steps, col_steps, p1, p2)
+
+    def weight_table(self, code, p1, p2):
+        """
+        Return the (cached) weight table of the given code and error probabilities.
+
+        See :meth:`PlanarMWPMDecoder.weight_table`.
+        """
+        key = (code.size, p1, p2)
+        return self._tables.get(key, lambda: WeightTable(
+            code, lambda row_steps, col_steps: self.weights(row_steps, col_steps, p1, p2)))
+
+    def cache_info(self):
+        """
+        Return statistics of the weight table cache.
+
+        :return: Hits, misses, evictions, memory budget, memory used and number of tables.
+        :rtype: CacheInfo
+        """
+        return self._tables.cache_info()
+
+    def decode(self, code, syndrome, error_probability_1=None, error_probability=0.1, **kwargs):
+        """
+        See :meth:`qecsim.model.Decoder.decode`
+
+        Note: If error_probability_1 is None, e.g. when run by :func:`qecsim.app.run`, it is taken as
+        error_probability.
+        """
+        if error_probability_1 is None:
+            error_probability_1 = error_probability
+        table = self.weight_table(code, error_probability_1, error_probability)
+        steps = table.steps
+        diagonal = steps[1, 1] < steps[1, 0] + steps[0, 1]
+        syndrome = np.asarray(syndrome)
+        # plaquettes of paths of recovery
+        a_indices, b_indices = [], []
+        for primal in True, False:
+            bits, nodes, is_boundary, u, v, edge_steps = lattice_graph(code.size, primal, bool(diagonal))
+            defects = np.zeros(len(nodes), dtype=int)
+            defects[:len(bits)] = syndrome[bits]
+            if not defects.any():
+                continue
+            lengths = growth_lengths(table.weights(edge_steps[:, 0], edge_steps[:, 1]), self._growth_resolution)
+            # add path of each correction edge
+            correction = union_find_correction(len(nodes), u, v, lengths, defects, is_boundary)
+            a_indices.append(nodes[u[correction]])
+            b_indices.append(nodes[v[correction]])
+        # return recovery of all paths as bsf
+        if not a_indices:
+            return code.new_pauli().to_bsf()
+        return path_masks(code).recovery(np.concatenate(a_indices), np.concatenate(b_indices))
+
+    @property
+    def label(self):
+        """See :meth:`qecsim.model.Decoder.label`"""
+        return 'Planar UF'
+
+    def __repr__(self):
+        return '{}(growth_resolution={!r})'.format(type(self).__name__, self._growth_resolution)
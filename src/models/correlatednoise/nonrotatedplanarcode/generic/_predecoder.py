@@ -0,0 +1,145 @@
+import collections
+import functools
+
+import numpy as np
+from scipy import sparse
+
+#: Statistics of a :class:`GreedyPredecoder`, for one shot or summed over shots.
+PredecoderStats = collections.namedtuple('PredecoderStats', ['shots', 'defects', 'pairs', 'boundary', 'residual'])
+
+
+@functools.lru_cache(maxsize=2 ** 6)
+def local_faults(code, radius=2):
+    """
+    Return the single-qubit faults of the given code that flip one or two syndrome bits, and the neighbourhoods of
+    syndrome bits.
+
+    Notes:
+
+    * Faults are single-qubit X, Z and Y Paulis, in that order of preference. Pair faults flip exactly two syndrome
+      bits, e.g. the two plaquettes either side of a qubit. Boundary faults flip exactly one, e.g. a plaquette next to
+      a boundary.
+    * Syndrome bits are adjacent if some single-qubit fault flips both, so the neighbourhood of radius r of a bit
+      holds the bits within r adjacent steps, excluding itself. The adjacency is a grid index of the lattice that
+      works for planar and rotated planar codes alike.
+
+    :param code: Stabilizer code.
+    :type code: StabilizerCode
+    :param radius: Radius of neighbourhoods. (default=2)
+    :type radius: int
+    :return: Faults flipping syndrome bit pairs as {(a, b): bsf} (a < b), faults flipping single syndrome bits as
+        {a: bsf}, and neighbourhoods of radius 1 and of the given radius as sparse boolean matrices.
+    :rtype: 4-tuple of (dict, dict, scipy.sparse.csr_matrix, scipy.sparse.csr_matrix)
+    """
+    stabilizers = np.asarray(code.stabilizers, dtype=np.uint8)
+    n_qubits = stabilizers.shape[1] // 2
+    # flips[pauli][qubit, bit] is 1 if pauli on qubit anticommutes with stabilizer bit
+    flips_x = stabilizers[:, n_qubits:].T
+    flips_z = stabilizers[:, :n_qubits].T
+    flips = {'X': flips_x, 'Z': flips_z, 'Y': flips_x ^ flips_z}
+    pair_faults, boundary_faults = {}, {}
+    rows, cols = [], []
+    for pauli, pauli_flips in flips.items():
+        for qubit in np.flatnonzero(pauli_flips.any(axis=1)):
+            bits = tuple(np.flatnonzero(pauli_flips[qubit]).tolist())
+            bsf = np.zeros(2 * n_qubits, dtype=int)
+            bsf[qubit] = pauli in 'XY'
+            bsf[n_qubits + qubit] = pauli in 'ZY'
+            if len(bits) == 2:
+                pair_faults.setdefault(bits, bsf)
+            elif len(bits) == 1:
+                boundary_faults.setdefault(bits[0], bsf)
+            # all pairs of bits flipped by the fault are adjacent
+            for a in bits:
+                for b in bits:
+                    if a != b:
+                        rows.append(a)
+                        cols.append(b)
+    n_bits = len(stabilizers)
+    adjacency = sparse.csr_matrix((np.ones(len(rows), dtype=np.int64), (rows, cols)), shape=(n_bits, n_bits))
+    adjacency = (adjacency > 0).astype(np.int64)
+    identity = sparse.identity(n_bits, dtype=np.int64, format='csr')
+    neighbourhood = identity
+    for _ in range(radius):
+        neighbourhood = ((neighbourhood + neighbourhood @ adjacency) > 0).astype(np.int64)
+    neighbourhood = ((neighbourhood - identity) > 0).astype(np.int64).tocsr()
+    return pair_faults, boundary_faults, adjacency.tocsr(), neighbourhood
+
+
+class GreedyPredecoder:
+    """
+    Greedy local predecoder, which resolves isolated defects before matching.
+
+    Notes:
+
+    * A pair of defects is resolved by a single-qubit fault if the two defects are adjacent and no other defect lies
+      within the neighbourhood (see :func:`local_faults`) of either. A single defect is resolved by a boundary fault
+      if no other defect lies within its neighbourhood.
+    * Such defects are matched the same way by minimum weight matching in nearly all shots below threshold, so the
+      predecoder only removes them from the syndrome passed on to the decoder. Larger radii are more conservative.
+    * Statistics of each shot are returned by :meth:`predecode` and summed by :attr:`stats`.
+    """
+
+    def __init__(self, radius=2):
+        """
+        Initialise new greedy predecoder.
+
+        :param radius: Radius of neighbourhoods that must be free of other defects. (default=2)
+        :type radius: int
+        """
+        self._radius = int(radius)
+        self._stats = PredecoderStats(0, 0, 0, 0, 0)
+
+    @property
+    def stats(self):
+        """
+        Statistics summed over all shots so far.
+
+        :rtype: PredecoderStats
+        """
+        return self._stats
+
+    def predecode(self, code, syndrome):
+        """
+        Return the recovery of the resolved defects, the residual syndrome and the statistics of the given syndrome.
+
+        :param code: Stabilizer code.
+        :type code: StabilizerCode
+        :param syndrome: Syndrome as binary vector.
+        :type syndrome: numpy.array (1d)
+        :return: Recovery of resolved defects as binary symplectic vector, residual syndrome as binary vector and
+            statistics of shot.
+        :rtype: 3-tuple of (numpy.array (1d), numpy.array (1d), PredecoderStats)
+        """
+        pair_faults, boundary_faults, adjacency, neighbourhood = local_faults(code, self._radius)
+        syndrome = np.asarray(syndrome, dtype=int)
+        recovery = np.zeros(2 * (code.stabilizers.shape[1] // 2), dtype=int)
+        residual = syndrome.copy()
+        # number of other defects within distance 1 and within the radius of each syndrome bit
+        near = adjacency @ syndrome
+        local = neighbourhood @ syndrome
+        n_pairs = n_boundary = 0
+        for a in np.flatnonzero(syndrome & (local <= 1)).tolist():
+            if local[a] == 0:
+                # isolated single defect
+                fault = boundary_faults.get(a)
+                if fault is not None:
+                    recovery ^= fault
+                    residual[a] = 0
+                    n_boundary += 1
+            elif near[a] == 1:
+                # adjacent defect that is the only defect near either
+                neighbours = adjacency.indices[adjacency.indptr[a]:adjacency.indptr[a + 1]]
+                b = neighbours[syndrome[neighbours] == 1][0]
+                fault = pair_faults.get((a, b))
+                if a < b and local[b] == 1 and fault is not None:
+                    recovery ^= fault
+                    residual[a] = residual[b] = 0
+                    n_pairs += 1
+        n_defects = int(np.count_nonzero(syndrome))
+        shot_stats = PredecoderStats(1, n_defects, n_pairs, n_boundary, n_defects - 2 * n_pairs - n_boundary)
+        self._stats = PredecoderStats(*(total + shot for total, shot in zip(self._stats, shot_stats)))
+        return recovery, residual, shot_stats
+
+    def __repr__(self):
+        return '{}({!r})'.format(type(self).__name__, self._radius)
@@ -0,0 +1,107 @@
+import functools
+import hashlib
+
+import numpy as np
+from scipy.stats import truncnorm
+
+
+def truncated_normal_rates(shape, std, seed=None):
+    """
+    Return relative error rates drawn from a normal distribution centered at 1 and truncated to [0.001, 1.999].
+
+    Notes:
+
+    * This is the distribution of total error rates used by :meth:`LocalCode.qubit_error_probabilities`, so the
+      returned rates can serve as per-bond rates or as a spatial rate map of two-qubit errors.
+    * A spatial rate map for a planar code of size (rows, cols) has shape (2 * rows - 1, 2 * cols - 1), i.e. one
+      entry per lattice index, or larger, see :func:`bond_rates`.
+
+    :param shape: Shape of rates, e.g. number of bonds or shape of lattice.
+    :type shape: int or tuple of int
+    :param std: Standard deviation of rates.
+    :type std: float
+    :param seed: Seed or random number generator. (default=None, i.e. unseeded)
+    :type seed: int or numpy.random.Generator
+    :return: Relative error rates.
+    :rtype: numpy.array
+    :raises ValueError: if std is not a number >= 0.
+    """
+    if not (std >= 0 and np.isfinite(std)):
+        raise ValueError('valid std of rates is a number >= 0')
+    if not std:
+        return np.ones(shape)
+    myclip_a, myclip_b, mean = 0.001, 1.999, 1.0
+    a, b = (myclip_a - mean) / std, (myclip_b - mean) / std
+    return truncnorm.rvs(a, b, loc=mean, scale=std, size=shape, random_state=np.random.default_rng(seed))
+
+
+@functools.lru_cache(maxsize=2 ** 8)
+def _qubit_sites(code):
+    """Return lattice (row, column) of each qubit of the planar code, in bsf qubit order."""
+    rows, cols = code.size
+    r, c = np.indices((2 * rows - 1, 2 * cols - 1))
+    sites = (r + c) % 2 == 0
+    r, c = r[sites], c[sites]
+    # see PlanarPauli._flatten_site_index
+    qubits = (r // 2) * (cols - c % 2) + (c // 2) + (r % 2 * rows * cols)
+    qubit_rows, qubit_cols = np.empty_like(r), np.empty_like(c)
+    qubit_rows[qubits], qubit_cols[qubits] = r, c
+    return qubit_rows, qubit_cols
+
+
+def bond_rates(code, rates, qubits_1, qubits_2):
+    """
+    Return the relative error rate of each bond (pair of qubits).
+
+    :param code: Planar code.
+    :type code: PlanarCode
+    :param rates: Relative rates given per bond, or as a spatial rate map of shape at least (2 * rows - 1,
+        2 * cols - 1), in which case the rate of a bond is the mean of the map at the sites of its two qubits. As in
+        :meth:`LocalCode.qubit_error_probabilities`, larger maps are cut to the lattice, so that one map serves codes
+        of different distances.
+    :type rates: numpy.array (1d or 2d)
+    :param qubits_1: First qubit of each bond.
+    :type qubits_1: numpy.array (1d)
+    :param qubits_2: Second qubit of each bond.
+    :type qubits_2: numpy.array (1d)
+    :return: Relative error rate of each bond.
+    :rtype: numpy.array (1d)
+    :raises ValueError: if rates do not match the bonds or do not cover the lattice of the code, or are not all >= 0.
+    """
+    rates = np.asarray(rates, dtype=float)
+    if rates.ndim == 1:
+        if rates.shape != (len(qubits_1),):
+            raise ValueError('per-bond rates have length {}, expected {} bonds'.format(len(rates), len(qubits_1)))
+        result = rates
+    else:
+        rows, cols = code.size
+        n, m = 2 * rows - 1, 2 * cols - 1
+        if rates.ndim != 2 or rates.shape[0] < n or rates.shape[1] < m:
+            raise ValueError('rate map has shape {}, expected at least {}'.format(rates.shape, (n, m)))
+        qubit_rows, qubit_cols = _qubit_sites(code)
+        result = (rates[qubit_rows[qubits_1], qubit_cols[qubits_1]]
+                  + rates[qubit_rows[qubits_2], qubit_cols[qubits_2]]) / 2
+    if not np.all(result >= 0):
+        raise ValueError('valid rates are numbers >= 0')
+    return result
+
+
+class RatesDigest:
+    """
+    Compact stand-in for relative error rates in the repr of error models, so that reprs logged with each run, or
+    used as fingerprints, identify large rate maps by shape and content without embedding them.
+    """
+
+    def __init__(self, rates):
+        """
+        Initialise new digest of rates.
+
+        :param rates: Relative error rates, per bond or as a spatial rate map.
+        :type rates: numpy.array (1d or 2d)
+        """
+        rates = np.ascontiguousarray(rates, dtype=float)
+        self._shape = rates.shape
+        self._sha1 = hashlib.sha1(rates.tobytes()).hexdigest()[:16]
+
+    def __repr__(self):
+        return '<rates shape={!r} sha1={}>'.format(self._shape, self._sha1)
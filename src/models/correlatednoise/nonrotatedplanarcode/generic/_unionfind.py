@@ -0,0 +1,225 @@
+import collections
+import functools
+
+import numpy as np
+
+from models.correlatednoise.nonrotatedplanarcode.generic._predecoder import local_faults
+
+
+def growth_lengths(weights, resolution=2):
+    """
+    Return integer growth lengths proportional to the given edge weights.
+
+    Notes:
+
+    * Weights are scaled so the smallest positive finite weight is ``resolution`` and rounded to the nearest integer,
+      with a length of at least 1. Non-finite weights give a length of -1, i.e. edges that never grow.
+    * With resolution 2 and equal weights, clusters grow by half-edges as in the unweighted union-find decoder.
+
+    :param weights: Edge weights.
+    :type weights: numpy.array (1d) of float
+    :param resolution: Length of the lightest edge. (default=2)
+    :type resolution: int
+    :return: Growth lengths.
+    :rtype: numpy.array (1d) of int
+    """
+    weights = np.asarray(weights, dtype=float)
+    finite = np.isfinite(weights)
+    positive = finite & (weights > 0)
+    scale = resolution / weights[positive].min() if positive.any() else 1.0
+    lengths = np.maximum(1, np.rint(np.where(finite, weights, 0.0) * scale)).astype(int)
+    return np.where(finite, lengths, -1)
+
+
+@functools.lru_cache(maxsize=2 ** 6)
+def fault_graph(code):
+    """
+    Return the decoding graph of the single-qubit faults of the given code.
+
+    Notes:
+
+    * Nodes are the syndrome bits, followed by one boundary node per syndrome bit flipped alone by some fault.
+    * Edges are the faults of :func:`local_faults` that flip two syndrome bits, joining the two bits, and that flip
+      one syndrome bit, joining the bit to its boundary node. So the graph only needs the stabilizers of the code,
+      e.g. of a rotated planar code.
+
+    :param code: Stabilizer code.
+    :type code: StabilizerCode
+    :return: Number of nodes, boundary flag of each node, edges as arrays of node numbers u, v, and the fault of each
+        edge as binary symplectic vector.
+    :rtype: 5-tuple of (int, numpy.array (1d), numpy.array (1d), numpy.array (1d), numpy.array (2d))
+    """
+    pair_faults, boundary_faults, _, _ = local_faults(code, 1)
+    n_bits = len(code.stabilizers)
+    pairs = sorted(pair_faults)
+    bits = sorted(boundary_faults)
+    n_nodes = n_bits + len(bits)
+    u = np.array([a for a, _ in pairs] + bits, dtype=int)
+    v = np.array([b for _, b in pairs] + list(range(n_bits, n_nodes)), dtype=int)
+    faults = np.array([pair_faults[pair] for pair in pairs] + [boundary_faults[bit] for bit in bits], dtype=int)
+    is_boundary = np.arange(n_nodes) >= n_bits
+    return n_nodes, is_boundary, u, v, faults.reshape(len(u), -1)
+
+
+def union_find_clusters(n_nodes, u, v, lengths, defects, boundary):
+    """
+    Return the edges of the clusters grown by the weighted union-find algorithm.
+
+    Notes:
+
+    * Clusters start at the defects and grow along their boundary edges until every cluster holds an even number of
+      defects or touches a boundary node. Each round, every odd cluster adds 1 to the support of each of its boundary
+      edges, and an edge is grown when its support reaches its length. Rounds without a newly grown edge are skipped,
+      so the number of rounds does not depend on the resolution of the lengths.
+    * Clusters are merged by union by size with path halving, and each cluster keeps a list of its boundary edges
+      that is merged smaller into larger, so growth is almost linear in the number of edges.
+
+    :param n_nodes: Number of nodes, labelled 0 to n_nodes - 1.
+    :type n_nodes: int
+    :param u: First node of each edge.
+    :type u: numpy.array (1d) of int
+    :param v: Second node of each edge.
+    :type v: numpy.array (1d) of int
+    :param lengths: Growth length of each edge (negative if the edge never grows), see :func:`growth_lengths`.
+    :type lengths: numpy.array (1d) of int
+    :param defects: Defect flag of each node.
+    :type defects: numpy.array (1d) of int
+    :param boundary: Boundary flag of each node.
+    :type boundary: numpy.array (1d) of bool
+    :return: Grown flag of each edge.
+    :rtype: numpy.array (1d) of bool
+    """
+    u, v, lengths = np.asarray(u).tolist(), np.asarray(v).tolist(), np.asarray(lengths).tolist()
+    incident = [[] for _ in range(n_nodes)]
+    for e, (a, b) in enumerate(zip(u, v)):
+        if lengths[e] >= 0:
+            incident[a].append(e)
+            incident[b].append(e)
+    parent = list(range(n_nodes))
+    size = [1] * n_nodes
+    parity = np.asarray(defects, dtype=int).tolist()
+    at_boundary = np.asarray(boundary, dtype=bool).tolist()
+    edges_of = {}
+    support = [0] * len(u)
+    grown = [False] * len(u)
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    def union(a, b):
+        a, b = find(a), find(b)
+        if a == b:
+            return
+        if size[a] < size[b]:
+            a, b = b, a
+        parent[b] = a
+        size[a] += size[b]
+        parity[a] ^= parity[b]
+        at_boundary[a] = at_boundary[a] or at_boundary[b]
+        # merge boundary edges smaller into larger (untracked clusters are single nodes)
+        a_edges = edges_of.setdefault(a, list(incident[a]))
+        a_edges.extend(edges_of.pop(b, incident[b]))
+
+    active = {x for x in range(n_nodes) if parity[x] and not at_boundary[x]}
+    while active:
+        # rate of each boundary edge is the number of its odd clusters
+        rates = collections.Counter()
+        for root in active:
+            kept = []
+            for e in edges_of.get(root, incident[root]):
+                if not grown[e] and find(u[e]) != find(v[e]):
+                    kept.append(e)
+                    rates[e] += 1
+            edges_of[root] = kept
+        if not rates:
+            break
+        # skip to the first round in which an edge is grown
+        steps = min(-(-(lengths[e] - support[e]) // rate) for e, rate in rates.items())
+        newly_grown = []
+        for e, rate in rates.items():
+            support[e] += steps * rate
+            if support[e] >= lengths[e]:
+                grown[e] = True
+                newly_grown.append(e)
+        for e in newly_grown:
+            union(u[e], v[e])
+        active = {root for root in map(find, active) if parity[root] and not at_boundary[root]}
+    return np.array(grown, dtype=bool)
+
+
+def peel(n_nodes, u, v, grown, defects, boundary):
+    """
+    Return the edges of a correction within the grown clusters, found by peeling spanning forests.
+
+    Notes:
+
+    * Each cluster is spanned by a breadth-first tree, rooted at all of its boundary nodes if it has any. Leaves are
+      peeled off in reverse order: the edge to the parent of a leaf holding a defect joins the correction and moves
+      the defect to the parent. Defects left on boundary nodes are absorbed by the boundary.
+
+    :param n_nodes: Number of nodes, labelled 0 to n_nodes - 1.
+    :type n_nodes: int
+    :param u: First node of each edge.
+    :type u: numpy.array (1d) of int
+    :param v: Second node of each edge.
+    :type v: numpy.array (1d) of int
+    :param grown: Grown flag of each edge, see :func:`union_find_clusters`.
+    :type grown: numpy.array (1d) of bool
+    :param defects: Defect flag of each node.
+    :type defects: numpy.array (1d) of int
+    :param boundary: Boundary flag of each node.
+    :type boundary: numpy.array (1d) of bool
+    :return: Edges of correction.
+    :rtype: numpy.array (1d) of int
+    """
+    u, v = np.asarray(u), np.asarray(v)
+    grown_edges = np.flatnonzero(grown)
+    adjacent = [[] for _ in range(n_nodes)]
+    for e, a, b in zip(grown_edges.tolist(), u[grown_edges].tolist(), v[grown_edges].tolist()):
+        adjacent[a].append((b, e))
+        adjacent[b].append((a, e))
+    defects = np.asarray(defects, dtype=int).tolist()
+    parent_edge = [-1] * n_nodes
+    parent_node = [-1] * n_nodes
+    visited = [False] * n_nodes
+    order = []
+
+    def span(roots):
+        queue = collections.deque(roots)
+        for root in roots:
+            visited[root] = True
+        while queue:
+            a = queue.popleft()
+            order.append(a)
+            for b, e in adjacent[a]:
+                if not visited[b]:
+                    visited[b] = True
+                    parent_node[b], parent_edge[b] = a, e
+                    queue.append(b)
+
+    span([x for x in np.flatnonzero(boundary).tolist() if adjacent[x]])
+    for x in np.flatnonzero(defects).tolist():
+        if not visited[x]:
+            span([x])
+    correction = []
+    for x in reversed(order):
+        if defects[x] and parent_edge[x] >= 0:
+            correction.append(parent_edge[x])
+            defects[parent_node[x]] ^= 1
+    return np.array(correction, dtype=int)
+
+
+def union_find_correction(n_nodes, u, v, lengths, defects, boundary):
+    """
+    Return the edges of the correction of the weighted union-find decoder.
+
+    See :func:`union_find_clusters` and :func:`peel` for parameters.
+
+    :return: Edges of correction.
+    :rtype: numpy.array (1d) of int
+    """
+    grown = union_find_clusters(n_nodes, u, v, lengths, defects, boundary)
+    return peel(n_nodes, u, v, grown, defects, boundary)
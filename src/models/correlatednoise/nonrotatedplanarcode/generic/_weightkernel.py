@@ -0,0 +1,64 @@
+import numpy as np
+from scipy.special import gammaln
+
+
+def log_binom(n, k):
+    """
+    Return the natural logarithm of the binomial coefficient n choose k, elementwise.
+
+    :param n: Number of elements.
+    :type n: numpy.array of int
+    :param k: Number of chosen elements.
+    :type k: numpy.array of int
+    :return: Logarithm of binomial coefficients.
+    :rtype: numpy.array of float
+    """
+    return gammaln(n + 1) - gammaln(k + 1) - gammaln(n - k + 1)
+
+
+def matching_weights(row_steps, col_steps, p1, p2, correlated=False, degenerate=False):
+    """
+    Return MWPM weights of the given plaquette separations, computed in log space.
+
+    Notes:
+
+    * With a, b the smaller and larger of abs(row_steps) and abs(col_steps), the weights of the four weightings are:
+
+      * independent: a + b
+      * independent, degenerate: a + b - log(binom(a + b, a))
+      * correlated: -log(p1**(a + b) + [a + b even] * p2**b)
+      * correlated, degenerate: -log(binom(a + b, a) * p1**(a + b) + [a + b even] * binom(b, (b - a) / 2) * p2**b)
+
+    * Binomial coefficients are evaluated with ``gammaln`` and probabilities are added with ``logaddexp``, so weights
+      stay finite where the probabilities underflow, e.g. p1 = 1e-4 at separations of a distance 100 code.
+    * Zero probabilities give infinite weights. Arguments broadcast, so a whole weight matrix is built in one call.
+
+    :param row_steps: Row steps between plaquettes.
+    :type row_steps: numpy.array of int
+    :param col_steps: Column steps between plaquettes.
+    :type col_steps: numpy.array of int
+    :param p1: Single-qubit error probability (ignored unless correlated).
+    :type p1: float
+    :param p2: Two-qubit error probability (ignored unless correlated).
+    :type p2: float
+    :param correlated: Weight by the probabilities of single-qubit and two-qubit error chains. (default=False)
+    :type correlated: bool
+    :param degenerate: Include the number of equivalent chains. (default=False)
+    :type degenerate: bool
+    :return: Weights.
+    :rtype: numpy.array of float
+    """
+    row_steps, col_steps = np.abs(row_steps), np.abs(col_steps)
+    a, b = np.minimum(row_steps, col_steps), np.maximum(row_steps, col_steps)
+    if not correlated:
+        weights = (a + b).astype(float)
+        return weights - log_binom(a + b, a) if degenerate else weights
+    # log of the probabilities of single-qubit chains and (for even a + b) two-qubit chains, -inf if impossible
+    with np.errstate(divide='ignore', invalid='ignore'):
+        log_p1, log_p2 = np.log(p1), np.log(p2)
+        log_single = np.where(a + b > 0, (a + b) * log_p1, 0.0)
+        log_double = np.where((a + b) % 2 == 0, np.where(b > 0, b * log_p2, 0.0), -np.inf)
+    if degenerate:
+        log_single = log_single + log_binom(a + b, a)
+        log_double = log_double + log_binom(b, (b - a) // 2)
+    return -np.logaddexp(log_single, log_double)
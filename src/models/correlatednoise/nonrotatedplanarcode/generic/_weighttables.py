@@ -0,0 +1,168 @@
+import collections
+
+import numpy as np
+
+#: Statistics of a :class:`BytesLRUCache`, in the style of ``functools.lru_cache().cache_info()``.
+CacheInfo = collections.namedtuple('CacheInfo', ['hits', 'misses', 'evictions', 'maxbytes', 'currbytes', 'currsize'])
+
+
+class WeightTable:
+    """
+    Matching weights of a planar code, indexed by plaquette steps rather than by pairs of plaquettes.
+
+    Notes:
+
+    * The weight between two plaquettes of the same lattice only depends on (abs(row_steps), abs(col_steps)), see
+      :meth:`qecsim.models.planar.PlanarCode.translation`, so all pairs of plaquettes share one O(rows * cols) table.
+    * The boundary weight of a plaquette is its weight to its virtual plaquette, see
+      :meth:`qecsim.models.planar.PlanarCode.virtual_plaquette_index`, stored at its lattice index.
+    """
+
+    def __init__(self, code, weights):
+        """
+        Initialise new weight table.
+
+        :param code: Planar code.
+        :type code: PlanarCode
+        :param weights: Vectorized weight function of absolute row steps and absolute column steps.
+        :type weights: callable
+        """
+        rows, cols = code.size
+        self._steps = np.asarray(weights(*np.indices((rows, cols))), dtype=float)
+        # steps of each plaquette to its nearest boundary, along rows for primal and along columns for dual plaquettes
+        r, c = np.indices((2 * rows - 1, 2 * cols - 1))
+        boundary_rows = np.minimum((r + 1) // 2, (2 * rows - 1 - r) // 2)
+        boundary_cols = np.minimum((c + 1) // 2, (2 * cols - 1 - c) // 2)
+        primal = (r % 2 == 1) & (c % 2 == 0)
+        dual = (r % 2 == 0) & (c % 2 == 1)
+        self._boundary = np.full(r.shape, np.nan)
+        self._boundary[primal] = self._steps[boundary_rows[primal], 0]
+        self._boundary[dual] = self._steps[0, boundary_cols[dual]]
+
+    @property
+    def steps(self):
+        """
+        Weights indexed by (abs(row_steps), abs(col_steps)).
+
+        :rtype: numpy.array (2d) with shape (rows, cols)
+        """
+        return self._steps
+
+    @property
+    def nbytes(self):
+        """
+        Memory used by the table in bytes.
+
+        :rtype: int
+        """
+        return self._steps.nbytes + self._boundary.nbytes
+
+    def weights(self, row_steps, col_steps):
+        """
+        Return the weights of the given translations.
+
+        :param row_steps: Row steps of translations, see :meth:`qecsim.models.planar.PlanarCode.translation`.
+        :type row_steps: int or numpy.array of int
+        :param col_steps: Column steps of translations.
+        :type col_steps: int or numpy.array of int
+        :return: Weights of translations.
+        :rtype: float or numpy.array of float
+        """
+        return self._steps[np.abs(row_steps), np.abs(col_steps)]
+
+    def boundary(self, rows, cols):
+        """
+        Return the weights between the given plaquettes and their virtual plaquettes.
+
+        :param rows: Rows of in-bounds plaquette indices.
+        :type rows: int or numpy.array of int
+        :param cols: Columns of in-bounds plaquette indices.
+        :type cols: int or numpy.array of int
+        :return: Boundary weights of plaquettes.
+        :rtype: float or numpy.array of float
+        """
+        return self._boundary[rows, cols]
+
+
+class BytesLRUCache:
+    """
+    Least recently used cache of arrays, bounded by memory rather than by number of entries.
+
+    Notes:
+
+    * When the values exceed ``maxbytes``, the least recently used values are evicted, so memory stays flat across
+      sweeps over many keys. The most recent value is always kept, even if it exceeds ``maxbytes``.
+    * Values must have an ``nbytes`` attribute, e.g. numpy arrays or :class:`WeightTable`.
+    """
+
+    def __init__(self, maxbytes=2 ** 26):
+        """
+        Initialise new bytes-bounded LRU cache.
+
+        :param maxbytes: Memory budget of cached values in bytes. (default=2**26)
+        :type maxbytes: int
+        """
+        self._maxbytes = int(maxbytes)
+        self._values = collections.OrderedDict()
+        self._currbytes = 0
+        self._hits = self._misses = self._evictions = 0
+
+    def get(self, key, build):
+        """
+        Return the cached value for the given key, building and caching it if not cached.
+
+        :param key: Hashable key of value.
+        :type key: object
+        :param build: Function returning the value.
+        :type build: callable
+        :return: Value.
+        :rtype: object
+        """
+        value = self._values.get(key)
+        if value is not None:
+            self._hits += 1
+            self._values.move_to_end(key)
+            return value
+        self._misses += 1
+        value = build()
+        self._values[key] = value
+        self._currbytes += value.nbytes
+        while self._currbytes > self._maxbytes and len(self._values) > 1:
+            _, evicted = self._values.popitem(last=False)
+            self._currbytes -= evicted.nbytes
+            self._evictions += 1
+        return value
+
+    def cache_info(self):
+        """
+        Return statistics of the cache.
+
+        :return: Hits, misses, evictions, memory budget, memory used and number of values.
+        :rtype: CacheInfo
+        """
+        return CacheInfo(self._hits, self._misses, self._evictions, self._maxbytes, self._currbytes, len(self._values))
+
+    def cache_clear(self):
+        """
+        Clear the cache and its statistics.
+        """
+        self._values.clear()
+        self._currbytes = 0
+        self._hits = self._misses = self._evictions = 0
+
+    def __len__(self):
+        return len(self._values)
+
+    def __repr__(self):
+        return '{}({!r})'.format(type(self).__name__, self._maxbytes)
+
+
+class WeightTableCache(BytesLRUCache):
+    """
+    Least recently used cache of :class:`WeightTable` instances, bounded by memory, see :class:`BytesLRUCache`.
+
+    Notes:
+
+    * Tables of many error probabilities share the memory budget, so memory stays flat across sweeps over error
+      probabilities.
+    """
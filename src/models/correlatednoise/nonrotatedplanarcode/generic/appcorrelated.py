@@ -15,9 +15,16 @@ from qecsim import paulitools as pt
 from qecsim.error import QecsimError
 from qecsim.model import DecodeResult
 from qecsim.app import _add_rate_statistics
+from models.correlatednoise.nonrotatedplanarcode.generic._circuiterrormodel import CircuitErrorModel
+from models.common._codesupports import code_supports
+from models.correlatednoise.nonrotatedplanarcode.generic._driftingerrormodel import DriftingErrorModel
+from models.common._noisepipeline import NoisePipeline
 
 logger = logging.getLogger(__name__)
 
+#: Number of shots sampled and decoded per block by ideal runs of decoders with ``decode_batch``, see :func:`run`.
+BATCH_SHOTS = 1024
+
 
 def _run_once(mode, code, time_steps, error_model, decoder, error_probability_1, error_probability, measurement_error_probability, rng):
     """Implements run_once and run_once_ftp functions"""
@@ -25,43 +32,92 @@ def _run_once(mode, code, time_steps, error_model, decoder, error_probability_1,
     # assumptions
     assert (mode == 'ideal' and time_steps == 1) or mode == 'ftp'
 
-    # generate step_error, step_syndrome and step_measurement_error for each time step
-    step_errors, step_syndromes, step_measurement_errors = [], [], []
-    for _ in range(time_steps):
-        # step_error: random error based on error probability
-        step_error = error_model.generate(code, error_probability_1, error_probability, rng)
-        step_errors.append(step_error)
-        # step_syndrome: stabilizers that do not commute with the error
-        step_syndrome = pt.bsp(step_error, code.stabilizers.T)
-        step_syndromes.append(step_syndrome)
-        # step_measurement_error: random syndrome bit flips based on measurement_error_probability
-        if measurement_error_probability:
-            step_measurement_error = rng.choice(
-                (0, 1),
-                size=step_syndrome.shape,
-                p=(1 - measurement_error_probability, measurement_error_probability)
-            )
+    # sparse stabilizer and logical supports (avoids dense products with code.stabilizers)
+    supports = code_supports(code)
+
+    # error models compiled to fault tables are sampled straight into syndromes and logical commutations, and only the
+    # weight of each step error is tracked, so step errors are not formed
+    pipeline = getattr(error_model, 'pipeline', None)
+    # circuit-level noise models simulate all time steps at once, see CircuitErrorModel
+    circuit = mode == 'ftp' and isinstance(error_model, CircuitErrorModel)
+    sample_syndromes = isinstance(pipeline, NoisePipeline) and not circuit
+    if sample_syndromes:
+        fault_table = pipeline.compile(code, error_probability_1=error_probability_1,
+                                       error_probability=error_probability)
+        syndrome_table = pipeline.compile_syndromes(code, error_probability_1=error_probability_1,
+                                                    error_probability=error_probability)
+
+    if circuit:
+        # detection events of rounds of syndrome extraction (already in the layout of syndrome below) and final error
+        # of data qubits, where measurement errors and errors of the circuit are not resolved per step
+        syndrome, error = error_model.generate_ftp(code, time_steps, error_probability_1, error_probability,
+                                                   measurement_error_probability, rng)
+        step_errors, step_measurement_errors = None, None
+        error_weight = pt.bsf_wt(error)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug('run: error={}'.format(error))
+            logger.debug('run: syndrome={}'.format(syndrome))
+    else:
+        # generate step_error, step_syndrome and step_measurement_error for each time step
+        step_errors, step_syndromes, step_measurement_errors = [], [], []
+        step_logical_commutations, step_error_weights = [], []
+        for _ in range(time_steps):
+            if sample_syndromes:
+                # step_syndrome and step_logical_commutation: bits flipped by the faults of the step
+                shot_indices, outcomes = fault_table.sample_outcomes(1, rng)
+                _, flips = syndrome_table.flips(shot_indices, outcomes)
+                flips = np.bincount(flips, minlength=syndrome_table.n_columns) & 1
+                step_syndrome = flips[:supports.n_stabilizers]
+                step_logical_commutation = flips[supports.n_stabilizers:]
+                # step_error_weight: qubits with X or Z flipped by the faults of the step
+                _, flips = fault_table.flips(shot_indices, outcomes)
+                flips = np.bincount(flips, minlength=2 * supports.n_qubits) & 1
+                step_error_weights.append(
+                    int(np.count_nonzero(flips[:supports.n_qubits] | flips[supports.n_qubits:])))
+                step_logical_commutations.append(step_logical_commutation)
+            else:
+                # step_error: random error based on error probability
+                step_error = error_model.generate(code, error_probability_1, error_probability, rng)
+                step_errors.append(step_error)
+                # step_syndrome: stabilizers that do not commute with the error
+                step_syndrome = supports.syndromes(step_error[np.newaxis])[0]
+            step_syndromes.append(step_syndrome)
+            # step_measurement_error: random syndrome bit flips based on measurement_error_probability
+            if measurement_error_probability:
+                step_measurement_error = rng.choice(
+                    (0, 1),
+                    size=step_syndrome.shape,
+                    p=(1 - measurement_error_probability, measurement_error_probability)
+                )
+            else:
+                step_measurement_error = np.zeros(step_syndrome.shape, dtype=int)
+            step_measurement_errors.append(step_measurement_error)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug('run: step_errors={}'.format(step_errors))
+            logger.debug('run: step_syndromes={}'.format(step_syndromes))
+            logger.debug('run: step_measurement_errors={}'.format(step_measurement_errors))
+
+        if sample_syndromes:
+            # error: not formed, only its syndrome and logical commutations (sums over time steps) are tracked
+            error, step_errors = None, None
+            error_syndrome = np.bitwise_xor.reduce(step_syndromes)
+            error_logical_commutations = np.bitwise_xor.reduce(step_logical_commutations)
+            error_weight = sum(step_error_weights)
         else:
-            step_measurement_error = np.zeros(step_syndrome.shape, dtype=int)
-        step_measurement_errors.append(step_measurement_error)
-    if logger.isEnabledFor(logging.DEBUG):
-        logger.debug('run: step_errors={}'.format(step_errors))
-        logger.debug('run: step_syndromes={}'.format(step_syndromes))
-        logger.debug('run: step_measurement_errors={}'.format(step_measurement_errors))
-
-    # error: sum of errors at each time step
-    error = np.bitwise_xor.reduce(step_errors)
-    if logger.isEnabledFor(logging.DEBUG):
-        logger.debug('run: error={}'.format(error))
-
-    # syndrome: apply measurement_error at times t-1 and t to syndrome at time t
-    syndrome = []
-    for t in range(time_steps):
-        syndrome.append(step_measurement_errors[t - 1] ^ step_syndromes[t] ^ step_measurement_errors[t])
-    # convert syndrome to 2d numpy array
-    syndrome = np.array(syndrome)
-    if logger.isEnabledFor(logging.DEBUG):
-        logger.debug('run: syndrome={}'.format(syndrome))
+            # error: sum of errors at each time step
+            error = np.bitwise_xor.reduce(step_errors)
+            error_weight = pt.bsf_wt(np.array(step_errors))
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug('run: error={}'.format(error))
+
+        # syndrome: apply measurement_error at times t-1 and t to syndrome at time t
+        syndrome = []
+        for t in range(time_steps):
+            syndrome.append(step_measurement_errors[t - 1] ^ step_syndromes[t] ^ step_measurement_errors[t])
+        # convert syndrome to 2d numpy array
+        syndrome = np.array(syndrome)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug('run: syndrome={}'.format(syndrome))
 
     # decoding: boolean or best match recovery operation based on decoder
     ctx = {'error_model': error_model, 'error_probability_1': error_probability_1, 'error_probability': error_probability, 'error': error,
@@ -86,22 +142,30 @@ def _run_once(mode, code, time_steps, error_model, decoder, error_probability_1,
     custom_values = decoding.custom_values
     # if recovery specified, resolve success and logical_commutations
     if decoding.recovery is not None:
-        # recovered code
-        recovered = decoding.recovery ^ error
-        # success checks
-        commutes_with_stabilizers = np.all(pt.bsp(recovered, code.stabilizers.T) == 0)
+        if sample_syndromes:
+            # recovered code: syndrome and logical commutations of recovery XOR error, by linearity
+            recovery = np.asarray(decoding.recovery)[np.newaxis]
+            commutes_with_stabilizers = not (supports.syndromes(recovery)[0] ^ error_syndrome).any()
+            resolved_logical_commutations = (supports.logical_commutations(recovery)[0]
+                                             ^ error_logical_commutations).astype(int)
+        else:
+            # recovered code
+            recovered = decoding.recovery ^ error
+            # success checks
+            commutes_with_stabilizers = not supports.syndromes(recovered[np.newaxis]).any()
+            resolved_logical_commutations = supports.logical_commutations(recovered[np.newaxis])[0].astype(int)
         if not commutes_with_stabilizers:
             log_data = {  # enough data to recreate issue
                 # models
                 'code': repr(code), 'error_model': repr(error_model), 'decoder': repr(decoder),
                 # variables
-                'error': pt.pack(error), 'recovery': pt.pack(decoding.recovery),
+                'error': None if error is None else pt.pack(error), 'recovery': pt.pack(decoding.recovery),
                 # step variables
-                'step_errors': [pt.pack(v) for v in step_errors],
-                'step_measurement_errors': [pt.pack(v) for v in step_measurement_errors],
+                'step_errors': None if step_errors is None else [pt.pack(v) for v in step_errors],
+                'step_measurement_errors': (None if step_measurement_errors is None
+                                            else [pt.pack(v) for v in step_measurement_errors]),
             }
             logger.warning('RECOVERY DOES NOT RETURN TO CODESPACE: {}'.format(json.dumps(log_data, sort_keys=True)))
-        resolved_logical_commutations = pt.bsp(recovered, code.logicals.T)
         commutes_with_logicals = np.all(resolved_logical_commutations == 0)
         resolved_success = commutes_with_stabilizers and commutes_with_logicals
         # fill in unspecified outcomes
@@ -114,7 +178,7 @@ def _run_once(mode, code, time_steps, error_model, decoder, error_probability_1,
         logger.debug('run: custom_values={!r}'.format(custom_values))
 
     data = {
-        'error_weight': pt.bsf_wt(np.array(step_errors)),
+        'error_weight': error_weight,
         'success': bool(success),
         'logical_commutations': logical_commutations,
         'custom_values': custom_values,
@@ -154,6 +218,9 @@ def run_once(code, error_model, decoder, error_probability_1, error_probability,
       enable decoders to handle ideal and fault-tolerant decoding consistently, the following keyword parameters and
       default values are passed as context: ``step_errors=[error]``, ``measurement_error_probability=0.0`` and
       ``step_measurement_errors=[np.zeros(syndrome.shape)]``. Most decoders will ignore these parameters.
+    * If ``error_model`` has a :class:`NoisePipeline` (e.g. the correlated error models), the syndrome and logical
+      commutations of ``error`` are sampled directly from its faults, see :meth:`NoisePipeline.sample_syndromes`, and
+      ``error`` is not formed, so ``error=None`` and ``step_errors=None`` are passed to the decoder.
     * The returned data is in the following format:
 
     ::
@@ -229,6 +296,8 @@ def run_once_ftp(code, time_steps, error_model, decoder, error_probability_1, er
     * In addition to ``code``, ``time_steps`` and ``syndrome``, the following keyword parameters are passed as context
       to :meth:`qecsim.model.DecoderFTP.decode_ftp`: ``error_model``, ``error_probability``, ``error``, ``step_errors``,
       ``measurement_error_probability`` and ``step_measurement_errors``. Most decoders will ignore these parameters.
+    * If ``error_model`` has a :class:`NoisePipeline`, ``error`` and ``step_errors`` are not formed, see
+      :func:`run_once`.
     * The returned data is in the following format:
 
     ::
@@ -279,6 +348,48 @@ def run_once_ftp(code, time_steps, error_model, decoder, error_probability_1, er
                      rng)
 
 
+def _run_batches(code, error_model, decoder, error_probability_1, error_probability, max_runs, rng):
+    """
+    Implements ideal runs in blocks of shots, for error models with a noise pipeline and decoders with decode_batch.
+
+    Yields the data of each run, in the format returned by :func:`run_once`, up to max_runs runs (None=unrestricted).
+    """
+    supports = code_supports(code)
+    n_qubits, n_stabilizers = supports.n_qubits, supports.n_stabilizers
+    params = {'error_probability_1': error_probability_1, 'error_probability': error_probability}
+    fault_table = error_model.pipeline.compile(code, **params)
+    syndrome_table = error_model.pipeline.compile_syndromes(code, **params)
+    n_runs = 0
+    while max_runs is None or n_runs < max_runs:
+        shots = BATCH_SHOTS if max_runs is None else min(BATCH_SHOTS, max_runs - n_runs)
+        n_runs += shots
+        # syndromes, logical commutations and weights of errors of the block, from one sample of faults
+        shot_indices, outcomes = fault_table.sample_outcomes(shots, rng)
+        flips = np.zeros((shots, syndrome_table.n_columns), dtype=np.uint8)
+        np.bitwise_xor.at(flips, syndrome_table.flips(shot_indices, outcomes), 1)
+        error_syndromes, error_logical_commutations = flips[:, :n_stabilizers], flips[:, n_stabilizers:]
+        flips = np.zeros((shots, 2 * n_qubits), dtype=np.uint8)
+        np.bitwise_xor.at(flips, fault_table.flips(shot_indices, outcomes), 1)
+        error_weights = np.count_nonzero(flips[:, :n_qubits] | flips[:, n_qubits:], axis=1)
+        # decoding: recoveries of the block, resolved by linearity as in _run_once
+        recoveries = decoder.decode_batch(code, error_syndromes, error_model=error_model, **params)
+        commutes_with_stabilizers = ~(supports.syndromes(recoveries) ^ error_syndromes).any(axis=1)
+        logical_commutations = (supports.logical_commutations(recoveries) ^ error_logical_commutations).astype(int)
+        for shot in range(shots):
+            if not commutes_with_stabilizers[shot]:
+                log_data = {  # enough data to recreate issue
+                    'code': repr(code), 'error_model': repr(error_model), 'decoder': repr(decoder),
+                    'syndrome': pt.pack(error_syndromes[shot]), 'recovery': pt.pack(recoveries[shot]),
+                }
+                logger.warning('RECOVERY DOES NOT RETURN TO CODESPACE: {}'.format(json.dumps(log_data, sort_keys=True)))
+            yield {
+                'error_weight': int(error_weights[shot]),
+                'success': bool(commutes_with_stabilizers[shot] and not logical_commutations[shot].any()),
+                'logical_commutations': logical_commutations[shot],
+                'custom_values': None,
+            }
+
+
 def _run(mode, code, time_steps, error_model, decoder, error_probability_1, error_probability, measurement_error_probability,
          max_runs=None, max_failures=None, random_seed=None):
     """Implements run and run_ftp functions"""
@@ -328,11 +439,26 @@ def _run(mode, code, time_steps, error_model, decoder, error_probability_1, erro
     array_val_keys = ('logical_commutations', 'custom_values',)  # list of array value keys
     error_weights = []  # list of error_weight from current run
 
+    # drifting error model: start a new trajectory and record runs per block of drifted error probabilities
+    drifting = isinstance(error_model, DriftingErrorModel)
+    if drifting:
+        error_model.reset()
+        drift_blocks = collections.OrderedDict()
+
+    # ideal runs of error models with a noise pipeline are sampled and decoded in blocks, if the decoder supports it
+    batched = (mode == 'ideal' and not drifting and isinstance(getattr(error_model, 'pipeline', None), NoisePipeline)
+               and hasattr(decoder, 'decode_batch'))
+    if batched:
+        batch_runs = _run_batches(code, error_model, decoder, error_probability_1, error_probability, max_runs, rng)
+
     while ((max_runs is None or runs_data['n_run'] < max_runs)
            and (max_failures is None or runs_data['n_fail'] < max_failures)):
         # run simulation
-        data = _run_once(mode, code, time_steps, error_model, decoder, error_probability_1, error_probability,
-                         measurement_error_probability, rng)
+        if batched:
+            data = next(batch_runs)
+        else:
+            data = _run_once(mode, code, time_steps, error_model, decoder, error_probability_1, error_probability,
+                             measurement_error_probability, rng)
         # increment run counts
         runs_data['n_run'] += 1
         if data['success']:
@@ -355,6 +481,13 @@ def _run(mode, code, time_steps, error_model, decoder, error_probability_1, erro
             runs_data[array_sum_key] = array_sum  # update runs_data
         # append error weight
         error_weights.append(data['error_weight'])
+        # count runs and failures of current block (of the last step error if several time steps)
+        if drifting:
+            block_data = drift_blocks.setdefault(error_model.block, {
+                'block': error_model.block, 'error_probabilities': error_model.block_probabilities,
+                'n_run': 0, 'n_fail': 0})
+            block_data['n_run'] += 1
+            block_data['n_fail'] += not data['success']
 
     # error weight statistics
     runs_data['error_weight_total'] = sum(error_weights)
@@ -363,6 +496,9 @@ def _run(mode, code, time_steps, error_model, decoder, error_probability_1, erro
     # rate statistics
     _add_rate_statistics(runs_data)
 
+    if drifting:
+        runs_data['drift_blocks'] = list(drift_blocks.values())
+
     # convert sum arrays to tuples if not None
     for array_sum_key in array_sum_keys:
         if runs_data[array_sum_key] is not None:
@@ -415,6 +551,14 @@ def run(code, error_model, decoder, error_probability_1, error_probability, max_
             'wall_time': 0.0,                       # wall-time for run in fractional seconds
         }
 
+    * If ``error_model`` has a :class:`NoisePipeline` and ``decoder`` has a ``decode_batch`` method (e.g.
+      :class:`PlanarMWPMDecoder`), runs are sampled and decoded in blocks of up to :data:`BATCH_SHOTS` shots rather
+      than one by one, and repeated syndromes of a block are decoded once. Runs and failures are counted as for
+      single runs, so the runs of a block beyond ``max_failures`` are discarded.
+    * If ``error_model`` is a :class:`DriftingErrorModel`, the drifted error probabilities of each block, and the
+      runs and failures within it, are added to the returned data as ``'drift_blocks': [{'block': 0,
+      'error_probabilities': (0.01, 0.02), 'n_run': 1024, 'n_fail': 3}, ...]``. These are not merged by :func:`merge`.
+
     :param code: Stabilizer code.
     :type code: StabilizerCode
     :param error_model: Error model.
@@ -480,6 +624,12 @@ def run_ftp(code, time_steps, error_model, decoder, error_probability_1, error_p
             'wall_time': 0.0,                       # wall-time for run in fractional seconds
         }
 
+    * If ``error_model`` is a :class:`DriftingErrorModel`, runs data includes ``drift_blocks``, see :func:`run`.
+    * If ``error_model`` is a :class:`CircuitErrorModel`, the syndrome is the detection events of ``time_steps``
+      rounds of syndrome extraction circuits, the last of which is perfect, and ``error_probability`` is the 2-qubit
+      error probability per gate. Errors are propagated through the circuits, so measurement errors and errors of
+      each step are not resolved, and ``step_errors`` and ``step_measurement_errors`` are passed to decoders as None.
+
     :param code: Stabilizer code.
     :type code: StabilizerCode
     :param time_steps: Number of time steps.
@@ -1,2 +1,3 @@
 from ._correlatederrormodel import CorrelatedErrorModel  # noqa: F401
-from ._rotatedplanarsmwpmdecoder import RotatedPlanarSMWPMDecoderDeg  # noqa: F401
\ No newline at end of file
+from ._rotatedplanarsmwpmdecoder import RotatedPlanarSMWPMDecoderDeg  # noqa: F401
+from ._rotatedplanarufdecoder import RotatedPlanarUFDecoder  # noqa: F401
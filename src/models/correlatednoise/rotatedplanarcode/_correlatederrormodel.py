@@ -3,128 +3,125 @@ import functools
 
 import numpy as np
 
-from qecsim import paulitools as pt
 from qecsim.model import ErrorModel, cli_description
+from models.common._noisepipeline import BondPauliLayer, DepolarizingLayer
+from models.common._noisepipeline import NoisePipeline
+from models.common._paulichannel import two_qubit_channel
+
+
+@functools.lru_cache(maxsize=2 ** 8)
+def _neighbour_pairs(code):
+    """
+    Return the pairs of neighbouring qubits subject to two-qubit errors on the given rotated planar code.
+
+    Notes:
+
+    * Pairs are horizontal (qubit and one to the right) followed by vertical (qubit and one step up).
+
+    :param code: Rotated planar code.
+    :type code: RotatedPlanarCode
+    :return: Index arrays (qubits_1, qubits_2) of neighbouring qubits, in bsf qubit order.
+    :rtype: 2-tuple of numpy.array (1d)
+    """
+    rows, cols = code.size
+    qubits = np.arange(code.n_k_d[0])
+    row = qubits // cols
+    col = qubits % cols
+    horizontal = qubits[col < cols - 1]
+    vertical = qubits[row < rows - 1]
+    return np.concatenate((horizontal, vertical)), np.concatenate((horizontal + 1, vertical + cols))
+
+
+def _two_qubit_bonds(code, error_probability):
+    """Return pairs of neighbouring qubits and their error probability: p per qubit means approx p/4 per gate."""
+    return (*_neighbour_pairs(code), error_probability / 4)
+
 
 @cli_description('Depolarizing error + depolarizing 2-qubit error')
 class CorrelatedErrorModel(ErrorModel):
 
-    def generate(self, code, error_probability, rng=None):
-
-        # max index along x and y
-        n = code.n_k_d[2] - 1
-        m = code.n_k_d[2] - 1
-
-        # number of qubits
-        N = code.n_k_d[0]
-
-        #  Generate single-qubit errors (there are none)
-        rng = np.random.default_rng()  # if rng is None else rng
-        n_qubits = code.n_k_d[0]
-        rng = np.random.default_rng() if rng is None else rng
-        n_qubits = code.n_k_d[0]
-        error_pauli = ''.join(rng.choice(
-            ('I', 'X', 'Y', 'Z'),
-            size=n_qubits,
-            p=self.probability_distribution(0.0)
-        ))
-        total_error = pt.pauli_to_bsf(error_pauli)
-
-        # Generate 2-qubit errors
-        # Error probability p per qubit means approx p/4 per gate
-        error_probability = error_probability / 4
-        # loop over all qubits
-        for q in range(0, N-1):
-            row = q // (n + 1)
-            col = q % (n + 1)
-            # add errors between qubit q and one to the right from q
-            if col < n:
-                # generate a random number
-                rnd = np.random.uniform(0, 1)
-                # create XX interaction
-                if(rnd <= error_probability / 2):
-                    total_error[q] = (total_error[q] + 1) % 2
-                    total_error[q + 1] = (total_error[q + 1] + 1) % 2
-                # create ZZ interaction
-                elif (error_probability / 2 < rnd <= error_probability):
-                    total_error[q + N] = (total_error[q + N] + 1) % 2
-                    total_error[q + 1 + N] = (total_error[q + 1 + N] + 1) % 2
-            if row < n:
-                # add errors between each qubit and one step up from q
-                rnd = np.random.uniform(0, 1)
-                # create XX interaction
-                if (rnd <= error_probability / 2):
-                    total_error[q] = (total_error[q] + 1) % 2
-                    total_error[q + n + 1] = (total_error[q + n + 1] + 1) % 2
-                # create ZZ interaction
-                elif (error_probability / 2 < rnd <= error_probability):
-                    total_error[q + N] = (total_error[q + N] + 1) % 2
-                    total_error[q + n + 1 + N] = (total_error[q + n + 1 + N] + 1) % 2
-        return total_error
-
-    def two_qubit_error_generator(self, qubit_1_x, qubit_1_z, qubit_2_x, qubit_2_z, error_probability):
-        rnd = np.random.uniform(0, 1)
-        if (rnd < error_probability / 9):
-            # multiply qubit #q by X and lower-left by X
-            # print(['XX', q])
-            qubit_1_x, qubit_1_z = self.mult_by_x(qubit_1_x, qubit_1_z)
-            qubit_2_x, qubit_2_z = self.mult_by_x(qubit_2_x, qubit_2_z)
-        elif (error_probability / 9 < rnd < 2 * error_probability / 9):
-            # multiply qubit #q by Y and lower-left by Y
-            # print(['YY', q])
-            qubit_1_x, qubit_1_z = self.mult_by_y(qubit_1_x, qubit_1_z)
-            qubit_2_x, qubit_2_z = self.mult_by_y(qubit_2_x, qubit_2_z)
-        elif (2 * error_probability / 9 < rnd < 3 * error_probability / 9):
-            # multiply qubit #q by Z and lower-left by Z
-            # print(['ZZ', q])
-            qubit_1_x, qubit_1_z = self.mult_by_z(qubit_1_x, qubit_1_z)
-            qubit_2_x, qubit_2_z = self.mult_by_z(qubit_2_x, qubit_2_z)
-        elif (3 * error_probability / 9 < rnd < 4 * error_probability / 9):
-            # multiply qubit #q by X and lower-left by Y
-            # print(['XY', q])
-            qubit_1_x, qubit_1_z = self.mult_by_x(qubit_1_x, qubit_1_z)
-            qubit_2_x, qubit_2_z = self.mult_by_y(qubit_2_x, qubit_2_z)
-        elif (4 * error_probability / 9 < rnd < 5 * error_probability / 9):
-            # multiply qubit #q by Y and lower-left by X
-            # print(['YX', q])
-            qubit_1_x, qubit_1_z = self.mult_by_y(qubit_1_x, qubit_1_z)
-            qubit_2_x, qubit_2_z = self.mult_by_x(qubit_2_x, qubit_2_z)
-        elif (5 * error_probability / 9 < rnd < 6 * error_probability / 9):
-            # multiply qubit #q by X and lower-left by Z
-            # print(['XZ', q])
-            qubit_1_x, qubit_1_z = self.mult_by_x(qubit_1_x, qubit_1_z)
-            qubit_2_x, qubit_2_z = self.mult_by_z(qubit_2_x, qubit_2_z)
-        elif (6 * error_probability / 9 < rnd < 7 * error_probability / 9):
-            # multiply qubit #q by Z and lower-left by X
-            # print(['ZX', q])
-            qubit_1_x, qubit_1_z = self.mult_by_z(qubit_1_x, qubit_1_z)
-            qubit_2_x, qubit_2_z = self.mult_by_x(qubit_2_x, qubit_2_z)
-        elif (7 * error_probability / 9 < rnd < 8 * error_probability / 9):
-            # multiply qubit #q by Y and lower-left by Z
-            # print(['YZ', q])
-            qubit_1_x, qubit_1_z = self.mult_by_y(qubit_1_x, qubit_1_z)
-            qubit_2_x, qubit_2_z = self.mult_by_z(qubit_2_x, qubit_2_z)
-        elif (8 * error_probability / 9 < rnd < error_probability):
-            # multiply qubit #q by Z and lower-left by Y
-            # print(['ZY', q])
-            qubit_1_x, qubit_1_z = self.mult_by_z(qubit_1_x, qubit_1_z)
-            qubit_2_x, qubit_2_z = self.mult_by_y(qubit_2_x, qubit_2_z)
-        return qubit_1_x, qubit_1_z, qubit_2_x, qubit_2_z
-
-    def mult_by_x(self, qubit_x, qubit_z):
-        qubit_x = (qubit_x + 1) % 2
-        qubit_z = qubit_z
-        return qubit_x, qubit_z
-
-    def mult_by_z(self, qubit_x, qubit_z):
-        qubit_x = qubit_x
-        qubit_z = (qubit_z + 1) % 2
-        return qubit_x, qubit_z
-
-    def mult_by_y(self, qubit_x, qubit_z):
-        qubit_x = (qubit_x + 1) % 2
-        qubit_z = (qubit_z + 1) % 2
-        return qubit_x, qubit_z
+    # XX or ZZ interaction with equal probability, see TwoQubitPauliChannel
+    two_qubit_distribution = (('XX', 1 / 2), ('ZZ', 1 / 2))
+
+    def __init__(self):
+        """
+        Initialise new correlated error model, as a :class:`NoisePipeline` of a depolarizing layer and a 2-qubit layer.
+        """
+        self._pipeline = NoisePipeline([
+            DepolarizingLayer('error_probability_1'),
+            BondPauliLayer(two_qubit_channel(self.two_qubit_distribution), 'error_probability', _two_qubit_bonds),
+        ])
+
+    @property
+    def pipeline(self):
+        """
+        The noise pipeline of the model, with parameters error_probability_1 and error_probability.
+
+        :rtype: NoisePipeline
+        """
+        return self._pipeline
+
+    def generate(self, code, error_probability, rng=None, error_probability_1=0.0):
+        """
+        Generates single-qubit errors (depolarizing model) and two-qubit errors (XX or ZZ correlations)
+        """
+        return self.generate_batch(code, error_probability, 1, rng, error_probability_1)[0].astype(int)
+
+    def generate_batch(self, code, error_probability, shots, rng=None, error_probability_1=0.0):
+        """
+        Generates a batch of errors, each distributed as the errors returned by :meth:`generate`.
+
+        :param code: Rotated planar code.
+        :type code: RotatedPlanarCode
+        :param error_probability: Error probability per qubit, approx. 1/4 of which per two-qubit gate.
+        :type error_probability: float
+        :param shots: Number of errors to generate.
+        :type shots: int
+        :param rng: Random number generator. (default=None resolves to numpy.random.default_rng())
+        :type rng: numpy.random.Generator
+        :param error_probability_1: Single-qubit error probability. (default=0.0, i.e. no single-qubit errors)
+        :type error_probability_1: float
+        :return: Errors in bsf format, one per row.
+        :rtype: numpy.array (2d) of uint8 with shape (shots, 2 * n_qubits)
+        """
+        return self._pipeline.sample(code, shots, rng, error_probability_1=error_probability_1,
+                                     error_probability=error_probability)
+
+    def generate_sparse(self, code, error_probability, shots, rng=None, error_probability_1=0.0):
+        """
+        Generates a batch of errors as sparse bsf flips, each distributed as the errors returned by :meth:`generate`.
+
+        Notes:
+
+        * Faults are sampled by skipping geometrically distributed gaps, see :func:`sample_faults`, so the cost scales
+          with the number of faults rather than the number of qubits and pairs of neighbouring qubits.
+        * Flips can be passed directly to :meth:`CodeSupports.syndromes_sparse`, or converted to dense errors using
+          :func:`sparse_to_bsf`.
+
+        See :meth:`generate_batch` for parameters.
+
+        :return: Shot indices and bsf indices of flips, where repeated flips of the same bit cancel.
+        :rtype: 2-tuple of numpy.array (1d)
+        """
+        return self._pipeline.sample_sparse(code, shots, rng, error_probability_1=error_probability_1,
+                                            error_probability=error_probability)
+
+    def generate_syndromes(self, code, error_probability, shots, rng=None, error_probability_1=0.0, packed=False):
+        """
+        Generates a batch of syndromes and logical commutations of errors distributed as by :meth:`generate`.
+
+        Faults are mapped to the syndrome bits and logical commutations they flip once per code and probabilities,
+        so the errors themselves are never formed, see :meth:`NoisePipeline.sample_syndromes`.
+
+        See :meth:`generate_batch` for parameters.
+
+        :param packed: If results are bit-packed along the shots axis, see :func:`pack_shots`. (default=False)
+        :type packed: bool
+        :return: Syndromes and logical commutations, one row per shot, or packed along the shots axis if packed.
+        :rtype: 2-tuple of numpy.array (2d)
+        """
+        return self._pipeline.sample_syndromes(code, shots, rng, packed, error_probability_1=error_probability_1,
+                                               error_probability=error_probability)
 
     @functools.lru_cache()
     def probability_distribution(self, probability):
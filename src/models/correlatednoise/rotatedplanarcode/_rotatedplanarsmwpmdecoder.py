@@ -1,7 +1,6 @@
 import functools
 import itertools
 import logging
-import math
 from collections import OrderedDict
 from scipy import special
 
@@ -11,14 +10,202 @@ from qecsim import graphtools as gt
 from qecsim import paulitools as pt
 from qecsim.error import QecsimError
 from qecsim.model import Decoder, DecoderFTP, cli_description
-from qecsim.models.generic import DepolarizingErrorModel
+from qecsim.models.generic import BitPhaseFlipErrorModel, DepolarizingErrorModel
 from qecsim.models.rotatedplanar import RotatedPlanarSMWPMDecoder
+
+from models.common._artifactcache import code_fingerprint
+from models.correlatednoise.nonrotatedplanarcode.generic._matching import Matcher
+from models.correlatednoise.nonrotatedplanarcode.generic._planarmwpmdecoder import DecodeStats
+from models.correlatednoise.nonrotatedplanarcode.generic._weighttables import BytesLRUCache
 logger = logging.getLogger(__name__)
 
 
 @cli_description('Symmetry MWPM ([eta] FLOAT >=0), degeneracy is accounted for')
 class RotatedPlanarSMWPMDecoderDeg(RotatedPlanarSMWPMDecoder):
 
+    def __init__(self, eta=None, matching_backend='auto', weight_resolution=2 ** 24, predecoder=None,
+                 recovery_cache_bytes=None):
+        """
+        Initialise new rotated planar SMWPM decoder.
+
+        :param eta: Bias (default=None, take-from-error-model=None)
+        :type eta: float or None
+        :param matching_backend: Matching backend, 'auto', 'networkx', 'blossom5' or 'sparse_blossom', see
+            :class:`Matcher`. (default='auto')
+        :type matching_backend: str
+        :param weight_resolution: Integer of the largest weight for integer matching backends. (default=2**24)
+        :type weight_resolution: int
+        :param predecoder: Predecoder of isolated defects, or None to match all defects, see
+            :class:`GreedyPredecoder`. (default=None)
+        :type predecoder: GreedyPredecoder or None
+        :param recovery_cache_bytes: Memory budget of cached (packed) recoveries in bytes, or None to not cache them,
+            see :meth:`recovery_cache_info`. (default=None)
+        :type recovery_cache_bytes: int or None
+        :raises ValueError: if eta is not None or > 0.0, or if matching_backend is not valid.
+        :raises TypeError: if any parameter is of an invalid type.
+        :raises OSError: if matching_backend is 'blossom5' and Blossom V library cannot be loaded.
+        """
+        super().__init__(eta)
+        # as given, for repr
+        self._params = [('eta', eta), ('matching_backend', matching_backend), ('weight_resolution', weight_resolution),
+                        ('predecoder', predecoder), ('recovery_cache_bytes', recovery_cache_bytes)]
+        self._matcher = Matcher(matching_backend, weight_resolution)
+        self._predecoder = predecoder
+        self._decode_stats = DecodeStats(0, 0, 0, 0, 0, 0)
+        self._recoveries = None if recovery_cache_bytes is None else BytesLRUCache(recovery_cache_bytes)
+
+    @property
+    def matcher(self):
+        """
+        Matcher of graphs, which reports the matching backend and precision loss of weight quantization.
+
+        :rtype: Matcher
+        """
+        return self._matcher
+
+    @property
+    def predecoder(self):
+        """
+        Predecoder of isolated defects, which reports how many defects it resolved, or None.
+
+        :rtype: GreedyPredecoder or None
+        """
+        return self._predecoder
+
+    @property
+    def decode_stats(self):
+        """
+        Number of shots decoded so far, by decoding path, see :meth:`decode_batch`.
+
+        :rtype: DecodeStats
+        """
+        return self._decode_stats
+
+    def decode(self, code, syndrome,
+               error_model=BitPhaseFlipErrorModel(),  # noqa: B008
+               error_probability=0.1, **kwargs):
+        """
+        See :meth:`qecsim.models.rotatedplanar.RotatedPlanarSMWPMDecoder.decode`
+
+        Note: Zero syndromes are not decoded. If the decoder has a predecoder, isolated defects are resolved locally and
+        only the residual syndrome is matched. Fault-tolerant decoding (:meth:`decode_ftp`) matches all defects.
+        """
+        recovery, path = self._decode(code, syndrome, error_model, error_probability, **kwargs)
+        self._count(path)
+        return recovery
+
+    def decode_batch(self, code, syndromes,
+                     error_model=BitPhaseFlipErrorModel(),  # noqa: B008
+                     error_probability=0.1, **kwargs):
+        """
+        Return the recoveries of the given syndromes.
+
+        Notes:
+
+        * Shots with a zero syndrome are not decoded, and repeated syndromes are decoded once per batch.
+        * Each shot is counted in :attr:`decode_stats` by the decoding path of its syndrome, where shots are counted as
+          matched on one or both lattices (X and Z plaquettes) by the lattices holding defects, though one graph holds
+          the defects of both.
+        * Distance tables of the code are shared by all shots of the batch.
+
+        :param code: Rotated planar code.
+        :type code: RotatedPlanarCode
+        :param syndromes: Syndromes as binary array with one row per shot.
+        :type syndromes: numpy.array (2d)
+        :param error_model: Error model.
+        :type error_model: ErrorModel
+        :param error_probability: Overall probability of an error on a single qubit.
+        :type error_probability: float
+        :return: Recoveries as binary symplectic array with one row per shot.
+        :rtype: numpy.array (2d) with shape (shots, 2 * n_qubits)
+        """
+        syndromes = np.asarray(syndromes)
+        recoveries = np.zeros((len(syndromes), 2 * code.n_k_d[0]), dtype=int)
+        shots = np.flatnonzero(syndromes.any(axis=1))
+        self._count('trivial', len(syndromes) - len(shots))
+        if not len(shots):
+            return recoveries
+        unique, inverse, counts = np.unique(syndromes[shots], axis=0, return_inverse=True, return_counts=True)
+        decoded = np.empty((len(unique), recoveries.shape[1]), dtype=int)
+        for i, syndrome in enumerate(unique):
+            decoded[i], path = self._decode(code, syndrome, error_model, error_probability, **kwargs)
+            self._count(path, int(counts[i]))
+        recoveries[shots] = decoded[inverse.reshape(-1)]
+        return recoveries
+
+    def recovery_cache_info(self):
+        """
+        Return statistics of the recovery cache, or None if recoveries are not cached.
+
+        Notes:
+
+        * Recoveries are cached by code, error model, error probability and syndrome, so repeated syndromes are not
+          matched again.
+
+        :return: Hits, misses, evictions, memory budget, memory used and number of recoveries.
+        :rtype: CacheInfo or None
+        """
+        return None if self._recoveries is None else self._recoveries.cache_info()
+
+    def _decode(self, code, syndrome, error_model, error_probability, **kwargs):
+        """
+        Return the recovery of the given syndrome and the decoding path taken, i.e. a field of :class:`DecodeStats`.
+        """
+        syndrome = np.asarray(syndrome)
+        if not syndrome.any():
+            return np.zeros(2 * code.n_k_d[0], dtype=int), 'trivial'
+        if self._recoveries is None:
+            return self._match(code, syndrome, error_model, error_probability, **kwargs)
+        # recoveries are cached packed, keyed by code, weights and packed syndrome
+        key = (code_fingerprint(code), repr(error_model), error_probability,
+               np.packbits(syndrome.astype(np.uint8)).tobytes())
+        paths = []
+
+        def build():
+            recovery, path = self._match(code, syndrome, error_model, error_probability, **kwargs)
+            paths.append(path)
+            return np.packbits(recovery.astype(np.uint8))
+
+        packed = self._recoveries.get(key, build)
+        recovery = np.unpackbits(packed, count=2 * code.n_k_d[0]).astype(int)
+        return recovery, paths[0] if paths else 'cached'
+
+    def _match(self, code, syndrome, error_model, error_probability, **kwargs):
+        """
+        Return the recovery of the given non-zero syndrome and the decoding path taken, see :meth:`_decode`.
+        """
+        predecoded = None
+        if self._predecoder is not None:
+            predecoded, syndrome, _ = self._predecoder.predecode(code, syndrome)
+            if not syndrome.any():
+                return predecoded, 'predecoded'
+        recovery = super().decode(code, syndrome, error_model, error_probability, **kwargs)
+        recovery = recovery if predecoded is None else recovery ^ predecoded
+        x_lattice = self._x_stabilizers(code)
+        n_lattices = int(syndrome[x_lattice].any()) + int(syndrome[~x_lattice].any())
+        return recovery, 'one_lattice' if n_lattices == 1 else 'both_lattices'
+
+    def _count(self, path, shots=1):
+        """Add the given number of shots that took the given decoding path to :attr:`decode_stats`."""
+        self._decode_stats = self._decode_stats._replace(
+            shots=self._decode_stats.shots + shots, **{path: getattr(self._decode_stats, path) + shots})
+
+    @classmethod
+    @functools.lru_cache(maxsize=2 ** 8)
+    def _x_stabilizers(cls, code):
+        """Mask of the X-type stabilizers of the code, in syndrome order."""
+        return np.asarray(code.stabilizers)[:, :code.n_k_d[0]].any(axis=1)
+
+    def _matching(self, graph):
+        """Matching (minimum weight perfect matching) over graph, using the matching backend of the decoder.
+
+        :param graph: Graph of weighted edges between nodes, as {(a_node, b_node): weight, ...}.
+        :type graph: dict of (object, object) edges to float weights.
+        :return: Matches between nodes as (a_node, b_node).
+        :rtype: set of (object, object)
+        """
+        return self._matcher.match_graph(graph)
+
     @property
     def label(self):
         """See :meth:`qecsim.model.Decoder.label`"""
@@ -27,6 +214,55 @@ class RotatedPlanarSMWPMDecoderDeg(RotatedPlanarSMWPMDecoder):
         params_text = ', '.join('{}={}'.format(k, v) for k, v, f in params if v or v in f)
         return 'Deg Rotated planar SMWPM' + (' ({})'.format(params_text) if params_text else '')
 
+    def __repr__(self):
+        params = ', '.join('{}={!r}'.format(k, v) for k, v in self._params)
+        return '{}({})'.format(type(self).__name__, params)
+
+    @classmethod
+    def _distances(cls, box_width, box_height):
+        """Vectorized distance between plaquette nodes on parallels, given the width and height of the box between them
+        (after swapping x and y for columns), see :meth:`_distance`.
+
+        Notes:
+
+        * The distance is the number of steps of the shortest path between the nodes less the logarithm of the number
+          of shortest paths. It does not depend on time steps, error probabilities or bias.
+
+        :param box_width: Width of box, i.e. steps along parallels.
+        :type box_width: numpy.array of int
+        :param box_height: Height of box, i.e. steps across parallels.
+        :type box_height: numpy.array of int
+        :return: Distances between nodes.
+        :rtype: numpy.array of float
+        """
+        delta_parallel = np.where(box_width >= box_height, box_width - box_height, (box_height - box_width) % 2)
+        delta_diagonal = box_height
+        x = delta_diagonal + delta_parallel / 2
+        y = delta_parallel / 2
+        distance = x + y
+        degeneracy = np.log(special.binom(x + y, y))
+        return distance - degeneracy
+
+    @classmethod
+    @functools.lru_cache(maxsize=2 ** 8)
+    def _distance_table(cls, code):
+        """Distances between plaquette nodes on parallels indexed by (box_width, box_height), see :meth:`_distances`.
+
+        Notes:
+
+        * The table covers every pair of (virtual) plaquettes of the code, with shape (n + 2, n + 2) for n the larger of
+          the numbers of rows and columns, and is built once per code.
+        * Distances do not depend on error probabilities or bias, so the table is shared by all of them.
+        * Rows and columns share the table, since x and y are swapped for columns.
+
+        :param code: Rotated planar code.
+        :type code: RotatedPlanarCode
+        :return: Distances between nodes.
+        :rtype: numpy.array (2d) of float
+        """
+        n = max(code.size) + 2
+        return cls._distances(*np.indices((n, n)))
+
     @classmethod
     def _distance(cls, code, time_steps, a_node, b_node,
                   error_probability=None, measurement_error_probability=0.0, eta=0.5):
@@ -37,21 +273,101 @@ class RotatedPlanarSMWPMDecoderDeg(RotatedPlanarSMWPMDecoder):
         b_x, b_y = (b_x, b_y) if b_is_row else reversed((b_x, b_y))
         box_width = abs(a_x - b_x)
         box_height = abs(a_y - b_y)
+        return float(cls._distance_table(code)[box_width, box_height])
 
-        if box_width >= box_height:
-            delta_parallel = box_width - box_height
-            delta_diagonal = box_height
-        else:
-            delta_parallel = (box_height - box_width) % 2
-            delta_diagonal = box_height
+    @classmethod
+    def _graph(cls, code, time_steps, syndrome, error_probability=None, measurement_error_probability=None, eta=None):
+        """Graph of plaquette nodes and weighted edges consistent with the syndrome.
 
-        #diag_steps = min(box_width, box_height)
-        #par_steps = max(box_width, box_height) - diag_steps
-        #x = diag_steps + par_steps / 2
-        #y = par_steps / 2
+        Notes:
 
-        x = delta_diagonal + delta_parallel / 2
-        y = delta_parallel / 2
-        distance = x + y
-        degeneracy = math.log(special.binom(x + y, y))
-        return distance - degeneracy
+        * Nodes and edges are as by :meth:`qecsim.models.rotatedplanar.RotatedPlanarSMWPMDecoder._graph`, but the edges
+          of each line (or lattice) of nodes are filtered and weighted in bulk by look-up in :meth:`_distance_table`,
+          rather than by calling :meth:`_distance` per pair of nodes.
+
+        :param code: Rotated planar code.
+        :type code: RotatedPlanarCode
+        :param time_steps: Number of time steps.
+        :type time_steps: int
+        :param syndrome: Syndrome as binary array with (t, x, y) dimensions.
+        :type syndrome: numpy.array (2d)
+        :param error_probability: Error probability.
+        :type error_probability: float or None
+        :param measurement_error_probability: Measurement error probability.
+        :type measurement_error_probability: float or None
+        :param eta: Bias (a positive finite number or None for infinite bias), i.e. p_y / (p_x + p_z).
+        :type eta: float or None
+        :return: Graph of weighted edges between plaquette nodes, consistent with the syndrome.
+        :rtype: SimpleGraph
+        """
+        # empty graph
+        graph = gt.SimpleGraph()
+        # get syndrome indices, as list of set where syndrome_indices[t] corresponds to time t
+        syndrome_indices = [code.syndrome_to_plaquette_indices(s) for s in syndrome]
+        # all plaquettes as (x, y)
+        plaquette_indices = cls._plaquette_indices(code)
+        # distances by (box_width, box_height)
+        table = cls._distance_table(code)
+
+        def _add_edges(nodes, by_row):
+            """Add edges between all pairs of nodes on parallels, in the order of itertools.combinations."""
+            if len(nodes) < 2:
+                return
+            t, x, y = np.array([index for index, _ in nodes]).T
+            # NOTE: swap x and y for column case then treat as row case
+            x, y = (x, y) if by_row else (y, x)
+            a, b = np.triu_indices(len(nodes), k=1)
+            keep = np.ones(len(a), dtype=bool)
+            # do not add edge between time steps if measurement probability is 0 or 1
+            if measurement_error_probability in (0, 1):
+                keep &= t[a] == t[b]
+            # do not add edge between space steps if error_probability is 0
+            if error_probability == 0:
+                keep &= (x[a] == x[b]) & (y[a] == y[b])
+            # do not add edge between distinct parallels if eta is None
+            if eta is None:
+                keep &= y[a] == y[b]
+            a, b = a[keep], b[keep]
+            weights = table[np.abs(x[a] - x[b]), np.abs(y[a] - y[b])]
+            for i, j, weight in zip(a.tolist(), b.tolist(), weights.tolist()):
+                graph.add_edge(nodes[i], nodes[j], weight)
+
+        def _add_to_graph(by_row):
+            """Loop through lines of plaquette_indices adding nodes consistent with syndrome_indices with edges weighted
+            according to distance table. by_row=True/False means process rows/columns."""
+            # lattice_nodes (only populated for finite bias, i.e. eta is not None)
+            lattice_nodes = []
+            # loop through lines (rows if by_row, cols if not by_row)
+            for line in plaquette_indices if by_row else plaquette_indices.T:
+                # line list of nodes
+                line_nodes = []
+                # loop through indices on line
+                for (x, y) in line:
+                    # loop through time
+                    for t in range(time_steps):
+                        if code.is_virtual_plaquette((x, y)):
+                            # add virtual node to line list
+                            v_node = ((t, x, y), by_row)
+                            line_nodes.append(v_node)
+                            # add virtual node and orthogonal twin to graph with zero distance
+                            v_node_twin = ((t, x, y), not by_row)
+                            graph.add_edge(v_node, v_node_twin, 0)
+                        elif (x, y) in syndrome_indices[t]:
+                            # add real node to line list
+                            line_nodes.append(((t, x, y), by_row))
+                if eta is None:  # if infinite bias
+                    # add line edges to graph
+                    _add_edges(line_nodes, by_row)
+                else:  # else finite bias
+                    # add line nodes to lattice nodes
+                    lattice_nodes.extend(line_nodes)
+            # if bias is not infinite and we have some lattice nodes
+            if eta and lattice_nodes:
+                # add lattice edges to graph (note: lattice_nodes is empty if infinite bias)
+                _add_edges(lattice_nodes, by_row)
+
+        # add nodes by row
+        _add_to_graph(by_row=True)
+        # add nodes by column
+        _add_to_graph(by_row=False)
+        return graph
@@ -0,0 +1,59 @@
+import numpy as np
+from qecsim.model import Decoder, cli_description
+from qecsim.models.generic import BitPhaseFlipErrorModel
+
+from models.correlatednoise.nonrotatedplanarcode.generic._unionfind import (fault_graph, growth_lengths,
+                                                                           union_find_correction)
+
+
+@cli_description('UF')
+class RotatedPlanarUFDecoder(Decoder):
+    """
+    Implements a rotated planar weighted Union-Find (UF) decoder.
+
+    Notes:
+
+    * The syndrome is decoded on the graph of single-qubit faults of the code, see :func:`fault_graph`, by
+      :func:`union_find_correction`, and the recovery is the sum of the faults of the correction edges.
+    * Edges are weighted by the negative logarithm of the probability of their fault (X, Y or Z), as given by the
+      probability distribution of the error model, and grown with lengths of :func:`growth_lengths`. The X and Z
+      lattices of the code do not share edges, so under identically distributed noise edges are grown uniformly.
+    """
+
+    def __init__(self, growth_resolution=2):
+        """
+        Initialise new rotated planar UF decoder.
+
+        :param growth_resolution: Growth length of the lightest edge, see :func:`growth_lengths`. (default=2)
+        :type growth_resolution: int
+        """
+        self._growth_resolution = int(growth_resolution)
+
+    def decode(self, code, syndrome,
+               error_model=BitPhaseFlipErrorModel(),  # noqa: B008
+               error_probability=0.1, **kwargs):
+        """See :meth:`qecsim.model.Decoder.decode`"""
+        n_nodes, is_boundary, u, v, faults = fault_graph(code)
+        defects = np.zeros(n_nodes, dtype=int)
+        defects[:len(syndrome)] = syndrome
+        recovery = np.zeros(faults.shape[1], dtype=int)
+        if not defects.any():
+            return recovery
+        # weights of faults by their Pauli, as -log(probability)
+        _, p_x, p_y, p_z = error_model.probability_distribution(error_probability)
+        n_qubits = faults.shape[1] // 2
+        has_x, has_z = faults[:, :n_qubits].any(axis=1), faults[:, n_qubits:].any(axis=1)
+        probabilities = np.where(has_x & has_z, p_y, np.where(has_x, p_x, p_z))
+        with np.errstate(divide='ignore'):
+            lengths = growth_lengths(-np.log(probabilities), self._growth_resolution)
+        for e in union_find_correction(n_nodes, u, v, lengths, defects, is_boundary).tolist():
+            recovery ^= faults[e]
+        return recovery
+
+    @property
+    def label(self):
+        """See :meth:`qecsim.model.Decoder.label`"""
+        return 'Rotated planar UF'
+
+    def __repr__(self):
+        return '{}(growth_resolution={!r})'.format(type(self).__name__, self._growth_resolution)
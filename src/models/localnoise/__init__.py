@@ -1,5 +1,10 @@
+from ._landscape import CACHE_DIR  # noqa: F401
+from ._landscape import LANDSCAPE_VERSION  # noqa: F401
+from ._landscape import ErrorLandscape  # noqa: F401
+from ._landscape import error_landscape  # noqa: F401
 from ._localcode import LocalCode  # noqa: F401
 from ._localcodemmhh import LocalCodeMMHH  # noqa: F401
+from ._localerrormodel import LocalPauliLayer  # noqa: F401
 from ._localerrormodel import LocalErrorModel  # noqa: F401
 from ._localerrormodel import ErrorModelMMHHLayout  # noqa: F401
 from ._planarcodecss import PlanarCodeCSS  # noqa: F401
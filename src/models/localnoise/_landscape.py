@@ -0,0 +1,182 @@
+import functools
+import hashlib
+import os
+import tempfile
+
+import numpy as np
+from scipy.stats import truncnorm
+
+#: Directory of memory-mapped tiles of error landscapes, shared by processes and reruns. The on-disk cache is opt-in:
+#: tiles are kept in memory unless the environment variable LOCALNOISE_CACHE_DIR names a directory.
+CACHE_DIR = os.environ.get('LOCALNOISE_CACHE_DIR', '')
+
+#: Version of the generator of tiles, included in the digest of cached tiles so tiles of other versions are never read.
+LANDSCAPE_VERSION = 1
+
+
+def _truncated_normal(shape, mean, std, clip_a, clip_b, rng):
+    """Return draws of a normal distribution truncated to [clip_a, clip_b], or the mean if std is 0."""
+    if not std:
+        return np.full(shape, float(mean))
+    a, b = (clip_a - mean) / std, (clip_b - mean) / std
+    return truncnorm.rvs(a, b, loc=mean, scale=std, size=shape, random_state=rng)
+
+
+class ErrorLandscape:
+    """
+    Deterministic landscape of Pauli error probabilities over an unbounded planar lattice.
+
+    Notes:
+
+    * At each site (row + column even) the probabilities (p_x, p_y, p_z) are drawn from a normal distribution with the
+      given mean and std truncated to [0.001, 0.999], normalized to sum to 1 and, if nonuniform, scaled by a total
+      error rate drawn from a normal distribution centered at 1 with std_t truncated to [0.001, 1.999]. Other
+      lattice indices (plaquettes) have zero probabilities.
+    * The lattice is divided into square tiles of ``tile_size`` indices. Each tile is generated on demand from private
+      random number generators seeded by the seed of each draw and the tile index, so the landscape does not depend on
+      the order in which tiles are generated, and global ``np.random`` state is untouched.
+    * If a cache directory is given, e.g. :data:`CACHE_DIR`, tiles are persisted there as ``.npy`` files (written
+      atomically) and loaded memory-mapped, so codes of every size, and other processes and reruns with the same
+      parameters, slice the same landscape. Tiles are stored under a digest of the parameters and
+      :data:`LANDSCAPE_VERSION`, and tiles that cannot be read are generated again and replaced.
+    * A code of distance d contains the landscape of a code of distance d - 1 as its upper left sublattice.
+
+    Use :func:`error_landscape` to get a cached instance for given parameters.
+    """
+
+    def __init__(self, mean, std, std_t, seeds, nonuniform, tile_size=64, cache_dir=None):
+        """
+        Initialise new error landscape.
+
+        :param mean: Mean value of Pauli error rates.
+        :type mean: float
+        :param std: Standard deviation of Pauli error rates.
+        :type std: float
+        :param std_t: Standard deviation of total error rates.
+        :type std_t: float
+        :param seeds: Seeds of Pauli X, Y, Z and total error rates.
+        :type seeds: 4-tuple of int
+        :param nonuniform: If total error rates are non-uniform.
+        :type nonuniform: bool
+        :param tile_size: Number of rows and columns of tiles. (default=64)
+        :type tile_size: int
+        :param cache_dir: Directory of cached tiles. (default=None resolves to :data:`CACHE_DIR`)
+        :type cache_dir: str
+        """
+        self._key = (float(mean), float(std), float(std_t), tuple(int(s) for s in seeds), bool(nonuniform),
+                     int(tile_size))
+        self._tile_size = int(tile_size)
+        cache_dir = CACHE_DIR if cache_dir is None else cache_dir
+        digest = hashlib.sha1(repr((LANDSCAPE_VERSION,) + self._key).encode()).hexdigest()[:16]
+        self._path = os.path.join(cache_dir, digest) if cache_dir else None
+        self._tiles = {}
+
+    @property
+    def tile_size(self):
+        """
+        Number of rows and columns of tiles.
+
+        :rtype: int
+        """
+        return self._tile_size
+
+    def _generate_tile(self, tile_row, tile_col):
+        """Return Pauli error probabilities of the tile, with shape (3, tile_size, tile_size)."""
+        mean, std, std_t, seeds, nonuniform, size = self._key
+        shape = (size, size)
+        # Pauli X, Y, Z and total error rates, each from its own generator
+        rngs = [np.random.default_rng([seed, tile_row, tile_col]) for seed in seeds]
+        pxyz = np.array([_truncated_normal(shape, mean, std, 0.001, 0.999, rng) for rng in rngs[:3]])
+        pxyz /= pxyz.sum(axis=0)
+        if nonuniform:
+            pxyz *= _truncated_normal(shape, 1.0, std_t, 0.001, 1.999, rngs[3])
+        rows, cols = np.indices(shape)
+        pxyz[:, (tile_row * size + rows + tile_col * size + cols) % 2 == 1] = 0.0
+        return pxyz
+
+    def tile(self, tile_row, tile_col):
+        """
+        Return the (cached) tile of the landscape at the given tile index.
+
+        :param tile_row: Row of tile, i.e. lattice rows from tile_row * tile_size.
+        :type tile_row: int
+        :param tile_col: Column of tile, i.e. lattice columns from tile_col * tile_size.
+        :type tile_col: int
+        :return: Pauli error probabilities (p_x, p_y, p_z) of the tile.
+        :rtype: numpy.array (3d) with shape (3, tile_size, tile_size)
+        """
+        index = (tile_row, tile_col)
+        if index not in self._tiles:
+            filename = os.path.join(self._path, 'tile_{}_{}.npy'.format(*index)) if self._path else None
+            tile = self._load_tile(filename)
+            if tile is None:
+                tile = self._generate_tile(*index)
+                if self._save_tile(filename, tile):
+                    # memory-map stored tile, or keep tile in memory if it cannot be read back
+                    stored = self._load_tile(filename)
+                    tile = tile if stored is None else stored
+            self._tiles[index] = tile
+        return self._tiles[index]
+
+    def _load_tile(self, filename):
+        """Return the memory-mapped tile of the file, or None if there is no file or it cannot be read."""
+        if filename is None or not os.path.exists(filename):
+            return None
+        try:
+            tile = np.load(filename, mmap_mode='r')
+        except (OSError, EOFError, ValueError):
+            return None  # unreadable tile, so generate again
+        return tile if tile.shape == (3, self._tile_size, self._tile_size) else None
+
+    def _save_tile(self, filename, tile):
+        """Store the tile in the file, and return True if stored (False if the cache is disabled or not writable)."""
+        if filename is None:
+            return False
+        try:
+            os.makedirs(self._path, exist_ok=True)
+            # write to a private file and rename, so concurrent processes never read a partial tile
+            fd, tmp = tempfile.mkstemp(suffix='.npy', dir=self._path)
+            with os.fdopen(fd, 'wb') as f:
+                np.save(f, tile)
+            os.replace(tmp, filename)
+        except OSError:
+            return False  # cache not available, so keep tile in memory
+        return True
+
+    def probabilities(self, n_rows, n_cols):
+        """
+        Return the Pauli error probabilities of the upper left (n_rows, n_cols) lattice indices.
+
+        :param n_rows: Number of lattice rows, e.g. 2 * rows - 1 for a planar code.
+        :type n_rows: int
+        :param n_cols: Number of lattice columns, e.g. 2 * columns - 1 for a planar code.
+        :type n_cols: int
+        :return: Pauli error probabilities (p_x, p_y, p_z) of each lattice index.
+        :rtype: numpy.array (3d) with shape (3, n_rows, n_cols)
+        """
+        size = self._tile_size
+        pxyz = np.empty((3, n_rows, n_cols))
+        for tile_row in range(-(-n_rows // size)):
+            for tile_col in range(-(-n_cols // size)):
+                rows = slice(tile_row * size, min((tile_row + 1) * size, n_rows))
+                cols = slice(tile_col * size, min((tile_col + 1) * size, n_cols))
+                pxyz[:, rows, cols] = self.tile(tile_row, tile_col)[:, :rows.stop - rows.start, :cols.stop - cols.start]
+        return pxyz
+
+    def __repr__(self):
+        mean, std, std_t, seeds, nonuniform, tile_size = self._key
+        return '{}({!r}, {!r}, {!r}, {!r}, {!r}, {!r})'.format(type(self).__name__, mean, std, std_t, seeds, nonuniform,
+                                                             tile_size)
+
+
+@functools.lru_cache(maxsize=2 ** 8)
+def error_landscape(mean, std, std_t, seeds, nonuniform, tile_size=64):
+    """
+    Return the (cached) error landscape for the given parameters.
+
+    See :class:`ErrorLandscape` for parameters.
+
+    :return: Error landscape.
+    :rtype: ErrorLandscape
+    """
+    return ErrorLandscape(mean, std, std_t, seeds, nonuniform, tile_size)
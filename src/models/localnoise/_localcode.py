@@ -1,11 +1,12 @@
 import functools
-import itertools
 import operator
 import math
-import numpy as np
-from scipy.stats import truncnorm
-from qecsim.model import StabilizerCode, cli_description
+from qecsim.model import cli_description
 from qecsim.models.planar import PlanarCode
+from models.localnoise._landscape import LANDSCAPE_VERSION, error_landscape
+from models.common._artifactcache import code_fingerprint
+from models.common._artifactcache import code_operators
+from models.common._paulilayout import css_layout
 
 @cli_description('Planar Local (rows INT >= 2, cols INT >= 2)')
 class LocalCode(PlanarCode):
@@ -25,6 +26,10 @@ class LocalCode(PlanarCode):
 
     MIN_SIZE = (2, 2)
 
+    #: Version of artifacts derived from the error landscape, e.g. operators of deformed codes, see
+    #: :func:`code_fingerprint`.
+    artifact_version = LANDSCAPE_VERSION
+
     def __init__(self, rows, columns, mean, std, seed_h=1, seed_m=2, seed_l=3, seed_n=4, nonuniform=True, std_t=0.0):
         """
         Initialise new planar code.
@@ -65,78 +70,75 @@ class LocalCode(PlanarCode):
         self._std_total = std_t
     # < StabilizerCode interface methods >
 
-    @functools.lru_cache(maxsize=2 ** 28)
     def qubit_error_probabilities(self):
         """
         Generates array of error probabilities for each individual qubit
         Returns: Pxyz = {p_x, p_y, p_z} for each qubit (NOTE: normalized on 1)
+
+        Probabilities are cut from an unbounded landscape, generated tile by tile and kept in memory, or cached on disk
+        if enabled (see :class:`ErrorLandscape`), so a distance (d+1) code contains a distance d code as its
+        sublattice.
+        """
+        landscape = error_landscape(self._mean, self._std, self._std_total,
+                                    (self._seed_l, self._seed_m, self._seed_h, self._seed_nonuniform), self._nonuniform)
+        return landscape.probabilities(2 * self.size[0] - 1, 2 * self.size[1] - 1)
+
+    @functools.lru_cache()
+    def pauli_layout(self):
+        """
+        Return the Paulis applied to each site by its north/south plaquettes (op_v) and by its west/east plaquettes
+        (op_h), i.e. the layout of the CSS code, see :func:`css_layout` and :func:`layout_operators`.
+
+        :rtype: 2-tuple of numpy.array (2d) of str with shape (2 * rows - 1, 2 * cols - 1)
         """
+        return css_layout(self)
+
+    @property
+    @functools.lru_cache()
+    def stabilizers(self):
+        """See :meth:`qecsim.model.StabilizerCode.stabilizers`, built once per machine, see :func:`code_operators`."""
+        return code_operators(self)['stabilizers']
+
+    @property
+    @functools.lru_cache()
+    def logical_xs(self):
+        """See :meth:`qecsim.model.StabilizerCode.logical_xs`"""
+        return code_operators(self)['logical_xs']
 
-        # First, we generate error probabilities on large surface-code lattice of the size (n_max, m_max)
-        n_max = 2 * 155 - 1
-        m_max = 2 * 155 - 1
-        assert 2 * self.size[0] - 1 < n_max, 'Increase n_max'
-        assert 2 * self.size[1] - 1 < m_max, 'Increase m_max'
-
-        # Step 1: generate probabilities of Pauli X, Y, and Z errors for each qubit
-        myclip_a = 0.001  # Truncate normal distribution at 0.001 and 0.999
-        myclip_b = 0.999
-        std = self._std
-        mean = self._mean
-        a, b = (myclip_a - mean) / std, (myclip_b - mean) / std
-        np.random.seed(self._seed_l)
-        Px_max = truncnorm.rvs(a, b, loc=mean, scale=std, size=(n_max, m_max))  # generate probabilities of Pauli X
-        np.random.seed(self._seed_m)
-        Py_max = truncnorm.rvs(a, b, loc=mean, scale=std, size=(n_max, m_max))  # generate probabilities of Pauli Y
-        np.random.seed(self._seed_h)
-        Pz_max = truncnorm.rvs(a, b, loc=mean, scale=std, size=(n_max, m_max))  # generate probabilities of Pauli Z
-
-        # Step 2: generate total error probabilities p = px + py + pz for each qubit
-        # Truncate normal distribution at 0.001 and 0.999; centered at 1:
-        myclip_at = 0.001
-        myclip_bt = 1.999
-        std_t = self._std_total
-        mean = 1.0
-        a, b = (myclip_at - mean) / std_t, (myclip_bt - mean) / std_t
-        np.random.seed(self._seed_nonuniform)
-        density_max = truncnorm.rvs(a, b, loc=mean, scale=std_t, size=(n_max, m_max))
-
-        # Generate codes of different distances by 'cutting' smaller codes from the large one generated above
-        # This way a distance (d+1) code contains a distance d code as its sublattice
-        n = 2 * self.size[0] - 1
-        m = 2 * self.size[1] - 1
-        Px = Px_max[0:n, 0:m]
-        Py = Py_max[0:n, 0:m]
-        Pz = Pz_max[0:n, 0:m]
-        density = density_max[0:n, 0:m]
-        Pxyz = np.zeros((3, n, m), dtype=float)
-
-        # Normalize error probabilities on uniform or non-uniform distribution
-        for row, col in np.ndindex(Pxyz[0, :, :].shape):
-            index = (row, col)
-            if self.is_site(index):
-                Pxyz[0, row, col], Pxyz[1, row, col], Pxyz[2, row, col] = self.normalize_error_probs(Px[row, col], Py[row, col], Pz[row, col])
-                if self._nonuniform:
-                    Pxyz[0, row, col], Pxyz[1, row, col], Pxyz[2, row, col] = self.generate_nonuniform(Pxyz[0, row, col], Pxyz[1, row, col], Pxyz[2, row, col], density[row, col])
-        return Pxyz
-
-    @functools.lru_cache(maxsize=2 ** 28)
-    def normalize_error_probs(self, px, py, pz):
-        """Normalize error probabilities for each qubit on 1"""
-        Px = px / (px + py + pz)
-        Py = py / (px + py + pz)
-        Pz = pz / (px + py + pz)
-        return Px, Py, Pz
-
-    @functools.lru_cache(maxsize=2 ** 28)
-    def generate_nonuniform(self, px, py, pz, density):
-        """Normalize an error probability of a given qubit on the total error probability of that qubit"""
-        Px = px * density
-        Py = py * density
-        Pz = pz * density
-        return Px, Py, Pz
+    @property
+    @functools.lru_cache()
+    def logical_zs(self):
+        """See :meth:`qecsim.model.StabilizerCode.logical_zs`"""
+        return code_operators(self)['logical_zs']
 
     @property
     def label(self):
         """See :meth:`qecsim.model.StabilizerCode.label`"""
-        return 'Clifford-deformed {}x{} code'.format(*self.size)
\ No newline at end of file
+        return 'Clifford-deformed {}x{} code'.format(*self.size)
+
+    @property
+    def fingerprint(self):
+        """
+        Stable fingerprint of the code, covering its type, size, error landscape and :data:`LANDSCAPE_VERSION`, see
+        :func:`code_fingerprint`.
+
+        :rtype: str
+        """
+        return code_fingerprint(self)
+
+    def _key(self):
+        """Return the parameters that define the code, in the order of :meth:`__init__`."""
+        return (*self._size, self._mean, self._std, self._seed_h, self._seed_m, self._seed_l, self._seed_nonuniform,
+                self._nonuniform, self._std_total)
+
+    def __eq__(self, other):
+        if type(other) is type(self):
+            return self._key() == other._key()
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self._key())
+
+    def __repr__(self):
+        return ('{}({!r}, {!r}, mean={!r}, std={!r}, seed_h={!r}, seed_m={!r}, seed_l={!r}, seed_n={!r}, '
+                'nonuniform={!r}, std_t={!r})').format(type(self).__name__, *self._key())
\ No newline at end of file
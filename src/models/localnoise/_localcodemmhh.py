@@ -1,4 +1,7 @@
+import functools
+
 from qecsim.model import cli_description
+from models.common._paulilayout import mmhh_layout
 from models.localnoise._planarpaulimmhh import PlanarPauliMMHH
 from models.localnoise import LocalCode
 
@@ -19,3 +22,13 @@ class LocalCodeMMHH(LocalCode):
         Convenience constructor of planar Pauli for this code.
         """
         return PlanarPauliMMHH(self, self.qubit_error_probabilities(), bsf)
+
+    @functools.lru_cache()
+    def pauli_layout(self):
+        """
+        Return the Paulis applied to each site by its north/south plaquettes (op_v) and by its west/east plaquettes
+        (op_h), chosen from the local error probabilities, see :func:`mmhh_layout` and :func:`layout_operators`.
+
+        :rtype: 2-tuple of numpy.array (2d) of str with shape (2 * rows - 1, 2 * cols - 1)
+        """
+        return mmhh_layout(self.qubit_error_probabilities())
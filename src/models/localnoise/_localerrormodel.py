@@ -2,10 +2,48 @@ import functools
 import math
 import numpy as np
 import qecsim
-from qecsim import paulitools as pt
 from qecsim.model import cli_description
 from qecsim.models.generic import SimpleErrorModel
 from qecsim.models.generic import BiasedDepolarizingErrorModel
+from models.common._noisepipeline import NoisePipeline, SingleQubitPauliLayer
+
+
+class LocalPauliLayer(SingleQubitPauliLayer):
+    """
+    Single-qubit Pauli errors with local error probabilities (p_x, p_y, p_z) of each site, scaled by the total error
+    probability p, i.e. the probabilities of X, Y, Z are (p * p_x, p * p_y, p * p_z).
+    """
+
+    def __init__(self, parameter, layout='qubit_error_probabilities'):
+        """
+        Initialise new local Pauli layer.
+
+        :param parameter: Name of the total error probability parameter.
+        :type parameter: str
+        :param layout: Name of the code method returning local error probabilities indexed by (row, column) of each
+            site, as a numpy.array (3d) with shape (3, 2 * rows - 1, 2 * columns - 1).
+            (default='qubit_error_probabilities', see :meth:`LocalCode.qubit_error_probabilities`)
+        :type layout: str
+        """
+        self._parameter = parameter
+        self._layout = layout
+
+    def pauli_probabilities(self, code, params):
+        """
+        See :meth:`SingleQubitPauliLayer.pauli_probabilities`
+
+        Rows are in bsf qubit order, see :meth:`qecsim.models.planar.PlanarPauli._flatten_site_index`.
+        """
+        pxyz = getattr(code, self._layout)()
+        rows, cols = code.size
+        r, c = np.nonzero(np.add.outer(np.arange(2 * rows - 1), np.arange(2 * cols - 1)) % 2 == 0)
+        q = (r // 2) * (cols - c % 2) + (c // 2) + (r % 2 * rows * cols)
+        probabilities = np.empty((code.n_k_d[0], 3))
+        probabilities[q] = params[self._parameter] * pxyz[:, r, c].T
+        return probabilities
+
+    def __repr__(self):
+        return '{}({!r}, {!r})'.format(type(self).__name__, self._parameter, self._layout)
 
 
 @cli_description('Non-uniform Pauli error model')
@@ -15,27 +53,44 @@ class LocalErrorModel(SimpleErrorModel):
         :meth:'qubit_error_probabilities' of :class:'LocalCode'.
     """
 
-    def generate(self, code, probability, rng):
+    #: Noise pipeline of the model, with parameter probability.
+    pipeline = NoisePipeline([LocalPauliLayer('probability')])
+
+    def generate(self, code, probability, rng=None):
         """
         Generates X,Y,Z errors according to :meth:'qubit_error_probabilities' of :class:'LocalCode'
         Returns generated errors in the bsf format
         """
-        rng = np.random.default_rng()  # seed for random error generation
-        n_qubits = code.n_k_d[0]  # number of qubits in the code
-        Pxyz = code.qubit_error_probabilities()  # generates array of (px, py, pz) for each qubit
-        error_pauli_size = np.zeros((2 * code.size[0] - 1, 2 * code.size[1] - 1), dtype='str')
-        ep = ['I'] * n_qubits
-        error_pauli = ""
-        for row, col in np.ndindex(error_pauli_size.shape):  # generates errors at each qubit according to Pxyz
-            index = (row, col)
-            if code.is_site(index):
-                local_prob = self.single_qubit_error_prob(Pxyz[0, row, col], Pxyz[1, row, col], Pxyz[2, row, col], probability)
-                qubit_error = rng.choice(('I', 'X', 'Y', 'Z'), p=local_prob)
-                q = self.flatten_site_index(code, index)
-                ep[q] = qubit_error
-                error_pauli = error_pauli + qubit_error
-        error = ''.join(ep)
-        return pt.pauli_to_bsf(error)
+        return self.generate_batch(code, probability, 1, rng)[0].astype(int)
+
+    def generate_batch(self, code, probability, shots, rng=None):
+        """
+        Generates a batch of errors, each distributed as the errors returned by :meth:`generate`.
+
+        :param code: Planar code.
+        :type code: LocalCode
+        :param probability: Total error probability.
+        :type probability: float
+        :param shots: Number of errors to generate.
+        :type shots: int
+        :param rng: Random number generator. (default=None resolves to numpy.random.default_rng())
+        :type rng: numpy.random.Generator
+        :return: Errors in bsf format, one per row.
+        :rtype: numpy.array (2d) of uint8 with shape (shots, 2 * n_qubits)
+        """
+        return self.pipeline.sample(code, shots, rng, probability=probability)
+
+    def generate_sparse(self, code, probability, shots, rng=None):
+        """
+        Generates a batch of errors as sparse bsf flips, each distributed as the errors returned by :meth:`generate`.
+
+        The cost scales with the number of faults rather than the number of qubits, see
+        :func:`models.common.sample_faults`.
+
+        :return: Shot indices and bsf indices of flips.
+        :rtype: 2-tuple of numpy.array (1d)
+        """
+        return self.pipeline.sample_sparse(code, shots, rng, probability=probability)
 
     @functools.lru_cache()
     def single_qubit_error_prob(self, p_x, p_y, p_z, p):
@@ -75,32 +130,39 @@ class ErrorModelMMHHLayout(SimpleErrorModel):
         To be used in conjunction with the CSS code.
     """
 
-    def generate(self, code, probability, rng):
+    #: Noise pipeline of the model, with parameter probability.
+    pipeline = NoisePipeline([LocalPauliLayer('probability', layout='qubit_error_mmhh_layout')])
+
+    def generate(self, code, probability, rng=None):
         """
         Generates X,Y,Z according to :meth:'qubit_error_mmhh_layout' of :class:'LocalCode'
         Returns permuted generated errors in the bsf format
         """
-        rng = np.random.default_rng()
-        n_qubits = code.n_k_d[0]
-        Pxyz = code.qubit_error_mmhh_layout()
-        error_pauli_size = np.zeros((2 * code.size[0] - 1, 2 * code.size[1] - 1), dtype='str')
-        ep = ['I'] * n_qubits
-        error_pauli = ""
-        # Generate error for each qubit according to Pxyz
-        for row, col in np.ndindex(error_pauli_size.shape):
-            index = (row, col)
-            if code.is_site(index):
-                local_prob = self.single_qubit_error_prob(Pxyz[0, row, col], Pxyz[1, row, col], Pxyz[2, row, col], probability)
-                qubit_error = rng.choice(('I', 'X', 'Y', 'Z'), p=local_prob)
-                q = self.flatten_site_index(code, index)
-                ep[q] = qubit_error
-                error_pauli = error_pauli + qubit_error
-        error = ''.join(ep)
-        return pt.pauli_to_bsf(error)
+        return self.generate_batch(code, probability, 1, rng)[0].astype(int)
+
+    def generate_batch(self, code, probability, shots, rng=None):
+        """
+        Generates a batch of errors, each distributed as the errors returned by :meth:`generate`.
+
+        See :meth:`LocalErrorModel.generate_batch` for parameters.
+        """
+        return self.pipeline.sample(code, shots, rng, probability=probability)
+
+    def generate_sparse(self, code, probability, shots, rng=None):
+        """
+        Generates a batch of errors as sparse bsf flips, each distributed as the errors returned by :meth:`generate`.
+
+        The cost scales with the number of faults rather than the number of qubits, see
+        :func:`models.common.sample_faults`.
+
+        :return: Shot indices and bsf indices of flips.
+        :rtype: 2-tuple of numpy.array (1d)
+        """
+        return self.pipeline.sample_sparse(code, shots, rng, probability=probability)
 
     @functools.lru_cache()
     def single_qubit_error_prob(self, p_x, p_y, p_z, p):
-        # normalized probabilities
+        """For a given qubit returns error probabilities normalized on a total error probability p"""
         p_i = 1 - p * (p_x + p_y + p_z)
         return p_i, p * p_x, p * p_y, p * p_z
 
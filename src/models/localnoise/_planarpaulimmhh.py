@@ -54,36 +54,18 @@ class PlanarPauliMMHH(PlanarPauli):
         """
         Called by method:plaquette to transform stabilizers locally
         Chooses the layout of Paulis around each qubit. This method defines the structure of the code
+        Layout is precomputed for all sites by :meth:'pauli_layout' of :class:'LocalCodeMMHH'
         Current choice:
         - Pauli-high to north and south and Pauli-medium to east and west if (abs(row - col)) % 4 == 0
         - Pauli-medium to north and south and Pauli-high to east and west if  (abs(row - col)) % 4 == 2
         """
-        qubits_errors = self._qubit_prob
         row, col = index
-        # check that qubits are queried
-        if not self._code.is_plaquette(index):
-            # Sort Paulis from the least to the most probable
-            pauli = ['X', 'Y', 'Z']
-            # Check whether the queried qubit exists
-            if row < qubits_errors.shape[1] and col < qubits_errors.shape[2]:
-                # sort errors from the least probable to the most probable
-                Pauli_prob = [qubits_errors[0, row, col], qubits_errors[1, row, col], qubits_errors[2, row, col]]
-                pauli_sorted = [x for _, x in sorted(zip(Pauli_prob, pauli))]
-            # If not, it is a virtual qubit, and we can choose any operators for it, has no effect
-            else:
-                pauli_sorted = pauli
-            high_rate = pauli_sorted[2]
-            medium_rate = pauli_sorted[1]
-            low_rate = pauli_sorted[0]
-            # Layout Paulis according to the desired code structure (CURRENT CHOICE IS SUCH THAT LOGICALS = H-M-H-M-...)
-            # NOTE: need to experiment with the optimal code layout
-            if (abs(row - col)) % 4 == 0:
-                op_v = high_rate
-                op_h = medium_rate
-            elif (abs(row - col)) % 4 == 2:
-                op_h = high_rate
-                op_v = medium_rate
-        return op_v, op_h
+        op_v, op_h = self._code.pauli_layout()
+        # Check whether the queried qubit exists
+        if 0 <= row < op_v.shape[0] and 0 <= col < op_v.shape[1]:
+            return op_v[row, col], op_h[row, col]
+        # If not, it is a virtual qubit, and we can choose any operators for it, has no effect
+        return ('Z', 'Y') if (abs(row - col)) % 4 == 0 else ('Y', 'Z')
 
     def path(self, a_index, b_index):
         """
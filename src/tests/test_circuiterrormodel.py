@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+from qecsim import paulitools as pt
+from qecsim.models.planar import PlanarCode
+from qecsim.models.rotatedplanar import RotatedPlanarCode
+
+from models.correlatednoise.nonrotatedplanarcode.generic import CircuitErrorModel
+
+
+@pytest.mark.parametrize('code', [PlanarCode(3, 3), RotatedPlanarCode(3, 3)])
+def test_circuit_error_model_single_round_rejected(code):
+    # the only round would be the perfect round, i.e. noiseless
+    error_model = CircuitErrorModel()
+    with pytest.raises(ValueError):
+        error_model.simulate(code, 1, 0.3, 0.3, 0.3, 64, np.random.default_rng(5))
+    with pytest.raises(ValueError):
+        error_model.generate_ftp(code, 1, 0.3, 0.3, 0.3, np.random.default_rng(5))
+
+
+@pytest.mark.parametrize('code', [PlanarCode(3, 3), RotatedPlanarCode(3, 3)])
+def test_circuit_error_model_noisy_rounds(code):
+    error_model = CircuitErrorModel()
+    detection_events, _ = error_model.sample_detection_events(code, 2, 0.3, 0.3, 0.3, 64, np.random.default_rng(5))
+    assert detection_events.shape == (64, 2, len(code.stabilizers))
+    assert detection_events.any()
+    # detection events of the perfect round close the syndrome, so their sum is the syndrome of the final error
+    detection_events, error = error_model.generate_ftp(code, 2, 0.3, 0.3, 0.3, np.random.default_rng(5))
+    assert error.any()
+    assert np.array_equal(detection_events.sum(axis=0) % 2, pt.bsp(error, code.stabilizers.T))
+
+
+def test_circuit_error_model_generate_ftp_reproducible():
+    code, error_model = PlanarCode(3, 3), CircuitErrorModel()
+    runs = [error_model.generate_ftp(code, 3, 0.1, 0.1, 0.1, np.random.default_rng(7)) for _ in range(2)]
+    assert np.array_equal(runs[0][0], runs[1][0])
+    assert np.array_equal(runs[0][1], runs[1][1])
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from models.correlatednoise.nonrotatedplanarcode.generic import mwpm_networkx, mwpm_sparse_blossom
+
+
+def _random_graph(rng, max_nodes):
+    """
+    Return a random graph with an even number of nodes up to max_nodes, a random perfect matching and each other edge
+    with probability 1/2, and small integer weights, so that equal weights and ties between matchings are frequent.
+    """
+    n_nodes = 2 * int(rng.integers(1, max_nodes // 2 + 1))
+    u, v = np.triu_indices(n_nodes, 1)
+    pairs = np.sort(rng.permutation(n_nodes).reshape(-1, 2), axis=1)
+    keep = (rng.random(len(u)) < 0.5) | np.isin(u * n_nodes + v, pairs[:, 0] * n_nodes + pairs[:, 1])
+    u, v = u[keep], v[keep]
+    return n_nodes, u, v, rng.integers(0, 8, len(u))
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_mwpm_sparse_blossom_matches_networkx(seed):
+    # matchings may differ where optimal matchings tie, but both are perfect and of equal total weight
+    rng = np.random.default_rng(seed)
+    for _ in range(50):
+        n_nodes, u, v, w = _random_graph(rng, 16)
+        weights = {(a, b): c for a, b, c in zip(u.tolist(), v.tolist(), w.tolist())}
+        totals = []
+        for mates in mwpm_sparse_blossom(n_nodes, u, v, w), mwpm_networkx(n_nodes, u, v, w):
+            pairs = {(min(a, b), max(a, b)) for a, b in enumerate(mates.tolist())}
+            assert np.array_equal(mates[mates], np.arange(n_nodes))
+            assert pairs <= weights.keys()
+            totals.append(sum(weights[pair] for pair in pairs))
+        assert totals[0] == totals[1]
+
+
+def test_mwpm_sparse_blossom_empty():
+    empty = np.zeros(0, dtype=int)
+    assert np.array_equal(mwpm_sparse_blossom(4, empty, empty, empty), np.full(4, -1))
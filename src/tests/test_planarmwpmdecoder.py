@@ -0,0 +1,28 @@
+import numpy as np
+import pytest
+from qecsim.models.planar import PlanarCode
+
+from models.correlatednoise.nonrotatedplanarcode.XZ_noise import PlanarMWPMDecoderCorrelated
+from models.correlatednoise.nonrotatedplanarcode.generic import CorrelatedXZErrorModel, GreedyPredecoder
+
+
+@pytest.mark.parametrize('kwargs', [{}, {'predecoder': GreedyPredecoder()}, {'recovery_cache_bytes': 2 ** 20}])
+def test_planar_mwpm_decoder_decode_batch(kwargs):
+    code, error_model = PlanarCode(5, 5), CorrelatedXZErrorModel()
+    syndromes, _ = error_model.pipeline.sample_syndromes(code, 200, np.random.default_rng(11), error_probability_1=0.01,
+                                                         error_probability=0.01)
+    syndromes = np.concatenate((syndromes, syndromes[:50]))  # repeated syndromes
+    batch_decoder, decoder = PlanarMWPMDecoderCorrelated(**kwargs), PlanarMWPMDecoderCorrelated(**kwargs)
+    recoveries = batch_decoder.decode_batch(code, syndromes, 0.01, 0.01)
+    expected = np.array([decoder.decode(code, syndrome, 0.01, 0.01) for syndrome in syndromes])
+    assert np.array_equal(recoveries, expected)
+    assert batch_decoder.decode_stats.shots == len(syndromes)
+    if not kwargs:
+        assert batch_decoder.decode_stats == decoder.decode_stats
+
+
+def test_planar_mwpm_decoder_repr():
+    decoder = PlanarMWPMDecoderCorrelated(n_neighbours=4, predecoder=GreedyPredecoder(3), recovery_cache_bytes=1024)
+    assert repr(decoder) == ("PlanarMWPMDecoderCorrelated(degeneracy=True, max_table_bytes=67108864, "
+                             "matching_backend='auto', weight_resolution=16777216, n_neighbours=4, "
+                             "predecoder=GreedyPredecoder(3), recovery_cache_bytes=1024)")